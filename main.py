@@ -5,6 +5,7 @@ from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import QFile, QTextStream
 
 from src.storage import StorageService
+from src.async_storage import AsyncStorage
 from src.logic import GoalService, AuthService
 from src.ui.main_window import MainWindow
 from src.ui.auth import LoginWindow
@@ -27,6 +28,12 @@ class AppController:
         self.load_stylesheet()
 
         self.storage = StorageService(DB_PATH)
+        if self.storage.migration_report.steps:
+            print(self.storage.migration_report)
+        # Фоновий потік БД для UI (один на застосунок - порядок записів зберігається)
+        self.async_storage = AsyncStorage(self.storage)
+        # При виході з програми дописуємо відкладені зміни і закриваємо з'єднання з БД
+        self.app.aboutToQuit.connect(self.on_quit)
         self.auth_service = AuthService(self.storage)
         self.check_auth_and_run()
 
@@ -62,10 +69,18 @@ class AppController:
 
     def show_main_window(self, user_id):
         goal_service = GoalService(self.storage, user_id)
-        self.main_window = MainWindow(goal_service)
+        self.main_window = MainWindow(goal_service, self.async_storage)
         self.main_window.logout_signal.connect(self.on_logout)
         self.main_window.show()
 
+    def on_quit(self):
+        # Спершу дочікуємось завдань у черзі потоку БД
+        self.async_storage.shutdown(wait=True)
+        main_window = getattr(self, "main_window", None)
+        if main_window is not None:
+            main_window.service.flush()
+        self.storage.close()
+
     def on_logout(self):
         self.auth_service.logout()
         self.main_window.close()
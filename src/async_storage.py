@@ -0,0 +1,34 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class AsyncStorage:
+    """
+    Асинхронний фасад над StorageService для UI.
+    Усі завдання виконуються в одному фоновому потоці БД строго в порядку надходження,
+    тож порядок записів зберігається, а GUI-потік не чекає на диск чи заблоковану БД.
+
+        future = async_storage.get_inventory(hero_id)        # метод StorageService
+        future = async_storage.submit(service.get_hero)      # будь-яка функція
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-worker")
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Ставить виклик у чергу потоку БД."""
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def __getattr__(self, name):
+        attr = getattr(self.storage, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs) -> Future:
+            return self.submit(attr, *args, **kwargs)
+
+        return call
+
+    def shutdown(self, wait: bool = True):
+        """Зупиняє потік БД; з wait=True - після виконання всіх завдань у черзі."""
+        self._executor.shutdown(wait=wait)
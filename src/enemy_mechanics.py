@@ -9,16 +9,16 @@ class EnemyGenerator:
     """
 
     @staticmethod
-    def generate_enemy(hero: Hero) -> Enemy:
-        """Створює нового противника на основі рівня героя."""
+    def generate_enemy(hero: Hero, rng=random) -> Enemy:
+        """Створює нового противника на основі рівня героя (rng - джерело випадковості, за замовчуванням random)."""
 
-        roll = random.randint(1, 100)
+        roll = rng.randint(1, 100)
 
         image_file = ""
         dmg_type = DamageType.PHYSICAL  # Дефолт
 
         # Генеруємо випадковий варіант картинки від 1 до 3
-        variant = random.randint(1, 3)
+        variant = rng.randint(1, 3)
 
         if roll <= 50:
             rarity = EnemyRarity.EASY
@@ -49,7 +49,7 @@ class EnemyGenerator:
             drop = 0.25
             dmg_type = DamageType.PHYSICAL
 
-        level_offset = random.randint(-2, 2)
+        level_offset = rng.randint(-2, 2)
         enemy_level = max(1, hero.level + level_offset)
 
         base_hp = 50 * enemy_level
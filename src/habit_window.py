@@ -0,0 +1,35 @@
+from typing import Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+# Толерантність до старту та завершення вікна звички (хвилини)
+GRACE_MINUTES = 5
+
+
+def parse_time_frame(time_frame: str) -> Tuple[int, int]:
+    """
+    Розбирає вікно звички "HH:MM - HH:MM" у хвилини від початку доби (start, end).
+    Викликається один раз при створенні/редагуванні звички; перевірки тіку порівнюють лише цілі числа.
+    Кінець раніше за початок означає вікно через північ (напр. "22:00 - 01:00").
+    """
+    try:
+        start_str, end_str = time_frame.split(" - ")
+        start, end = _parse_minute(start_str), _parse_minute(end_str)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Невірний формат часу '{time_frame}' (очікується HH:MM - HH:MM)!") from None
+    return start, end
+
+
+def format_time_frame(start: int, end: int) -> str:
+    """Зворотне до parse_time_frame: хвилини доби -> "HH:MM - HH:MM" для відображення."""
+    return f"{start // 60:02d}:{start % 60:02d} - {end // 60:02d}:{end % 60:02d}"
+
+
+def _parse_minute(text: str) -> int:
+    hours, minutes = text.strip().split(":")
+    if not 1 <= len(hours) <= 2 or len(minutes) != 2 or not (hours + minutes).isdigit():
+        raise ValueError(text)
+    hours, minutes = int(hours), int(minutes)
+    if hours > 23 or minutes > 59:
+        raise ValueError(text)
+    return hours * 60 + minutes
@@ -0,0 +1,58 @@
+import uuid
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from .models import Item, EquipmentSlot, WeaponClass
+
+
+class ItemCatalogue:
+    """
+    Незмінний знімок бібліотеки предметів з індексами для фільтрів магазину.
+    Будується один раз з усіх рядків items_library (StorageService.get_item_catalogue)
+    і замінюється новим, коли сідер змінює бібліотеку.
+    """
+
+    def __init__(self, items: Iterable[Item]):
+        # Вітрина магазину впорядкована за ціною; списки індексів зберігають цей порядок
+        self.items: List[Item] = sorted(items, key=lambda i: i.price)
+        self._by_id: Dict[uuid.UUID, Item] = {item.id: item for item in self.items}
+        self._prices = [item.price for item in self.items]
+
+        by_slot, by_weapon_class = defaultdict(list), defaultdict(list)
+        for item in self.items:
+            by_slot[item.slot].append(item)
+            by_weapon_class[item.weapon_class].append(item)
+        self._by_slot = dict(by_slot)
+        self._by_weapon_class = dict(by_weapon_class)
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, item_id: uuid.UUID) -> Optional[Item]:
+        return self._by_id.get(item_id)
+
+    def for_slot(self, slot: Optional[EquipmentSlot]) -> List[Item]:
+        return list(self._by_slot.get(slot, ()))
+
+    def for_weapon_class(self, weapon_class: WeaponClass) -> List[Item]:
+        return list(self._by_weapon_class.get(weapon_class, ()))
+
+    def affordable(self, gold: int) -> List[Item]:
+        """Предмети, які можна купити за gold (від найдешевших)."""
+        return self.items[:bisect_right(self._prices, gold)]
+
+    def select(self, slot: Optional[EquipmentSlot] = None, weapon_class: Optional[WeaponClass] = None,
+               max_price: Optional[int] = None) -> List[Item]:
+        """
+        Вітрина магазину з фільтрами (None - без фільтра), впорядкована за ціною.
+        Кандидати беруться з найвужчого індексу, решта умов перевіряється лише на них.
+        """
+        candidates = [self.items if max_price is None else self.affordable(max_price)]
+        if slot is not None:
+            candidates.append(self._by_slot.get(slot, ()))
+        if weapon_class is not None:
+            candidates.append(self._by_weapon_class.get(weapon_class, ()))
+        return [item for item in min(candidates, key=len)
+                if (slot is None or item.slot == slot)
+                and (weapon_class is None or item.weapon_class == weapon_class)
+                and (max_price is None or item.price <= max_price)]
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from ..models import Goal, LongTermGoal
+from .base_logic import BaseLogic
+from .quest_logic import GOALS_PAGE_SIZE
+
+# Скільки днів виконані квести та звички лишаються в основних списках до архівації
+ARCHIVE_RETENTION_DAYS = 7
+
+
+class ArchiveLogic(BaseLogic):
+    """Міксин: Архів виконаних квестів та звичок."""
+
+    archive_retention = timedelta(days=ARCHIVE_RETENTION_DAYS)
+
+    def archive_completed(self, custom_now: datetime = None) -> Tuple[int, int]:
+        """Архівує все, що виконано раніше, ніж archive_retention тому. Повертає (квести, звички)."""
+        now = custom_now if custom_now else self.now()
+        with self.unit_of_work():
+            return self.repo.archive_completed(now - self.archive_retention)
+
+    def archive_if_due(self, custom_now: datetime = None) -> Tuple[int, int]:
+        """Архівація не частіше ніж раз на добу (викликається з таймера)."""
+        now = custom_now if custom_now else self.now()
+        if self.__dict__.get("_archived_on") == now.date():
+            return 0, 0
+        counts = self.archive_completed(now)
+        self._archived_on = now.date()
+        return counts
+
+    def get_archived_goals(self, cursor: Optional[tuple] = None,
+                           limit: int = GOALS_PAGE_SIZE) -> Tuple[List[Goal], Optional[tuple]]:
+        """Сторінка історії виконаних квестів (нові спочатку)."""
+        return self.storage.load_archived_goals(self.hero_id, cursor, limit)
+
+    def get_archived_long_term_goals(self, limit: int = 100) -> List[LongTermGoal]:
+        return self.storage.load_archived_long_term_goals(self.hero_id, limit)
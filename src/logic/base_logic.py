@@ -0,0 +1,69 @@
+import copy
+import random
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable
+from .repository import SessionRepository
+
+
+class BaseLogic:
+    """
+    Спільна основа міксинів GoalService.
+    Міксини очікують, що головний клас задасть self.storage та self.hero_id.
+    """
+
+    # Джерело поточного часу; GoalService(clock=...) підміняє його (напр. у симуляторі)
+    clock: Callable[[], datetime] = staticmethod(datetime.now)
+    # Джерело випадковості (бій, вороги, нагороди); за замовчуванням - глобальний генератор модуля random,
+    # GoalService(rng=random.Random(seed)) дає відтворюваний потік, не зачіпаючи глобальний стан
+    rng = random
+
+    def now(self) -> datetime:
+        return self.clock()
+
+    @property
+    def repo(self) -> SessionRepository:
+        """Стан сесії героя (створюється при першому зверненні)."""
+        repo = self.__dict__.get("_repo")
+        if repo is None:
+            repo = self._repo = SessionRepository(self.storage, self.hero_id, self.clock)
+        return repo
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Одна дія користувача = одна транзакція.
+        Всі записи в сховище всередині блоку (разом з відкладеними змінами героя)
+        фіксуються одним COMMIT, а при помилці відкочуються разом.
+        Дія виконується під блокуванням сесії: дії з GUI та з потоку БД не перемежовуються.
+        """
+        repo = self.repo
+        with repo.lock, self.storage.transaction():
+            repo.action_depth += 1
+            try:
+                yield
+            except BaseException:
+                repo.action_depth -= 1
+                if repo.action_depth == 0:
+                    repo.discard()
+                raise
+            repo.action_depth -= 1
+            if repo.action_depth == 0:
+                repo.flush()
+
+    def detached(self, fn, *args, **kwargs):
+        """
+        Виконує fn під блокуванням сесії та повертає глибоку копію результату.
+        Так результати з потоку БД передаються в GUI: віджети малюють копії, а живі
+        об'єкти сесії змінюються лише методами сервісу під блокуванням.
+        """
+        with self.repo.lock:
+            return copy.deepcopy(fn(*args, **kwargs))
+
+    def save_hero(self, hero):
+        """Зберігає героя: всередині дії - один раз наприкінці, поза дією - одразу."""
+        self.repo.save_hero(hero)
+
+    def flush(self):
+        """Примусово записує відкладені зміни (вихід з акаунту, закриття програми, тести)."""
+        self.repo.flush()
@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import List, Optional
+from .base_logic import BaseLogic
+from .tick_context import TickContext
+
+
+class DeadlineLogic(BaseLogic):
+    """
+    Міксин: Перевірки дедлайнів за розкладом (repo.deadlines) замість щосекундного опитування.
+    Таймер UI спрацьовує до найближчої події; поки жодна подія не настала, перевірка не звертається до БД.
+    """
+
+    def _prime_deadlines(self, tick: TickContext):
+        """Перше звернення (або після відкоту): розклад будується з усіх квестів і звичок героя."""
+        repo = self.repo
+        with repo.lock:
+            if repo.deadlines_primed:
+                return
+            repo.deadlines.clear()
+            for goal in tick.goals:
+                repo.schedule_goal(goal)
+            for habit in tick.habits:
+                repo.schedule_habit(habit, tick.now)
+            repo.deadlines_primed = True
+
+    def next_deadline(self, custom_now: datetime = None) -> Optional[datetime]:
+        """Момент найближчої події розкладу (None - подій немає)."""
+        self._prime_deadlines(TickContext(self, custom_now if custom_now else self.now()))
+        return self.repo.deadlines.next_due()
+
+    def run_due_checks(self, custom_now: datetime = None) -> List[str]:
+        """Обробляє лише події, що настали: штрафи за дедлайни квестів і перевірку звичок. Повертає алерти."""
+        return self.run_tick(custom_now).alerts
+
+    def run_tick(self, custom_now: datetime = None) -> TickContext:
+        """
+        Один тік таймера: події розкладу, що настали, перевіряються на спільному знімку стану
+        (TickContext), а всі штрафи записуються однією транзакцією наприкінці.
+        Знімок повертається UI, щоб оновити панелі без повторного читання.
+        """
+        now = custom_now if custom_now else self.now()
+        repo = self.repo
+        tick = TickContext(self, now)
+        # Під час першого тіку розклад будується з того ж знімка, що й перевірки
+        self._prime_deadlines(tick)
+        with repo.lock:
+            due = repo.deadlines.pop_due(now)
+            if not due:
+                return tick
+
+            with self.unit_of_work():
+                goals = [repo.get_goal(key) for kind, key in due if kind == "goal"]
+                goals = [goal for goal in goals if goal is not None]
+                if goals:
+                    tick.alerts.extend(self.check_deadlines(custom_now=now, goals=goals, ctx=tick))
+                if any(kind == "habit" for kind, _ in due):
+                    _, habit_alerts = self.get_long_term_goals(custom_now=now, ctx=tick)
+                    tick.alerts.extend(habit_alerts)
+                tick.commit()
+            # Квести без штрафу (напр. годинник переведено назад) повертаються в розклад
+            for goal in goals:
+                repo.schedule_goal(goal)
+            return tick
@@ -1,128 +1,175 @@
 from datetime import datetime, timedelta
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from ..models import LongTermGoal
+from ..habit_window import format_time_frame, parse_time_frame
 from ..longterm_mechanics import LongTermManager
+from .base_logic import BaseLogic
+from .tick_context import TickContext
 
 
-class HabitLogic:
+class HabitLogic(BaseLogic):
     """Міксин: Звички."""
 
     def create_long_term_goal(self, title: str, description: str, total_days: int, time_frame: str):
         if not title or not title.strip():
             raise ValueError("Назва не може бути порожньою!")
+        window_start, window_end = parse_time_frame(time_frame)
         # Старт завтра
-        start_date = datetime.now() + timedelta(days=1)
+        start_date = self.now() + timedelta(days=1)
         quest = LongTermGoal(title=title, description=description, total_days=total_days, start_date=start_date,
-                             time_frame=time_frame, daily_state='pending')
-        self.storage.save_long_term_goal(quest, self.hero_id)
+                             time_frame=format_time_frame(window_start, window_end), daily_state='pending',
+                             window_start=window_start, window_end=window_end)
+        self.save_long_term_goal(quest)
+
+    def update_long_term_goal(self, goal: LongTermGoal, title: str, description: str, time_frame: str):
+        """Редагування звички: вікно перевіряється та розбирається до збереження."""
+        if not title or not title.strip():
+            raise ValueError("Назва не може бути порожньою!")
+        goal.window_start, goal.window_end = parse_time_frame(time_frame)
+        goal.time_frame = format_time_frame(goal.window_start, goal.window_end)
+        goal.title = title
+        goal.description = description
+        self.save_long_term_goal(goal)
+
+    def save_long_term_goal(self, goal: LongTermGoal, custom_now: datetime = None):
+        """Зберігає звичку (в т.ч. змінену в діалогах) і переплановує її події."""
+        self.storage.save_long_term_goal(goal, self.hero_id)
+        self.repo.schedule_habit(goal, custom_now if custom_now else self.now())
 
     def delete_long_term_goal(self, goal_id):
         """Видаляє звичку."""
         self.storage.delete_long_term_goal(goal_id)
-
-    def get_long_term_goals(self, custom_now: datetime = None) -> Tuple[List[LongTermGoal], List[str]]:
-        goals = self.storage.load_long_term_goals(self.hero_id)
-        hero = self.get_hero()
-        enemy = self.get_current_enemy()
-        alerts = []
-        updated_hero = False
-
-        current_dt = custom_now if custom_now else datetime.now()
-        today_date = current_dt.date()
-
-        for goal in goals:
-            if today_date < goal.start_date.date(): continue
-
-            # Перевірка зміни дня
-            if goal.last_update_date and goal.last_update_date.date() < today_date:
-                if goal.daily_state in ['pending', 'started']:
-                    goal.missed_days += 1
-                    dmg_dealt = self.take_damage(hero, enemy)
-                    if dmg_dealt == 0:
-                        alerts.append(f"📅 Пропущено день звички '{goal.title}'!\n💨 УХИЛЕННЯ!")
-                    else:
-                        alerts.append(f"📅 Пропущено день звички '{goal.title}'!\n💥 {dmg_dealt} урону.")
-                    updated_hero = True
-
-                goal.daily_state = 'pending'
-                days_passed = (today_date - goal.start_date.date()).days + 1
-                goal.current_day = min(days_passed, goal.total_days)
-                goal.last_update_date = current_dt
-                self.storage.save_long_term_goal(goal, self.hero_id)
-
-            # Перевірка таймінгів
-            habit_alerts = self.check_habit_deadlines(goal, current_dt, enemy, hero)
-            if habit_alerts:
-                alerts.extend(habit_alerts)
-                updated_hero = True
-                self.storage.save_long_term_goal(goal, self.hero_id)
-
-        if updated_hero:
-            self.storage.update_hero(hero)
-        return goals, alerts
+        self.repo.unschedule_habit(goal_id)
+
+    def list_long_term_goals(self) -> List[LongTermGoal]:
+        """
+        Звички героя як є - без перевірок і штрафів (для відображення).
+        Зміну дня та часові вікна перевіряє тік (run_tick), який і повертає алерти.
+        """
+        return self.storage.load_long_term_goals(self.hero_id)
+
+    def get_long_term_goals(self, custom_now: datetime = None,
+                            ctx: Optional[TickContext] = None) -> Tuple[List[LongTermGoal], List[str]]:
+        """
+        Звички героя після перевірки зміни дня та часових вікон.
+        З ctx звички, герой і ворог беруться зі знімка тіку, а зміни записує ctx.commit().
+        """
+        current_dt = custom_now if custom_now else (ctx.now if ctx else self.now())
+        with self.unit_of_work():
+            tick = ctx if ctx else TickContext(self, current_dt)
+            goals = tick.habits
+            alerts = []
+            missed_by_title = []
+
+            for goal in goals:
+                today_date = goal.habit_day(current_dt)
+                if today_date < goal.start_date.date(): continue
+
+                # Зміна дня: пропущені дні (в т.ч. за кілька днів відсутності) рахуються з дат
+                last_day = goal.habit_day(goal.last_update_date) if goal.last_update_date else None
+                if last_day is None or last_day < today_date:
+                    missed = LongTermManager.count_missed_days(goal, last_day, today_date)
+                    if missed:
+                        goal.missed_days += missed
+                        missed_by_title.append((goal.title, missed))
+
+                    goal.daily_state = 'pending'
+                    days_passed = (today_date - goal.start_date.date()).days + 1
+                    goal.current_day = min(days_passed, goal.total_days)
+                    goal.last_update_date = current_dt
+                    tick.habit_changed(goal)
+
+                # Перевірка таймінгів
+                habit_alerts = self.check_habit_deadlines(goal, current_dt, tick.enemy, tick.hero)
+                if habit_alerts:
+                    alerts.extend(habit_alerts)
+                    tick.hero_changed = True
+                    tick.habit_changed(goal)
+
+            if missed_by_title:
+                alerts.insert(0, self._missed_days_alert(tick, missed_by_title))
+
+            for goal in goals:
+                self.repo.schedule_habit(goal, current_dt)
+            if ctx is None:
+                tick.commit()
+            return goals, alerts
+
+    def _missed_days_alert(self, tick: TickContext, missed_by_title: List[Tuple[str, int]]) -> str:
+        """Один штраф і один алерт на всі пропущені дні всіх звичок (напр. після відпустки)."""
+        total = sum(missed for _, missed in missed_by_title)
+        damage, dodged = self.take_repeated_damage(tick.hero, tick.enemy, total)
+        tick.hero_changed = True
+
+        if len(missed_by_title) == 1 and total == 1:
+            header = f"📅 Пропущено день звички '{missed_by_title[0][0]}'!"
+        else:
+            details = "\n".join(f"• '{title}': {missed}" for title, missed in missed_by_title)
+            header = f"📅 Пропущено днів звичок: {total}\n{details}"
+        if damage == 0:
+            return f"{header}\n💨 УХИЛЕННЯ!"
+        if dodged:
+            return f"{header}\n💥 {damage} урону (ухилень: {dodged})."
+        return f"{header}\n💥 {damage} урону."
 
     def check_habit_deadlines(self, goal: LongTermGoal, now: datetime, enemy, hero) -> List[str]:
-        if now.date() < goal.start_date.date(): return []
+        if not goal.has_window: return []
+        day = goal.habit_day(now)
+        if day < goal.start_date.date(): return []
         alerts = []
-        try:
-            t_start_str, t_end_str = goal.time_frame.split(" - ")
-            t_start = datetime.strptime(t_start_str, "%H:%M").time()
-            t_end = datetime.strptime(t_end_str, "%H:%M").time()
-            dt_start = datetime.combine(now.date(), t_start)
-            dt_end = datetime.combine(now.date(), t_end)
-            deadline_start = dt_start + timedelta(minutes=5)
-            deadline_end = dt_end + timedelta(minutes=5)
-
-            fail_msg = ""
-            trigger_fail = False
-
-            if now > deadline_start and goal.daily_state == 'pending':
-                trigger_fail = True
-                fail_msg = f"⏰ Час старту звички '{goal.title}' пропущено!"
-            elif now > deadline_end and goal.daily_state == 'started':
-                trigger_fail = True
-                fail_msg = f"⏰ Час завершення звички '{goal.title}' пропущено!"
-
-            if trigger_fail:
-                goal.daily_state = 'failed'
-                goal.missed_days += 1
-                dmg_dealt = self.take_damage(hero, enemy)
-                if dmg_dealt == 0:
-                    alerts.append(f"{fail_msg}\n💨 УХИЛЕННЯ!")
-                else:
-                    alerts.append(f"{fail_msg}\n💥 {dmg_dealt} урону.")
-
-        except ValueError:
-            pass
+        # Межі вікна пораховані з цілих хвилин доби - без розбору рядка на кожному тіку
+        deadline_start, deadline_end = goal.window_deadlines(day)
+
+        fail_msg = ""
+        trigger_fail = False
+
+        if now > deadline_start and goal.daily_state == 'pending':
+            trigger_fail = True
+            fail_msg = f"⏰ Час старту звички '{goal.title}' пропущено!"
+        elif now > deadline_end and goal.daily_state == 'started':
+            trigger_fail = True
+            fail_msg = f"⏰ Час завершення звички '{goal.title}' пропущено!"
+
+        if trigger_fail:
+            goal.daily_state = 'failed'
+            goal.last_update_date = now
+            goal.missed_days += 1
+            dmg_dealt = self.take_damage(hero, enemy)
+            if dmg_dealt == 0:
+                alerts.append(f"{fail_msg}\n💨 УХИЛЕННЯ!")
+            else:
+                alerts.append(f"{fail_msg}\n💥 {dmg_dealt} урону.")
         return alerts
 
     def checkin_long_term(self, goal: LongTermGoal, custom_now: datetime = None) -> Tuple[str, bool]:
         return self.finish_habit(goal, custom_now)
 
     def start_habit(self, goal: LongTermGoal, custom_now: datetime = None):
-        current_dt = custom_now if custom_now else datetime.now()
+        current_dt = custom_now if custom_now else self.now()
         goal.daily_state = 'started'
         goal.last_update_date = current_dt
-        self.storage.save_long_term_goal(goal, self.hero_id)
+        self.save_long_term_goal(goal, current_dt)
         return "Звичку розпочато!"
 
     def finish_habit(self, goal: LongTermGoal, custom_now: datetime = None):
-        current_dt = custom_now if custom_now else datetime.now()
-        hero = self.get_hero()
-        xp, gold = LongTermManager.calculate_interval_reward()
-        self._add_rewards(hero, xp, gold)
-
-        goal.daily_state = 'finished'
-        goal.checked_days += 1
-        goal.last_update_date = current_dt
-
-        msg = f"Звичку зараховано! +{xp} XP, +{gold} Gold"
-
-        if goal.current_day >= goal.total_days:
-            goal.is_completed = True
-            report, final_xp, final_gold = LongTermManager.finalize_quest(goal, hero)
-            self._add_rewards(hero, final_xp, final_gold)
-            msg += f"\n\n🏁 ЧЕЛЕНДЖ ЗАВЕРШЕНО!\n{report}"
-
-        self.storage.save_long_term_goal(goal, self.hero_id)
-        return msg
\ No newline at end of file
+        with self.unit_of_work():
+            current_dt = custom_now if custom_now else self.now()
+            hero = self.get_hero()
+            xp, gold = LongTermManager.calculate_interval_reward()
+            self._add_rewards(hero, xp, gold)
+
+            goal.daily_state = 'finished'
+            goal.checked_days += 1
+            goal.last_update_date = current_dt
+
+            msg = f"Звичку зараховано! +{xp} XP, +{gold} Gold"
+
+            if goal.current_day >= goal.total_days:
+                goal.is_completed = True
+                goal.completed_at = current_dt
+                report, final_xp, final_gold = LongTermManager.finalize_quest(goal, hero, self.rng)
+                self._add_rewards(hero, final_xp, final_gold)
+                msg += f"\n\n🏁 ЧЕЛЕНДЖ ЗАВЕРШЕНО!\n{report}"
+
+            self.save_long_term_goal(goal, current_dt)
+            return msg
\ No newline at end of file
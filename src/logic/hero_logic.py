@@ -1,26 +1,52 @@
-from datetime import datetime, timedelta
+import dataclasses
+import json
+import uuid
+from datetime import timedelta
+from typing import List
+from ..models import Enemy, EnemyRarity, DamageType, HeroEvent
+from .base_logic import BaseLogic
 
+# Поля героя, зміни яких пишуться в журнал (hero_events)
+LEDGER_FIELDS = ("level", "current_xp", "xp_to_next_level", "gold", "hp", "mana", "stat_points",
+                 "str_stat", "int_stat", "dex_stat", "vit_stat", "def_stat")
+# Баланси, які відкат не опускає нижче нуля: нагороду могли вже витратити
+NON_NEGATIVE_FIELDS = ("current_xp", "gold", "hp", "mana", "stat_points")
 
-class HeroLogic:
+
+class HeroLogic(BaseLogic):
     """Міксин: Управління станом героя."""
 
     def get_hero(self):
-        # self.storage та self.hero_id будуть доступні в головному класі
-        hero = self.storage.get_hero_by_id(self.hero_id)
+        # Один об'єкт героя на сесію; зміни записуються через save_hero()
+        hero = self.repo.get_hero()
         if not hero: raise ValueError("Помилка сесії")
         self._check_streak(hero)
         return hero
 
+    def increase_stat(self, attr_name: str):
+        """Витрачає вільне очко на характеристику; повертає копію героя для відображення."""
+        if attr_name not in ("str_stat", "int_stat", "dex_stat", "vit_stat", "def_stat"):
+            raise ValueError(f"Невідома характеристика: {attr_name}")
+        with self.unit_of_work():
+            hero = self.get_hero()
+            if hero.stat_points <= 0:
+                raise ValueError("Немає вільних очок характеристик!")
+            setattr(hero, attr_name, getattr(hero, attr_name) + 1)
+            hero.stat_points -= 1
+            hero.update_derived_stats()
+            self.save_hero(hero)
+        return self.detached(self.repo.get_hero)
+
     def _check_streak(self, hero):
-        today = datetime.now().date()
+        today = self.now().date()
         last_login_date = hero.last_login.date()
         if today > last_login_date:
             if today == last_login_date + timedelta(days=1):
                 hero.streak_days += 1
             else:
                 hero.streak_days = 1
-            hero.last_login = datetime.now()
-            self.storage.update_hero(hero)
+            hero.last_login = self.now()
+            self.save_hero(hero)
 
     def _check_level_up(self, hero):
         while hero.current_xp >= hero.xp_to_next_level:
@@ -40,7 +66,7 @@ class HeroLogic:
         hero.current_xp += xp
         hero.gold += gold
         self._check_level_up(hero)
-        self.storage.update_hero(hero)
+        self.save_hero(hero)
 
     def restore_hero_state(self, hero, state_data: dict):
         """Відновлює стан героя з словника (snapshot)."""
@@ -64,4 +90,99 @@ class HeroLogic:
         hero.hp = state_data.get('hp', hero.max_hp)
         hero.mana = state_data.get('mana', hero.max_mana)
 
-        self.storage.update_hero(hero)
\ No newline at end of file
+        self.save_hero(hero)
+
+    # --- Журнал змін (hero_events) ---
+    @staticmethod
+    def _ledger_state(hero, enemy) -> dict:
+        """Значення полів героя та копія ворога на початку дії."""
+        state = {name: getattr(hero, name) for name in LEDGER_FIELDS}
+        state["enemy"] = dataclasses.replace(enemy)
+        return state
+
+    def _record_hero_events(self, goal_id, action: str, before: dict, hero, enemy):
+        """Пише в журнал дельти між станом before і поточним (у транзакції поточної дії)."""
+        events = [HeroEvent(str(goal_id), action, name, getattr(hero, name) - before[name])
+                  for name in LEDGER_FIELDS if getattr(hero, name) != before[name]]
+        old_enemy = before["enemy"]
+        if enemy.id != old_enemy.id:
+            events.append(HeroEvent(str(goal_id), action, "enemy_replaced",
+                                    payload=json.dumps(self._enemy_payload(old_enemy))))
+        elif enemy.current_hp != old_enemy.current_hp:
+            events.append(HeroEvent(str(goal_id), action, "enemy_hp", enemy.current_hp - old_enemy.current_hp,
+                                    payload=json.dumps({"enemy_id": str(enemy.id)})))
+        self.storage.append_hero_events(self.hero_id, events)
+
+    def _revert_hero_events(self, goal_id, hero) -> bool:
+        """
+        Скасовує останнє виконання цілі оберненими дельтами з журналу.
+        Баланси (золото, досвід, очки, HP, мана) не опускаються нижче нуля - витрачене після
+        виконання не повертається в борг; шкода ворогу скасовується лише для того самого ворога.
+        Обернені дельти (фактично застосовані) теж дописуються в журнал. False - у журналі нічого скасовувати.
+        """
+        events: List[HeroEvent] = []
+        for event in self.storage.load_hero_events(self.hero_id, goal_id):
+            if event.action == "undo":
+                events = []  # Попередні виконання вже скасовано
+            else:
+                events.append(event)
+        if not events:
+            return False
+
+        before = self._ledger_state(hero, self.get_current_enemy())
+        for event in reversed(events):
+            if event.kind == "enemy_replaced":
+                self.repo.save_enemy(self._enemy_from_payload(json.loads(event.payload)))
+            elif event.kind == "enemy_hp":
+                enemy = self.get_current_enemy()
+                enemy_id = json.loads(event.payload).get("enemy_id") if event.payload else None
+                # Ворога відтоді замінено (або запис без ID) - HP нового ворога не чіпаємо
+                if enemy is not None and enemy_id == str(enemy.id):
+                    enemy.current_hp = min(enemy.max_hp, enemy.current_hp - event.delta)
+                    self.repo.save_enemy(enemy)
+            else:
+                value = getattr(hero, event.kind) - event.delta
+                if event.kind in NON_NEGATIVE_FIELDS:
+                    value = max(0, value)
+                setattr(hero, event.kind, value)
+        # max_hp / max_mana залежать від характеристик; поточні HP/Mana вже відновлені дельтами
+        hero.update_derived_stats()
+        hero.hp = min(hero.hp, hero.max_hp)
+        hero.mana = min(hero.mana, hero.max_mana)
+        self.save_hero(hero)
+        self._record_hero_events(goal_id, "undo", before, hero, self.get_current_enemy())
+        return True
+
+    @staticmethod
+    def _enemy_payload(enemy) -> dict:
+        return {
+            "id": str(enemy.id),
+            "name": enemy.name,
+            "rarity": enemy.rarity.value,
+            "level": enemy.level,
+            "current_hp": enemy.current_hp,
+            "max_hp": enemy.max_hp,
+            "damage": enemy.damage,
+            "damage_type": enemy.damage_type.value,
+            "reward_xp": enemy.reward_xp,
+            "reward_gold": enemy.reward_gold,
+            "drop_chance": enemy.drop_chance,
+            "image_path": enemy.image_path
+        }
+
+    @staticmethod
+    def _enemy_from_payload(enemy_data: dict) -> Enemy:
+        return Enemy(
+            id=uuid.UUID(enemy_data["id"]),
+            name=enemy_data["name"],
+            rarity=EnemyRarity(enemy_data["rarity"]),
+            level=enemy_data["level"],
+            current_hp=enemy_data["current_hp"],
+            max_hp=enemy_data["max_hp"],
+            damage=enemy_data["damage"],
+            damage_type=DamageType(enemy_data["damage_type"]),
+            reward_xp=enemy_data["reward_xp"],
+            reward_gold=enemy_data["reward_gold"],
+            drop_chance=enemy_data["drop_chance"],
+            image_path=enemy_data["image_path"]
+        )
\ No newline at end of file
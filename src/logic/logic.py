@@ -1,3 +1,7 @@
+import random
+
+from datetime import datetime, timedelta
+from typing import Callable, Optional
 
 # Імпорт міксинів
 from .hero_logic import HeroLogic
@@ -7,6 +11,9 @@ from .habit_logic import HabitLogic
 from .item_logic import ItemLogic
 from .shop_logic import ShopLogic
 from .skill_logic import SkillLogic  # <--- ВАЖЛИВО: Імпорт SkillLogic
+from .archive_logic import ArchiveLogic
+from .deadline_logic import DeadlineLogic
+from .repository import SessionRepository
 
 class ValidationUtils:
     @staticmethod
@@ -14,11 +21,21 @@ class ValidationUtils:
         return bool(title and title.strip())
 
 # Додаємо SkillLogic до спадкування
-class GoalService(HeroLogic, CombatLogic, QuestLogic, HabitLogic, ItemLogic, ShopLogic, SkillLogic):
+class GoalService(HeroLogic, CombatLogic, QuestLogic, HabitLogic, ItemLogic, ShopLogic, SkillLogic, ArchiveLogic,
+                  DeadlineLogic):
     """
     Головний сервіс логіки.
     Об'єднує всі міксини.
     """
-    def __init__(self, storage, hero_id: str):
+    def __init__(self, storage, hero_id: str, archive_retention_days: Optional[int] = None,
+                 clock: Optional[Callable[[], datetime]] = None, rng: Optional[random.Random] = None):
         self.storage = storage
-        self.hero_id = hero_id
\ No newline at end of file
+        self.hero_id = hero_id
+        if archive_retention_days is not None:
+            self.archive_retention = timedelta(days=archive_retention_days)
+        if clock is not None:
+            self.clock = clock
+        if rng is not None:
+            self.rng = rng
+        # Стан сесії створюється одразу: до сервісу звертаються GUI-потік і потік БД
+        self._repo = SessionRepository(storage, hero_id, self.clock)
\ No newline at end of file
@@ -1,174 +1,169 @@
 import json
-import uuid
 from datetime import datetime, timedelta
-from typing import List
-from ..models import Goal, Difficulty, DamageType, Enemy, EnemyRarity
+from typing import List, Optional, Tuple
+from ..models import Goal, GoalSearchHit, Difficulty, DamageType
 from .utils import ValidationUtils
+from .base_logic import BaseLogic
+from .tick_context import TickContext
 
+# Скільки квестів показувати за раз у QuestTab
+GOALS_PAGE_SIZE = 50
 
-class QuestLogic:
+
+class QuestLogic(BaseLogic):
     """Міксин: Звичайні квести."""
 
     def create_goal(self, title: str, description: str, deadline: datetime, difficulty: Difficulty) -> Goal:
         if not ValidationUtils.validate_title(title):
             raise ValueError("Назва не може бути порожньою!")
         new_goal = Goal(title=title.strip(), description=description.strip(), deadline=deadline, difficulty=difficulty)
-        self.storage.save_goal(new_goal, self.hero_id)
-        return new_goal
+        return self.repo.save_goal(new_goal)
 
     def get_all_goals(self) -> List[Goal]:
-        return self.storage.load_goals(self.hero_id)
+        return self.repo.get_goals()
+
+    def get_goals_page(self, sort_mode: str = "deadline_asc", cursor: Optional[tuple] = None,
+                       limit: int = GOALS_PAGE_SIZE) -> Tuple[List[Goal], Optional[tuple]]:
+        """Сторінка квестів, відсортована в БД. Повертає (квести, курсор наступної сторінки або None)."""
+        return self.repo.get_goals_page(sort_mode, cursor, limit)
+
+    def get_goal(self, goal_id) -> Optional[Goal]:
+        return self.repo.get_goal(goal_id)
+
+    def search_goals(self, query: str, limit: int = 20) -> List[GoalSearchHit]:
+        """Повнотекстовий пошук квестів героя (див. StorageService.search_goals)."""
+        return self.storage.search_goals(self.hero_id, query, limit)
+
+    def save_goal(self, goal: Goal) -> Goal:
+        """
+        Зберігає зміни квесту (в т.ч. зроблені в UI) через кеш сесії.
+        Повертає живий об'єкт сесії; при помилці запису кеш скидається разом з відкотом.
+        """
+        with self.unit_of_work():
+            return self.repo.save_goal(goal)
 
     def delete_goal(self, goal_id):
-        self.storage.delete_goal(goal_id)
+        self.repo.delete_goal(goal_id)
+
+    def delete_goals(self, goal_ids):
+        """Видаляє кілька квестів однією транзакцією."""
+        self.repo.delete_goals(list(goal_ids))
 
     def complete_goal(self, goal: Goal) -> str:
         if goal.is_completed: return "Вже виконано"
 
-        hero = self.get_hero()
-        enemy = self.get_current_enemy()
-
-        # --- SNAPSHOT: Зберігаємо стан героя ТА ворога ---
-        hero_snapshot = {
-            "level": hero.level,
-            "current_xp": hero.current_xp,
-            "xp_to_next_level": hero.xp_to_next_level,
-            "gold": hero.gold,
-            "hp": hero.hp,
-            "mana": hero.mana,
-            "stat_points": hero.stat_points,
-            "str_stat": hero.str_stat,
-            "int_stat": hero.int_stat,
-            "dex_stat": hero.dex_stat,
-            "vit_stat": hero.vit_stat,
-            "def_stat": hero.def_stat
-        }
-
-        enemy_snapshot = {
-            "id": str(enemy.id),
-            "name": enemy.name,
-            "rarity": enemy.rarity.value,
-            "level": enemy.level,
-            "current_hp": enemy.current_hp,
-            "max_hp": enemy.max_hp,
-            "damage": enemy.damage,
-            "damage_type": enemy.damage_type.value,
-            "reward_xp": enemy.reward_xp,
-            "reward_gold": enemy.reward_gold,
-            "drop_chance": enemy.drop_chance,
-            "image_path": enemy.image_path
-        }
-
-        full_snapshot = {
-            "hero": hero_snapshot,
-            "enemy": enemy_snapshot
-        }
-
-        goal.previous_state = json.dumps(full_snapshot)
-
-        goal.is_completed = True
-        self.storage.save_goal(goal, self.hero_id)
-
-        xp_reward, gold_reward = self._calculate_rewards(goal)
-        self._add_rewards(hero, xp_reward, gold_reward)
-
-        # Атака (0,0 = авто)
-        attack_msg, killed, loot = self.attack_enemy(0, 0)
-
-        return f"Квест завершено!\n+{xp_reward} XP, +{gold_reward} Gold\n{attack_msg}"
+        with self.unit_of_work():
+            hero = self.get_hero()
+            # Стан до виконання: в журнал пишуться лише дельти (для undo)
+            before = self._ledger_state(hero, self.get_current_enemy())
+
+            goal.is_completed = True
+            self.repo.save_goal(goal)
+
+            xp_reward, gold_reward = self._calculate_rewards(goal)
+            self._add_rewards(hero, xp_reward, gold_reward)
+
+            # Атака (0,0 = авто)
+            attack_msg, killed, loot = self.attack_enemy(0, 0)
+
+            self._record_hero_events(goal.id, "complete", before, hero, self.get_current_enemy())
+            return f"Квест завершено!\n+{xp_reward} XP, +{gold_reward} Gold\n{attack_msg}"
 
     def undo_complete_goal(self, goal: Goal) -> str:
         """
         Скасовує виконання квесту:
-        1. Відновлює стан героя (рівень, мани, hp).
-        2. Відновлює стан ворога (hp, або воскрешає попереднього).
+        1. Повертає зміни героя (XP, золото, рівень, HP, мана) оберненими дельтами з журналу.
+        2. Повертає HP ворога або воскрешає попереднього.
+        Для квестів, виконаних до появи журналу, - відновлення зі знімка previous_state.
         """
         if not goal.is_completed:
             return "Ціль ще не виконана."
 
-        hero = self.get_hero()
+        with self.unit_of_work():
+            hero = self.get_hero()
 
-        # Спроба відновити з snapshot
-        if goal.previous_state:
-            try:
-                full_data = json.loads(goal.previous_state)
+            if self._revert_hero_events(goal.id, hero):
+                goal.is_completed = False
+                self.repo.save_goal(goal)
+                return "Виконання скасовано. Стан героя та ворога відновлено."
 
-                # 1. Відновлення Героя
-                hero_data = full_data.get("hero")
+            # Відновлення зі snapshot (старі квести). Помилки запису не перехоплюються:
+            # unit_of_work відкочує дію повністю, без часткового відновлення
+            snapshot = self._legacy_snapshot(goal)
+            if snapshot is not None:
+                hero_data = snapshot.get("hero")
                 if hero_data:
                     # self.restore_hero_state знаходиться в HeroLogic (міксин)
                     self.restore_hero_state(hero, hero_data)
 
-                # 2. Відновлення Ворога
-                enemy_data = full_data.get("enemy")
+                enemy_data = snapshot.get("enemy")
                 if enemy_data:
-                    restored_enemy = Enemy(
-                        id=uuid.UUID(enemy_data["id"]),
-                        name=enemy_data["name"],
-                        rarity=EnemyRarity(enemy_data["rarity"]),
-                        level=enemy_data["level"],
-                        current_hp=enemy_data["current_hp"],
-                        max_hp=enemy_data["max_hp"],
-                        damage=enemy_data["damage"],
-                        damage_type=DamageType(enemy_data["damage_type"]),
-                        reward_xp=enemy_data["reward_xp"],
-                        reward_gold=enemy_data["reward_gold"],
-                        drop_chance=enemy_data["drop_chance"],
-                        image_path=enemy_data["image_path"]
-                    )
-                    # Зберігаємо відновленого ворога в базу
-                    self.storage.save_enemy(restored_enemy, self.hero_id)
+                    self.repo.save_enemy(self._enemy_from_payload(enemy_data))
 
                 # Очищаємо snapshot після відновлення
                 goal.previous_state = ""
                 goal.is_completed = False
-                self.storage.save_goal(goal, self.hero_id)
+                self.repo.save_goal(goal)
 
                 return "Виконання скасовано. Стан героя та ворога відновлено."
-            except Exception as e:
-                print(f"Error restoring state: {e}")
-                # Fallback, якщо щось пішло не так
-
-        # --- ФОЛБЕК (лише математичний відкат, якщо немає снепшота) ---
-        goal.is_completed = False
-        self.storage.save_goal(goal, self.hero_id)
-
-        xp_reward, gold_reward = self._calculate_rewards(goal)
-        hero.gold = max(0, hero.gold - gold_reward)
-        hero.current_xp = max(0, hero.current_xp - xp_reward)
-        self.storage.update_hero(hero)
-
-        return f"Нагороди скасовано (частковий відкат): -{xp_reward} XP, -{gold_reward} Gold"
-
-    def check_deadlines(self, custom_now: datetime = None) -> List[str]:
-        hero = self.get_hero()
-        enemy = self.get_current_enemy()
-        goals = self.get_all_goals()
-        alerts = []
-        damage_taken = False
-        now = custom_now if custom_now else datetime.now()
-
-        for goal in goals:
-            # 5 хвилин толерантності
-            deadline_with_grace = goal.deadline + timedelta(minutes=5)
-
-            if not goal.is_completed and not goal.penalty_applied and now > deadline_with_grace:
-                dmg_dealt = self.take_damage(hero, enemy)
-
-                goal.penalty_applied = True
-                self.storage.save_goal(goal, self.hero_id)
-                damage_taken = True
-
-                type_str = "Магічного" if enemy.damage_type == DamageType.MAGICAL else "Фізичного"
-                if dmg_dealt == 0:
-                    alerts.append(f"⏰ Дедлайн квесту '{goal.title}' пропущено!\n💨 Ви УХИЛИЛИСЯ від атаки!")
-                else:
-                    alerts.append(
-                        f"⏰ Дедлайн квесту '{goal.title}' пропущено!\n💥 {enemy.name} наніс {dmg_dealt} {type_str} урону!")
-
-        if damage_taken:
-            self.storage.update_hero(hero)
-        return alerts
+
+            # --- ФОЛБЕК (лише математичний відкат, якщо немає придатного снепшота) ---
+            goal.is_completed = False
+            self.repo.save_goal(goal)
+
+            xp_reward, gold_reward = self._calculate_rewards(goal)
+            hero.gold = max(0, hero.gold - gold_reward)
+            hero.current_xp = max(0, hero.current_xp - xp_reward)
+            self.save_hero(hero)
+
+            return f"Нагороди скасовано (частковий відкат): -{xp_reward} XP, -{gold_reward} Gold"
+
+    @staticmethod
+    def _legacy_snapshot(goal: Goal) -> Optional[dict]:
+        """Знімок previous_state як словник; None, якщо його немає або він нечитабельний."""
+        if not goal.previous_state:
+            return None
+        try:
+            snapshot = json.loads(goal.previous_state)
+        except ValueError:
+            return None
+        return snapshot if isinstance(snapshot, dict) else None
+
+    def check_deadlines(self, custom_now: datetime = None, goals: Optional[List[Goal]] = None,
+                        ctx: Optional[TickContext] = None) -> List[str]:
+        """
+        Штрафує за пропущені дедлайни; goals - лише ці квести (з розкладу), інакше всі.
+        З ctx стан береться зі знімка тіку, а штрафи записує ctx.commit() разом з рештою.
+        """
+        now = custom_now if custom_now else (ctx.now if ctx else self.now())
+        with self.unit_of_work():
+            tick = ctx if ctx else TickContext(self, now)
+            if goals is None:
+                goals = tick.goals
+            alerts = []
+
+            for goal in goals:
+                # 5 хвилин толерантності
+                deadline_with_grace = goal.deadline + timedelta(minutes=5)
+
+                if not goal.is_completed and not goal.penalty_applied and now > deadline_with_grace:
+                    enemy = tick.enemy
+                    dmg_dealt = self.take_damage(tick.hero, enemy)
+
+                    goal.penalty_applied = True
+                    tick.goal_changed(goal)
+                    tick.hero_changed = True
+
+                    type_str = "Магічного" if enemy.damage_type == DamageType.MAGICAL else "Фізичного"
+                    if dmg_dealt == 0:
+                        alerts.append(f"⏰ Дедлайн квесту '{goal.title}' пропущено!\n💨 Ви УХИЛИЛИСЯ від атаки!")
+                    else:
+                        alerts.append(
+                            f"⏰ Дедлайн квесту '{goal.title}' пропущено!\n💥 {enemy.name} наніс {dmg_dealt} {type_str} урону!")
+
+            if ctx is None:
+                tick.commit()
+            return alerts
 
     def _calculate_rewards(self, goal: Goal):
         rewards = {Difficulty.EASY: 50, Difficulty.MEDIUM: 100, Difficulty.HARD: 200, Difficulty.EPIC: 500}
@@ -0,0 +1,251 @@
+import copy
+import threading
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+from ..models import Hero, Enemy, Goal, InventoryItem, LongTermGoal
+from .scheduler import DeadlineScheduler, goal_due_at, habit_due_at
+
+# Позначка "ще не завантажено" (None - валідне значення, напр. ворога немає)
+_NOT_LOADED = object()
+
+
+def _locked(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class SessionRepository:
+    """
+    Стан сесії одного героя між GoalService та StorageService (identity map).
+    На кожен ID тримається один живий об'єкт: герой, поточний ворог, квести, інвентар.
+    Читання обслуговуються з пам'яті; записи через сервіс йдуть у БД і точково
+    оновлюють кеш.
+    Герой пишеться відкладено: зміни позначаються як "брудні" і записуються одним
+    UPDATE наприкінці дії (або одразу, якщо зміна відбулась поза дією).
+    Доступ з кількох потоків (GUI та потік БД) серіалізується через self.lock.
+    """
+
+    def __init__(self, storage, hero_id: str, clock: Callable[[], datetime] = datetime.now):
+        self.storage = storage
+        self.hero_id = hero_id
+        self.clock = clock
+        self.action_depth = 0  # глибина вкладених unit_of_work
+        self.lock = threading.RLock()
+        # Лічильники звернень до кешу за типом сутності
+        self.hits = Counter()
+        self.misses = Counter()
+        # Найближчі дедлайни квестів і події звичок (див. DeadlineLogic)
+        self.deadlines = DeadlineScheduler()
+        self._reset()
+
+    def _reset(self):
+        self._hero: Optional[Hero] = None
+        self._hero_dirty = False
+        self._enemy = _NOT_LOADED
+        self._goals: Dict[str, Goal] = {}
+        self._goals_loaded = False
+        self._inventory: Optional[List[InventoryItem]] = None
+        self._equipment_bonuses: Optional[Dict[str, int]] = None
+        # Розклад заповнюється з БД при першому зверненні та після відкоту
+        self.deadlines_primed = False
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """{"hero": {"hits": 5, "misses": 1}, ...}"""
+        kinds = set(self.hits) | set(self.misses)
+        return {k: {"hits": self.hits[k], "misses": self.misses[k]} for k in sorted(kinds)}
+
+    # --- Герой ---
+    @_locked
+    def get_hero(self) -> Optional[Hero]:
+        if self._hero is None:
+            self.misses["hero"] += 1
+            self._hero = self.storage.get_hero_by_id(self.hero_id)
+        else:
+            self.hits["hero"] += 1
+        return self._hero
+
+    @_locked
+    def save_hero(self, hero: Hero):
+        """Позначає героя зміненим. Запис у БД - при flush()."""
+        self._hero = hero
+        self._hero_dirty = True
+        if self.action_depth == 0:
+            self.flush()
+
+    @_locked
+    def flush(self):
+        """Записує відкладені зміни в БД."""
+        if self._hero_dirty and self._hero is not None:
+            self.storage.update_hero(self._hero)
+        self._hero_dirty = False
+
+    # --- Ворог ---
+    @_locked
+    def get_enemy(self) -> Optional[Enemy]:
+        if self._enemy is _NOT_LOADED:
+            self.misses["enemy"] += 1
+            self._enemy = self.storage.load_enemy(self.hero_id)
+        else:
+            self.hits["enemy"] += 1
+        return self._enemy
+
+    @_locked
+    def save_enemy(self, enemy: Enemy):
+        self.storage.save_enemy(enemy, self.hero_id)
+        self._enemy = enemy
+
+    @_locked
+    def delete_enemy(self):
+        self.storage.delete_enemy(self.hero_id)
+        self._enemy = None
+
+    # --- Квести ---
+    @_locked
+    def get_goals(self) -> List[Goal]:
+        """Повертає копію списку (самі об'єкти - живі, спільні для всієї сесії)."""
+        if not self._goals_loaded:
+            self.misses["goals"] += 1
+            # Вже відомі сесії об'єкти (напр. щойно створені) не підміняються копіями з БД
+            loaded = {str(g.id): g for g in self.storage.load_goals(self.hero_id)}
+            loaded.update((k, g) for k, g in self._goals.items() if k in loaded)
+            self._goals = loaded
+            self._goals_loaded = True
+        else:
+            self.hits["goals"] += 1
+        return list(self._goals.values())
+
+    @_locked
+    def get_goals_page(self, sort_mode: str, cursor: Optional[tuple], limit: int) -> Tuple[List[Goal], Optional[tuple]]:
+        """Сторінка квестів з БД; вже відомі сесії об'єкти не підміняються копіями."""
+        goals, next_cursor = self.storage.load_goals_page(self.hero_id, sort_mode, cursor, limit)
+        return [self._goals.setdefault(str(g.id), g) for g in goals], next_cursor
+
+    @_locked
+    def get_goal(self, goal_id) -> Optional[Goal]:
+        """Ціль з кешу; якщо її ще не завантажено (напр. результат пошуку) - з БД."""
+        key = str(goal_id)
+        goal = self._goals.get(key)
+        if goal is not None or self._goals_loaded:
+            return goal
+        self.misses["goal"] += 1
+        goal = self.storage.load_goal(goal_id)
+        if goal is not None:
+            self._goals[key] = goal
+        return goal
+
+    @_locked
+    def save_goal(self, goal: Goal) -> Goal:
+        """Зберігає ціль і повертає її живий об'єкт сесії (див. _adopt_goal)."""
+        goal = self._adopt_goal(goal)
+        self._stamp_completion(goal)
+        self.storage.save_goal(goal, self.hero_id)
+        self.schedule_goal(goal)
+        return goal
+
+    @_locked
+    def save_goals(self, goals: List[Goal]) -> List[Goal]:
+        goals = [self._adopt_goal(goal) for goal in goals]
+        for goal in goals:
+            self._stamp_completion(goal)
+        self.storage.save_goals(goals, self.hero_id)
+        for goal in goals:
+            self.schedule_goal(goal)
+        return goals
+
+    def _adopt_goal(self, goal: Goal) -> Goal:
+        """
+        Живий об'єкт для goal. Чужа копія (напр. detached-копія з GUI) живою не стає:
+        її стан переноситься в живий об'єкт, а якщо його ще немає - у свіжу копію в кеші.
+        Знімок записаного стану лишається від живого об'єкта - з ним порівнюється запис.
+        """
+        key = str(goal.id)
+        live = self._goals.get(key)
+        if live is goal:
+            return goal
+        fresh = copy.deepcopy(goal)
+        if live is None:
+            self._goals[key] = fresh
+            return fresh
+        saved_state = live._saved_state
+        live.__dict__.update(fresh.__dict__)
+        live._saved_state = saved_state
+        return live
+
+    def _stamp_completion(self, goal: Goal):
+        # Діалоги підцілей змінюють is_completed напряму - час виконання узгоджується тут
+        if goal.is_completed and goal.completed_at is None:
+            goal.completed_at = self.clock()
+        elif not goal.is_completed:
+            goal.completed_at = None
+
+    @_locked
+    def delete_goal(self, goal_id):
+        self.storage.delete_goal(goal_id)
+        self._goals.pop(str(goal_id), None)
+        self.deadlines.cancel(("goal", str(goal_id)))
+
+    @_locked
+    def delete_goals(self, goal_ids):
+        self.storage.delete_goals(goal_ids)
+        for goal_id in goal_ids:
+            self._goals.pop(str(goal_id), None)
+            self.deadlines.cancel(("goal", str(goal_id)))
+
+    @_locked
+    def archive_completed(self, completed_before: datetime) -> Tuple[int, int]:
+        """Переносить давно виконані цілі та звички в архів; архівні цілі зникають і з кешу."""
+        counts = self.storage.archive_completed(self.hero_id, completed_before)
+        if counts[0]:
+            self._goals = {key: goal for key, goal in self._goals.items()
+                           if not (goal.is_completed and goal.completed_at and goal.completed_at <= completed_before)}
+        return counts
+
+    # --- Розклад дедлайнів ---
+    @_locked
+    def schedule_goal(self, goal: Goal):
+        """Переплановує дедлайн квесту після будь-якої зміни (створення, редагування, виконання, штраф)."""
+        self.deadlines.schedule(("goal", str(goal.id)), goal_due_at(goal))
+
+    @_locked
+    def schedule_habit(self, goal: LongTermGoal, now: datetime):
+        self.deadlines.schedule(("habit", str(goal.id)), habit_due_at(goal, now))
+
+    @_locked
+    def unschedule_habit(self, goal_id):
+        self.deadlines.cancel(("habit", str(goal_id)))
+
+    # --- Інвентар ---
+    @_locked
+    def get_inventory(self) -> List[InventoryItem]:
+        if self._inventory is None:
+            self.misses["inventory"] += 1
+            self._inventory = self.storage.get_inventory(self.hero_id)
+        else:
+            self.hits["inventory"] += 1
+        return list(self._inventory)
+
+    @_locked
+    def invalidate_inventory(self):
+        """Інвентар перечитується після будь-якої зміни (додавання, одягання, зняття)."""
+        self._inventory = None
+        self._equipment_bonuses = None
+
+    @_locked
+    def get_equipment_bonuses(self) -> Dict[str, int]:
+        """Бонуси одягнених предметів: один рядок hero_equipment_bonuses, далі - з пам'яті."""
+        if self._equipment_bonuses is None:
+            self.misses["equipment_bonuses"] += 1
+            self._equipment_bonuses = self.storage.get_equipment_bonuses(self.hero_id)
+        else:
+            self.hits["equipment_bonuses"] += 1
+        return dict(self._equipment_bonuses)
+
+    @_locked
+    def discard(self):
+        """Відкидає стан у пам'яті (після відкоту транзакції): наступне читання піде в БД."""
+        self._reset()
@@ -0,0 +1,99 @@
+import heapq
+import itertools
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, List, Optional, Tuple
+from ..models import Goal, LongTermGoal
+from ..habit_window import GRACE_MINUTES
+
+# Толерантність до дедлайнів квестів і вікон звичок
+GRACE_PERIOD = timedelta(minutes=GRACE_MINUTES)
+
+
+class DeadlineScheduler:
+    """
+    Мін-купа майбутніх подій дедлайнів (ключ -> момент, після якого подію треба обробити).
+    Перепланування та скасування - O(log n): старий запис у купі не видаляється,
+    а стає неактуальним і відкидається, коли дійде до вершини.
+    Подія вважається настаною, коли now > due (як у перевірках check_deadlines).
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, Hashable]] = []
+        self._entries: Dict[Hashable, Tuple[datetime, int]] = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def schedule(self, key: Hashable, due: Optional[datetime]):
+        """Планує (або переплановує) подію; due=None - подія більше не потрібна."""
+        if due is None:
+            self.cancel(key)
+            return
+        entry = (due, next(self._counter))
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry + (key,))
+
+    def cancel(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._heap.clear()
+        self._entries.clear()
+
+    def next_due(self) -> Optional[datetime]:
+        """Момент найближчої актуальної події (None - подій немає)."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[Hashable]:
+        """Знімає з купи всі події, що настали до now; повертає їхні ключі."""
+        due_keys = []
+        while True:
+            self._drop_stale()
+            if not self._heap or not now > self._heap[0][0]:
+                return due_keys
+            _, _, key = heapq.heappop(self._heap)
+            del self._entries[key]
+            due_keys.append(key)
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap and self._entries.get(heap[0][2]) != heap[0][:2]:
+            heapq.heappop(heap)
+
+
+def goal_due_at(goal: Goal) -> Optional[datetime]:
+    """Коли квест отримає штраф за дедлайн (None - штраф уже неможливий)."""
+    if goal.is_completed or goal.penalty_applied:
+        return None
+    return goal.deadline + GRACE_PERIOD
+
+
+def habit_due_at(goal: LongTermGoal, now: datetime) -> Optional[datetime]:
+    """
+    Найближчий момент, коли перевірка звички (HabitLogic.get_long_term_goals) може щось змінити:
+    початок челенджу, зміна дня, пропущений старт (pending) або завершення (started) вікна.
+    Момент у минулому означає, що перевірку треба виконати негайно.
+    """
+    if goal.is_completed:
+        return None
+    today = goal.habit_day(now)
+    if today < goal.start_date.date():
+        return goal.day_boundary(goal.start_date.date())
+    if goal.last_update_date is None or goal.habit_day(goal.last_update_date) < today:
+        return now - timedelta(microseconds=1)
+
+    # Зміна дня; подія "з початку наступного дня" - як і для решти, due - останній момент до неї
+    candidates = [goal.day_boundary(today + timedelta(days=1)) - timedelta(microseconds=1)]
+    if not goal.has_window:
+        return min(candidates)
+    deadline_start, deadline_end = goal.window_deadlines(today)
+    if goal.daily_state == 'pending':
+        candidates.append(deadline_start)
+    elif goal.daily_state == 'started':
+        candidates.append(deadline_end)
+    return min(candidates)
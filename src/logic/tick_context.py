@@ -0,0 +1,60 @@
+from datetime import datetime
+from functools import cached_property
+from typing import Dict, List, Optional
+from ..models import Hero, Enemy, Goal, LongTermGoal
+
+
+class TickContext:
+    """
+    Знімок стану героя на одну перевірку (тік): герой, ворог, квести та звички
+    читаються щонайбільше один раз і лише якщо перевірці вони потрібні.
+    Перевірки лише позначають змінені об'єкти; commit() записує всі штрафи разом.
+    """
+
+    def __init__(self, service, now: datetime):
+        self.service = service
+        self.now = now
+        self.alerts: List[str] = []
+        self.hero_changed = False
+        self._changed_goals: Dict[str, Goal] = {}
+        self._changed_habits: Dict[str, LongTermGoal] = {}
+
+    @cached_property
+    def hero(self) -> Hero:
+        return self.service.get_hero()
+
+    @cached_property
+    def enemy(self) -> Optional[Enemy]:
+        return self.service.get_current_enemy()
+
+    @cached_property
+    def goals(self) -> List[Goal]:
+        return self.service.get_all_goals()
+
+    @cached_property
+    def habits(self) -> List[LongTermGoal]:
+        return self.service.storage.load_long_term_goals(self.service.hero_id)
+
+    @property
+    def loaded_habits(self) -> Optional[List[LongTermGoal]]:
+        """Звички, якщо тік їх уже прочитав (інакше None - без звернення до БД)."""
+        return self.__dict__.get("habits")
+
+    def goal_changed(self, goal: Goal):
+        self._changed_goals[str(goal.id)] = goal
+
+    def habit_changed(self, habit: LongTermGoal):
+        self._changed_habits[str(habit.id)] = habit
+
+    def commit(self):
+        """Записує змінені квести, звички та героя (викликається всередині unit_of_work)."""
+        service = self.service
+        if self._changed_goals:
+            service.repo.save_goals(list(self._changed_goals.values()))
+        if self._changed_habits:
+            service.storage.save_long_term_goals(list(self._changed_habits.values()), service.hero_id)
+        if self.hero_changed:
+            service.save_hero(self.hero)
+        self._changed_goals.clear()
+        self._changed_habits.clear()
+        self.hero_changed = False
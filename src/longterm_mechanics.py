@@ -1,4 +1,6 @@
 import random
+from datetime import date, timedelta
+from typing import Optional
 from .models import LongTermGoal, Hero
 
 
@@ -17,7 +19,25 @@ class LongTermManager:
         return 50, 50  # 50 XP, 50 Gold
 
     @staticmethod
-    def finalize_quest(quest: LongTermGoal, hero: Hero) -> tuple:
+    def count_missed_days(quest: LongTermGoal, last_day: Optional[date], today: date) -> int:
+        """
+        Скільки днів челенджу пропущено між останнім оновленням звички (день last_day) і сьогодні.
+        Рахується з дат, без перебору днів: день last_day - якщо звичку тоді не завершено,
+        плюс усі дні між ними. Дні поза челенджем (до старту, після останнього дня) не рахуються.
+        """
+        first_day = quest.start_date.date()
+        last_challenge_day = first_day + timedelta(days=quest.total_days - 1)
+        missed = 0
+        if last_day is None:
+            last_day = first_day - timedelta(days=1)
+        elif first_day <= last_day <= last_challenge_day and quest.daily_state in ('pending', 'started'):
+            missed += 1
+        gap_start = max(last_day + timedelta(days=1), first_day)
+        gap_end = min(today, last_challenge_day + timedelta(days=1))
+        return missed + max(0, (gap_end - gap_start).days)
+
+    @staticmethod
+    def finalize_quest(quest: LongTermGoal, hero: Hero, rng=random) -> tuple:
         """
         Підбиває підсумки квесту, повертає текстовий звіт,
         XP та золото, а також може нанести шкоду герою.
@@ -40,7 +60,7 @@ class LongTermManager:
 
             # Шанс на спорядження: 2.5% за день, макс 75%
             chance = min(total * 2.5, 75.0)
-            if random.uniform(0, 100) < chance:
+            if rng.uniform(0, 100) < chance:
                 gear_drop = True
 
             report = f"ІДЕАЛЬНО! Ви не пропустили жодного дня!\nОтримано величезну нагороду."
@@ -0,0 +1,804 @@
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from .models import HeroClass, Gender, EnemyRarity, DamageType, ItemType, EquipmentSlot, WeaponClass, WeaponHandType
+from .row_mappers import uuid_to_db, datetime_to_db, enum_to_db
+from .habit_window import parse_time_frame
+
+
+@dataclass
+class Migration:
+    """Один крок міграції схеми. Після виконання user_version = version."""
+    version: int
+    name: str
+    # Може повернути {таблиця: кількість рядків, перенесених у карантин} (див. _quarantine_orphans)
+    apply: Callable[[sqlite3.Connection], Optional[Dict[str, int]]]
+    # Перебудова таблиць: зовнішні ключі вимикаються на час кроку (інакше DROP TABLE
+    # старої таблиці каскадно видалить дочірні рядки), цілісність перевіряється перед COMMIT
+    rebuilds_tables: bool = False
+
+
+@dataclass
+class MigrationReport:
+    """Звіт про запуск міграцій: які кроки виконано, скільки часу вони зайняли і що перенесено в карантин."""
+    from_version: int
+    to_version: int
+    steps: List[Tuple[int, str, float]] = field(default_factory=list)
+    # Рядки-сироти, перенесені в таблиці {table}_orphans: {table: кількість}
+    quarantined: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(seconds for _, _, seconds in self.steps)
+
+    def __str__(self):
+        if not self.steps:
+            return f"Схема БД актуальна (версія {self.to_version})."
+        lines = [f"Міграція БД: версія {self.from_version} -> {self.to_version}"]
+        for version, name, seconds in self.steps:
+            lines.append(f"  [{version}] {name}: {seconds * 1000:.1f} мс")
+        lines.append(f"  Разом: {self.total_seconds * 1000:.1f} мс")
+        for table, count in self.quarantined.items():
+            lines.append(f"  Рядків-сиріт у {table}: {count} (перенесено в {table}_orphans)")
+        return "\n".join(lines)
+
+
+# Реєстр міграцій (заповнюється декоратором @migration у порядку версій)
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str, rebuilds_tables: bool = False):
+    def decorator(func):
+        MIGRATIONS.append(Migration(version, name, func, rebuilds_tables))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, definition: str):
+    """Ідемпотентне ALTER TABLE ... ADD COLUMN."""
+    if not _column_exists(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def migrate(conn: sqlite3.Connection, target: Optional[int] = None) -> MigrationReport:
+    """
+    Доводить схему до останньої версії (або до версії target).
+    Якщо схема актуальна - виконується лише один PRAGMA user_version (жодного DDL).
+    Кожен крок виконується в окремій транзакції разом з оновленням user_version.
+    """
+    current = get_schema_version(conn)
+    report = MigrationReport(from_version=current, to_version=current)
+    target = latest_version() if target is None else target
+    if current >= target:
+        return report
+
+    for step in MIGRATIONS:
+        if step.version <= current or step.version > target:
+            continue
+        started = time.perf_counter()
+        foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+        if step.rebuilds_tables:
+            conn.execute("PRAGMA foreign_keys = OFF")  # поза транзакцією, інакше не діє
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            quarantined = step.apply(conn) or {}
+            if step.rebuilds_tables and conn.execute("PRAGMA foreign_key_check").fetchone():
+                raise sqlite3.IntegrityError(f"Міграція {step.version}: порушено зовнішні ключі")
+            conn.execute(f"PRAGMA user_version = {step.version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if step.rebuilds_tables:
+                conn.execute(f"PRAGMA foreign_keys = {foreign_keys}")
+        report.steps.append((step.version, step.name, time.perf_counter() - started))
+        for table, count in quarantined.items():
+            report.quarantined[table] = report.quarantined.get(table, 0) + count
+        report.to_version = step.version
+
+    return report
+
+
+# --- Міграції ---
+
+@migration(1, "Початкова схема")
+def _initial_schema(conn: sqlite3.Connection):
+    # Heroes
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS heroes (
+            id TEXT PRIMARY KEY,
+            nickname TEXT UNIQUE NOT NULL,
+            hero_class TEXT,
+            gender TEXT,
+            appearance TEXT,
+            level INTEGER DEFAULT 1,
+            current_xp INTEGER DEFAULT 0,
+            xp_to_next_level INTEGER DEFAULT 100,
+            gold INTEGER DEFAULT 0,
+            streak_days INTEGER DEFAULT 0,
+            hp INTEGER DEFAULT 100,
+            max_hp INTEGER DEFAULT 100,
+            stat_points INTEGER DEFAULT 0,
+            str_stat INTEGER DEFAULT 0,
+            int_stat INTEGER DEFAULT 0,
+            dex_stat INTEGER DEFAULT 0,
+            vit_stat INTEGER DEFAULT 0,
+            def_stat INTEGER DEFAULT 0,
+            mana INTEGER DEFAULT 10,
+            max_mana INTEGER DEFAULT 10,
+            buff_multiplier REAL DEFAULT 1.0,
+            last_login TEXT
+        )
+    """)
+
+    # Goals (з полем previous_state)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS goals (
+            id TEXT PRIMARY KEY,
+            hero_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            deadline TEXT,
+            difficulty INTEGER,
+            created_at TEXT,
+            is_completed INTEGER DEFAULT 0,
+            penalty_applied INTEGER DEFAULT 0,
+            previous_state TEXT DEFAULT '',
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE
+        )
+    """)
+    # Бази, створені до появи previous_state
+    _add_column(conn, "goals", "previous_state", "TEXT DEFAULT ''")
+
+    # Sub Goals
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sub_goals (
+            id TEXT PRIMARY KEY,
+            goal_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT DEFAULT '',
+            is_completed INTEGER DEFAULT 0,
+            FOREIGN KEY (goal_id) REFERENCES goals (id) ON DELETE CASCADE
+        )
+    """)
+    _add_column(conn, "sub_goals", "description", "TEXT DEFAULT ''")
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS long_term_goals (id TEXT PRIMARY KEY, hero_id TEXT NOT NULL, title TEXT NOT NULL, description TEXT, total_days INTEGER, start_date TEXT, time_frame TEXT, current_day INTEGER DEFAULT 1, checked_days INTEGER DEFAULT 0, missed_days INTEGER DEFAULT 0, is_completed INTEGER DEFAULT 0, daily_state TEXT DEFAULT 'pending', last_update_date TEXT, FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS current_enemies (hero_id TEXT PRIMARY KEY, id TEXT NOT NULL, name TEXT, rarity TEXT, level INTEGER, current_hp INTEGER, max_hp INTEGER, damage INTEGER, damage_type TEXT, reward_xp INTEGER, reward_gold INTEGER, drop_chance REAL, image_path TEXT, FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE)")
+
+    # Items Library
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS items_library (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            item_type TEXT,
+            slot TEXT,
+            weapon_class TEXT,
+            weapon_hands TEXT,
+            damage_type TEXT,
+            bonus_str INTEGER DEFAULT 0,
+            bonus_int INTEGER DEFAULT 0,
+            bonus_dex INTEGER DEFAULT 0,
+            bonus_vit INTEGER DEFAULT 0,
+            bonus_def INTEGER DEFAULT 0,
+            base_dmg INTEGER DEFAULT 0,
+            double_attack_chance INTEGER DEFAULT 0,
+            price INTEGER DEFAULT 0,
+            level INTEGER DEFAULT 1,
+            image_path TEXT UNIQUE
+        )
+    """)
+    _add_column(conn, "items_library", "double_attack_chance", "INTEGER DEFAULT 0")
+
+    # Inventory
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory (
+            id TEXT PRIMARY KEY,
+            hero_id TEXT NOT NULL,
+            item_id TEXT NOT NULL,
+            is_equipped INTEGER DEFAULT 0,
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE,
+            FOREIGN KEY (item_id) REFERENCES items_library (id)
+        )
+    """)
+
+
+@migration(2, "Індекси для вибірок за героєм та батьківським записом")
+def _lookup_indexes(conn: sqlite3.Connection):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_goals_hero ON goals (hero_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sub_goals_goal ON sub_goals (goal_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_long_term_goals_hero ON long_term_goals (hero_id, is_completed)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_hero ON inventory (hero_id)")
+    # Для перевірки зовнішнього ключа inventory.item_id при зміні бібліотеки предметів
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_item ON inventory (item_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_library_slot ON items_library (slot)")
+
+
+@migration(3, "Службові дані та маніфест папки предметів")
+def _items_manifest(conn: sqlite3.Connection):
+    conn.execute("CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS items_manifest (
+            image_path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL
+        )
+    """)
+
+
+@migration(4, "Збережений прогрес цілей та індекси для посторінкового сортування")
+def _goal_sort_indexes(conn: sqlite3.Connection):
+    _add_column(conn, "goals", "progress", "REAL DEFAULT 0")
+    # Прогрес = частка виконаних підцілей (як Goal.calculate_progress)
+    conn.execute("""
+        UPDATE goals SET progress = COALESCE(
+            (SELECT 100.0 * SUM(s.is_completed) / COUNT(*) FROM sub_goals s WHERE s.goal_id = goals.id),
+            CASE WHEN is_completed THEN 100.0 ELSE 0.0 END)
+    """)
+    # Кожен режим сортування QuestTab читається з індексу в один бік, id - тай-брейк
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_goals_hero_deadline ON goals (hero_id, is_completed, deadline, id)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_goals_hero_difficulty ON goals (hero_id, is_completed, difficulty DESC, id DESC)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_goals_hero_progress ON goals (hero_id, is_completed, progress DESC, id DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_goals_hero_created ON goals (hero_id, is_completed, created_at, id)")
+    # Перекривається будь-яким з індексів вище
+    conn.execute("DROP INDEX IF EXISTS idx_goals_hero")
+
+
+# Текст підцілей цілі для повнотекстового індексу (назви та описи через пробіл)
+_SUB_GOALS_TEXT = "(SELECT COALESCE(group_concat(s.title || ' ' || COALESCE(s.description, ''), ' '), '') " \
+                  "FROM sub_goals s WHERE s.goal_id = {goal_id})"
+
+
+@migration(5, "Повнотекстовий пошук (FTS5) по цілях та підцілях")
+def _goals_fts(conn: sqlite3.Connection):
+    # rowid запису FTS = rowid цілі (UPSERT у save_goals зберігає rowid)
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS goals_fts USING fts5(
+            title, description, subgoals, tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    conn.execute("DELETE FROM goals_fts")
+    conn.execute(f"""
+        INSERT INTO goals_fts (rowid, title, description, subgoals)
+        SELECT g.rowid, g.title, COALESCE(g.description, ''), {_SUB_GOALS_TEXT.format(goal_id="g.id")} FROM goals g
+    """)
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS goals_fts_insert AFTER INSERT ON goals BEGIN
+            INSERT INTO goals_fts (rowid, title, description, subgoals)
+            VALUES (new.rowid, new.title, COALESCE(new.description, ''), {_SUB_GOALS_TEXT.format(goal_id="new.id")});
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS goals_fts_update AFTER UPDATE OF title, description ON goals
+        WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN
+            UPDATE goals_fts SET title = new.title, description = COALESCE(new.description, '')
+            WHERE rowid = new.rowid;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS goals_fts_delete AFTER DELETE ON goals BEGIN
+            DELETE FROM goals_fts WHERE rowid = old.rowid;
+        END
+    """)
+
+    # Будь-яка зміна підцілі перераховує текст підцілей її цілі
+    for event, ref in (("INSERT", "new"), ("UPDATE OF title, description, goal_id", "new"), ("DELETE", "old")):
+        name = event.split()[0].lower()
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS sub_goals_fts_{name} AFTER {event} ON sub_goals BEGIN
+                UPDATE goals_fts SET subgoals = {_SUB_GOALS_TEXT.format(goal_id=f"{ref}.goal_id")}
+                WHERE rowid = (SELECT rowid FROM goals WHERE id = {ref}.goal_id);
+            END
+        """)
+
+
+@migration(6, "Архів виконаних цілей та звичок")
+def _archive_tables(conn: sqlite3.Connection):
+    _add_column(conn, "goals", "completed_at", "TEXT")
+    _add_column(conn, "long_term_goals", "completed_at", "TEXT")
+    # Вже виконаним записам відлік терміну зберігання починається з моменту міграції
+    now = datetime.now().isoformat()
+    conn.execute("UPDATE goals SET completed_at = ? WHERE is_completed = 1 AND completed_at IS NULL", (now,))
+    conn.execute("UPDATE long_term_goals SET completed_at = ? WHERE is_completed = 1 AND completed_at IS NULL", (now,))
+
+    # Холодні таблиці: ті самі колонки + час архівації. Гарячі таблиці лишаються малими,
+    # архів читається лише при перегляді історії.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS goals_archive (
+            id TEXT PRIMARY KEY,
+            hero_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            deadline TEXT,
+            difficulty INTEGER,
+            created_at TEXT,
+            is_completed INTEGER DEFAULT 1,
+            penalty_applied INTEGER DEFAULT 0,
+            previous_state TEXT DEFAULT '',
+            progress REAL DEFAULT 0,
+            completed_at TEXT,
+            archived_at TEXT,
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sub_goals_archive (
+            id TEXT PRIMARY KEY,
+            goal_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT DEFAULT '',
+            is_completed INTEGER DEFAULT 0,
+            FOREIGN KEY (goal_id) REFERENCES goals_archive (id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS long_term_goals_archive (
+            id TEXT PRIMARY KEY,
+            hero_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            total_days INTEGER,
+            start_date TEXT,
+            time_frame TEXT,
+            current_day INTEGER,
+            checked_days INTEGER,
+            missed_days INTEGER,
+            is_completed INTEGER DEFAULT 1,
+            daily_state TEXT,
+            last_update_date TEXT,
+            completed_at TEXT,
+            archived_at TEXT,
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE
+        )
+    """)
+    # Історія переглядається від нових до старих
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_goals_archive_hero ON goals_archive (hero_id, completed_at, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sub_goals_archive_goal ON sub_goals_archive (goal_id)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_long_term_goals_archive_hero ON long_term_goals_archive (hero_id, completed_at)")
+
+
+@migration(7, "Журнал змін героя (замість знімків previous_state)")
+def _hero_events(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS hero_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            hero_id TEXT NOT NULL,
+            goal_id TEXT NOT NULL,
+            action TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            delta INTEGER DEFAULT 0,
+            payload TEXT DEFAULT '',
+            created_at TEXT,
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_hero_events_goal ON hero_events (goal_id, seq)")
+    # Покриває підсумки журналу за героєм (SUM(delta) GROUP BY kind) без читання таблиці
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_hero_events_hero ON hero_events (hero_id, kind, delta)")
+
+
+# --- Компактне кодування (міграція 8) ---
+
+def _uuid_blob(value):
+    return uuid_to_db(value) if value else None
+
+
+def _epoch(value):
+    return datetime_to_db(datetime.fromisoformat(value)) if value else None
+
+
+_ENUMS = {cls.__name__: cls for cls in (HeroClass, Gender, EnemyRarity, DamageType, ItemType, EquipmentSlot,
+                                        WeaponClass, WeaponHandType)}
+
+
+def _enum_code(enum_name, value):
+    member = next((m for m in _ENUMS[enum_name] if m.value == value), None)
+    return enum_to_db(member)
+
+
+# Таблиця -> (DDL з {table} замість імені, перетворення колонок старих даних).
+# Перетворення: "uuid" - TEXT UUID -> 16 байт, "time" - ISO-рядок -> мікросекунди від 1970-01-01,
+# клас Enum - рядкове значення -> код (див. row_mappers.enum_codes).
+_COMPACT_TABLES = {
+    "heroes": ("""
+        CREATE TABLE {table} (
+            id BLOB PRIMARY KEY,
+            nickname TEXT UNIQUE NOT NULL,
+            hero_class INTEGER,
+            gender INTEGER,
+            appearance TEXT,
+            level INTEGER DEFAULT 1,
+            current_xp INTEGER DEFAULT 0,
+            xp_to_next_level INTEGER DEFAULT 100,
+            gold INTEGER DEFAULT 0,
+            streak_days INTEGER DEFAULT 0,
+            hp INTEGER DEFAULT 100,
+            max_hp INTEGER DEFAULT 100,
+            stat_points INTEGER DEFAULT 0,
+            str_stat INTEGER DEFAULT 0,
+            int_stat INTEGER DEFAULT 0,
+            dex_stat INTEGER DEFAULT 0,
+            vit_stat INTEGER DEFAULT 0,
+            def_stat INTEGER DEFAULT 0,
+            mana INTEGER DEFAULT 10,
+            max_mana INTEGER DEFAULT 10,
+            buff_multiplier REAL DEFAULT 1.0,
+            last_login INTEGER
+        )
+    """, {"id": "uuid", "hero_class": HeroClass, "gender": Gender, "last_login": "time"}),
+    "goals": ("""
+        CREATE TABLE {table} (
+            id BLOB PRIMARY KEY,
+            hero_id BLOB NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            deadline INTEGER,
+            difficulty INTEGER,
+            created_at INTEGER,
+            is_completed INTEGER DEFAULT 0,
+            penalty_applied INTEGER DEFAULT 0,
+            previous_state TEXT DEFAULT '',
+            progress REAL DEFAULT 0,
+            completed_at INTEGER,
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE
+        )
+    """, {"id": "uuid", "hero_id": "uuid", "deadline": "time", "created_at": "time", "completed_at": "time"}),
+    "sub_goals": ("""
+        CREATE TABLE {table} (
+            id BLOB PRIMARY KEY,
+            goal_id BLOB NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT DEFAULT '',
+            is_completed INTEGER DEFAULT 0,
+            FOREIGN KEY (goal_id) REFERENCES goals (id) ON DELETE CASCADE
+        )
+    """, {"id": "uuid", "goal_id": "uuid"}),
+    "long_term_goals": ("""
+        CREATE TABLE {table} (
+            id BLOB PRIMARY KEY,
+            hero_id BLOB NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            total_days INTEGER,
+            start_date INTEGER,
+            time_frame TEXT,
+            current_day INTEGER DEFAULT 1,
+            checked_days INTEGER DEFAULT 0,
+            missed_days INTEGER DEFAULT 0,
+            is_completed INTEGER DEFAULT 0,
+            daily_state TEXT DEFAULT 'pending',
+            last_update_date INTEGER,
+            completed_at INTEGER,
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE
+        )
+    """, {"id": "uuid", "hero_id": "uuid", "start_date": "time", "last_update_date": "time",
+          "completed_at": "time"}),
+    "current_enemies": ("""
+        CREATE TABLE {table} (
+            hero_id BLOB PRIMARY KEY,
+            id BLOB NOT NULL,
+            name TEXT,
+            rarity INTEGER,
+            level INTEGER,
+            current_hp INTEGER,
+            max_hp INTEGER,
+            damage INTEGER,
+            damage_type INTEGER,
+            reward_xp INTEGER,
+            reward_gold INTEGER,
+            drop_chance REAL,
+            image_path TEXT,
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE
+        )
+    """, {"hero_id": "uuid", "id": "uuid", "rarity": EnemyRarity, "damage_type": DamageType}),
+    "items_library": ("""
+        CREATE TABLE {table} (
+            id BLOB PRIMARY KEY,
+            name TEXT NOT NULL,
+            item_type INTEGER,
+            slot INTEGER,
+            weapon_class INTEGER,
+            weapon_hands INTEGER,
+            damage_type INTEGER,
+            bonus_str INTEGER DEFAULT 0,
+            bonus_int INTEGER DEFAULT 0,
+            bonus_dex INTEGER DEFAULT 0,
+            bonus_vit INTEGER DEFAULT 0,
+            bonus_def INTEGER DEFAULT 0,
+            base_dmg INTEGER DEFAULT 0,
+            double_attack_chance INTEGER DEFAULT 0,
+            price INTEGER DEFAULT 0,
+            level INTEGER DEFAULT 1,
+            image_path TEXT UNIQUE
+        )
+    """, {"id": "uuid", "item_type": ItemType, "slot": EquipmentSlot, "weapon_class": WeaponClass,
+          "weapon_hands": WeaponHandType, "damage_type": DamageType}),
+    "inventory": ("""
+        CREATE TABLE {table} (
+            id BLOB PRIMARY KEY,
+            hero_id BLOB NOT NULL,
+            item_id BLOB NOT NULL,
+            is_equipped INTEGER DEFAULT 0,
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE,
+            FOREIGN KEY (item_id) REFERENCES items_library (id)
+        )
+    """, {"id": "uuid", "hero_id": "uuid", "item_id": "uuid"}),
+    "goals_archive": ("""
+        CREATE TABLE {table} (
+            id BLOB PRIMARY KEY,
+            hero_id BLOB NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            deadline INTEGER,
+            difficulty INTEGER,
+            created_at INTEGER,
+            is_completed INTEGER DEFAULT 1,
+            penalty_applied INTEGER DEFAULT 0,
+            previous_state TEXT DEFAULT '',
+            progress REAL DEFAULT 0,
+            completed_at INTEGER,
+            archived_at INTEGER,
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE
+        )
+    """, {"id": "uuid", "hero_id": "uuid", "deadline": "time", "created_at": "time", "completed_at": "time",
+          "archived_at": "time"}),
+    "sub_goals_archive": ("""
+        CREATE TABLE {table} (
+            id BLOB PRIMARY KEY,
+            goal_id BLOB NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT DEFAULT '',
+            is_completed INTEGER DEFAULT 0,
+            FOREIGN KEY (goal_id) REFERENCES goals_archive (id) ON DELETE CASCADE
+        )
+    """, {"id": "uuid", "goal_id": "uuid"}),
+    "long_term_goals_archive": ("""
+        CREATE TABLE {table} (
+            id BLOB PRIMARY KEY,
+            hero_id BLOB NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            total_days INTEGER,
+            start_date INTEGER,
+            time_frame TEXT,
+            current_day INTEGER,
+            checked_days INTEGER,
+            missed_days INTEGER,
+            is_completed INTEGER DEFAULT 1,
+            daily_state TEXT,
+            last_update_date INTEGER,
+            completed_at INTEGER,
+            archived_at INTEGER,
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE
+        )
+    """, {"id": "uuid", "hero_id": "uuid", "start_date": "time", "last_update_date": "time",
+          "completed_at": "time", "archived_at": "time"}),
+    "hero_events": ("""
+        CREATE TABLE {table} (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            hero_id BLOB NOT NULL,
+            goal_id BLOB NOT NULL,
+            action TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            delta INTEGER DEFAULT 0,
+            payload TEXT DEFAULT '',
+            created_at INTEGER,
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE
+        )
+    """, {"hero_id": "uuid", "goal_id": "uuid", "created_at": "time"}),
+}
+
+
+def _convert_expr(column: str, conversion) -> str:
+    if conversion is None:
+        return column
+    if conversion == "uuid":
+        return f"_uuid_blob({column})"
+    if conversion == "time":
+        return f"_epoch({column})"
+    return f"_enum_code('{conversion.__name__}', {column})"
+
+
+@migration(8, "Компактне кодування: BLOB ID, коди Enum, час у мікросекундах", rebuilds_tables=True)
+def _compact_encoding(conn: sqlite3.Connection):
+    conn.create_function("_uuid_blob", 1, _uuid_blob, deterministic=True)
+    conn.create_function("_epoch", 1, _epoch, deterministic=True)
+    conn.create_function("_enum_code", 2, _enum_code, deterministic=True)
+
+    # Індекси і тригери (FTS) видаляються разом зі старими таблицями - відтворюємо їх після заміни
+    tables = tuple(_COMPACT_TABLES)
+    placeholders = ", ".join("?" * len(tables))
+    recreate = conn.execute(f"""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    """, tables).fetchall()
+    for kind, name, _ in recreate:
+        if kind == "trigger":
+            conn.execute(f"DROP TRIGGER {name}")
+
+    for table, (ddl, conversions) in _COMPACT_TABLES.items():
+        conn.execute(ddl.format(table=f"{table}_compact"))
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table}_compact)")]
+        # rowid зберігається: на ньому тримаються порядок підцілей та індекс пошуку goals_fts
+        select = ", ".join(_convert_expr(column, conversions.get(column)) for column in columns)
+        conn.execute(f"INSERT INTO {table}_compact (rowid, {', '.join(columns)}) "
+                     f"SELECT rowid, {select} FROM {table}")
+
+    for table in tables:
+        conn.execute(f"DROP TABLE {table}")
+    for table in tables:
+        conn.execute(f"ALTER TABLE {table}_compact RENAME TO {table}")
+    for _, _, sql in recreate:
+        conn.execute(sql)
+
+    # Рядки-сироти (без героя/цілі) з дуже старих БД недосяжні з застосунку, але не видаляються
+    return _quarantine_orphans(conn)
+
+
+def _quarantine_orphans(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    Переносить рядки, що порушують зовнішні ключі, у таблиці {table}_orphans (та сама структура,
+    без обмежень), щоб перевірка перед COMMIT пройшла, а дані лишились для ручного розбору.
+    Повторюється, доки порушень немає: перенесена ціль робить сиротами свої підцілі.
+    """
+    counts: Dict[str, int] = {}
+    while True:
+        orphans = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if not orphans:
+            return counts
+        # Рядок з кількома порушеними ключами повертається кілька разів
+        rows = list(dict.fromkeys((table, rowid) for table, rowid, _, _ in orphans))
+        for table in {table for table, _ in rows}:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table}_orphans AS SELECT * FROM {table} WHERE 0")
+        for table, rowid in rows:
+            conn.execute(f"INSERT INTO {table}_orphans SELECT * FROM {table} WHERE rowid = ?", (rowid,))
+            conn.execute(f"DELETE FROM {table} WHERE rowid = ?", (rowid,))
+            counts[table] = counts.get(table, 0) + 1
+
+
+# --- Лічильники підцілей (міграція 9) ---
+
+def _counter_update(goal_id: str, total: str, completed: str) -> str:
+    """
+    UPDATE цілі при зміні її підцілей: total/completed - вирази приросту лічильників.
+    Праві частини SET бачать старі значення рядка, тому progress рахується від нових лічильників явно.
+    Ціль без підцілей має прогрес 100/0 залежно від is_completed (як Goal.calculate_progress).
+    """
+    new_total = f"(total_subgoals + {total})"
+    new_completed = f"(completed_subgoals + {completed})"
+    return f"""
+        UPDATE goals SET
+            total_subgoals = {new_total},
+            completed_subgoals = {new_completed},
+            progress = CASE WHEN {new_total} > 0 THEN {new_completed} * 100.0 / {new_total}
+                            ELSE is_completed * 100.0 END
+        WHERE id = {goal_id};
+    """
+
+
+@migration(9, "Лічильники підцілей у цілях, підтримувані тригерами")
+def _sub_goal_counters(conn: sqlite3.Connection):
+    for table in ("goals", "goals_archive"):
+        _add_column(conn, table, "total_subgoals", "INTEGER NOT NULL DEFAULT 0")
+        _add_column(conn, table, "completed_subgoals", "INTEGER NOT NULL DEFAULT 0")
+
+    conn.execute("""
+        UPDATE goals SET
+            total_subgoals = (SELECT count(*) FROM sub_goals s WHERE s.goal_id = goals.id),
+            completed_subgoals = (SELECT count(*) FROM sub_goals s WHERE s.goal_id = goals.id AND s.is_completed)
+    """)
+    conn.execute("""
+        UPDATE goals_archive SET
+            total_subgoals = (SELECT count(*) FROM sub_goals_archive s WHERE s.goal_id = goals_archive.id),
+            completed_subgoals = (SELECT count(*) FROM sub_goals_archive s
+                                  WHERE s.goal_id = goals_archive.id AND s.is_completed)
+    """)
+    conn.execute("""
+        UPDATE goals SET progress = CASE WHEN total_subgoals > 0 THEN completed_subgoals * 100.0 / total_subgoals
+                                         ELSE is_completed * 100.0 END
+    """)
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS sub_goals_count_insert AFTER INSERT ON sub_goals BEGIN
+            {_counter_update("new.goal_id", "1", "new.is_completed")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS sub_goals_count_delete AFTER DELETE ON sub_goals BEGIN
+            {_counter_update("old.goal_id", "-1", "-old.is_completed")}
+        END
+    """)
+    # Перенесення підцілі в іншу ціль - зняти з old.goal_id і додати до new.goal_id
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS sub_goals_count_update AFTER UPDATE OF goal_id, is_completed ON sub_goals
+        WHEN old.goal_id IS NOT new.goal_id OR old.is_completed IS NOT new.is_completed BEGIN
+            {_counter_update("old.goal_id", "-1", "-old.is_completed")}
+            {_counter_update("new.goal_id", "1", "new.is_completed")}
+        END
+    """)
+
+
+@migration(10, "Матеріалізовані бонуси спорядження героя")
+def _equipment_bonuses(conn: sqlite3.Connection):
+    # Один рядок на героя: суми бонусів одягнених предметів. Оновлюється в транзакціях
+    # equip_item/unequip_item та сідера, читається одним пошуком за первинним ключем.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS hero_equipment_bonuses (
+            hero_id BLOB PRIMARY KEY,
+            bonus_str INTEGER NOT NULL DEFAULT 0,
+            bonus_int INTEGER NOT NULL DEFAULT 0,
+            bonus_dex INTEGER NOT NULL DEFAULT 0,
+            bonus_vit INTEGER NOT NULL DEFAULT 0,
+            bonus_def INTEGER NOT NULL DEFAULT 0,
+            base_dmg INTEGER NOT NULL DEFAULT 0,
+            double_attack_chance INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute("""
+        INSERT OR REPLACE INTO hero_equipment_bonuses (hero_id, bonus_str, bonus_int, bonus_dex, bonus_vit,
+                                                       bonus_def, base_dmg, double_attack_chance)
+        SELECT inv.hero_id, sum(lib.bonus_str), sum(lib.bonus_int), sum(lib.bonus_dex), sum(lib.bonus_vit),
+               sum(lib.bonus_def), sum(lib.base_dmg), sum(lib.double_attack_chance)
+        FROM inventory inv JOIN items_library lib ON lib.id = inv.item_id
+        WHERE inv.is_equipped = 1
+        GROUP BY inv.hero_id
+    """)
+
+
+# --- Вікна звичок у хвилинах доби (міграція 11) ---
+
+def _window_minute(time_frame, index):
+    """Хвилина доби початку (index=0) або кінця (index=1) вікна; None для невалідного рядка."""
+    try:
+        return parse_time_frame(time_frame)[index]
+    except ValueError:
+        return None
+
+
+@migration(11, "Вікна звичок у хвилинах доби")
+def _habit_windows(conn: sqlite3.Connection):
+    # Рядок time_frame лишається для відображення; перевірки тіку порівнюють цілі числа
+    conn.create_function("_window_minute", 2, _window_minute, deterministic=True)
+    for table in ("long_term_goals", "long_term_goals_archive"):
+        _add_column(conn, table, "window_start", "INTEGER")
+        _add_column(conn, table, "window_end", "INTEGER")
+        conn.execute(f"""
+            UPDATE {table} SET window_start = _window_minute(time_frame, 0),
+                               window_end = _window_minute(time_frame, 1)
+        """)
+
+
+@migration(12, "Дозаповнення вікон звичок")
+def _habit_windows_refill(conn: sqlite3.Connection):
+    # Вікна без хвилин: збіг початку і кінця (міграція 11 його ще відхиляла) та рядки,
+    # записані без вікна. Модель time_frame не розбирає - вікно має бути в БД.
+    conn.create_function("_window_minute", 2, _window_minute, deterministic=True)
+    for table in ("long_term_goals", "long_term_goals_archive"):
+        conn.execute(f"""
+            UPDATE {table} SET window_start = _window_minute(time_frame, 0),
+                               window_end = _window_minute(time_frame, 1)
+            WHERE window_start IS NULL AND time_frame != ''
+        """)
@@ -1,8 +1,9 @@
 import uuid
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import List, Optional
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
 from enum import Enum
+from .habit_window import GRACE_MINUTES, MINUTES_PER_DAY
 
 
 # --- Enums ---
@@ -185,18 +186,81 @@ class Goal:
     # НОВЕ ПОЛЕ: для збереження стану героя перед виконанням (JSON string)
     previous_state: str = ""
 
+    # Коли ціль виконано: після терміну зберігання виконана ціль переноситься в архів
+    completed_at: Optional[datetime] = None
+
+    # Лічильники підцілей: у БД їх ведуть тригери, при завантаженні вони читаються з goals,
+    # тож прогрес відомий і без завантаження самих підцілей. У пам'яті їх підтримують
+    # add_subgoal / remove_subgoal / set_subgoal_completed - змінюйте підцілі лише через них.
+    total_subgoals: int = 0
+    completed_subgoals: int = 0
+
+    # Стан, який востаннє був записаний у БД (заповнює StorageService).
+    # Дозволяє зберігати лише змінені підцілі.
+    _saved_state: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    # False - ціль завантажена без підцілей (лише лічильники), зберігати її не можна
+    _subgoals_loaded: bool = field(default=True, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.subgoals and not self.total_subgoals:
+            self.total_subgoals = len(self.subgoals)
+            self.completed_subgoals = sum(1 for sg in self.subgoals if sg.is_completed)
+
     def add_subgoal(self, subgoal: SubGoal):
         self.subgoals.append(subgoal)
+        self.total_subgoals += 1
+        if subgoal.is_completed:
+            self.completed_subgoals += 1
+
+    def remove_subgoal(self, subgoal: SubGoal):
+        self.subgoals.remove(subgoal)
+        self.total_subgoals -= 1
+        if subgoal.is_completed:
+            self.completed_subgoals -= 1
+
+    def set_subgoal_completed(self, subgoal: SubGoal, is_completed: bool):
+        if subgoal.is_completed != is_completed:
+            subgoal.is_completed = is_completed
+            self.completed_subgoals += 1 if is_completed else -1
 
     def calculate_progress(self) -> float:
-        if not self.subgoals: return 100.0 if self.is_completed else 0.0
-        return (sum(1 for sg in self.subgoals if sg.is_completed) / len(self.subgoals)) * 100.0
+        """Прогрес за лічильниками підцілей (O(1), разом зі змінами з UI, ще не збереженими)."""
+        if not self.total_subgoals: return 100.0 if self.is_completed else 0.0
+        return (self.completed_subgoals / self.total_subgoals) * 100.0
+
+    @property
+    def all_subgoals_done(self) -> bool:
+        return self.total_subgoals > 0 and self.completed_subgoals == self.total_subgoals
 
     def is_overdue(self) -> bool:
         if self.is_completed: return False
         return datetime.now() > self.deadline
 
 
+@dataclass
+class GoalSearchHit:
+    """Результат повнотекстового пошуку: тексти з позначеними збігами та релевантність (менше - краще)."""
+    goal_id: uuid.UUID
+    title: str
+    description: str
+    subgoals: str
+    score: float
+
+
+@dataclass
+class HeroEvent:
+    """
+    Запис журналу змін героя: одна типізована дельта (kind - поле героя, "enemy_hp"
+    або "enemy_replaced" з попереднім ворогом у payload). Журнал лише доповнюється.
+    """
+    goal_id: str
+    action: str  # "complete" або "undo"
+    kind: str
+    delta: int = 0
+    payload: str = ""
+    seq: Optional[int] = None
+
+
 @dataclass
 class LongTermGoal:
     title: str
@@ -213,6 +277,42 @@ class LongTermGoal:
     last_update_date: Optional[datetime] = None
     id: uuid.UUID = field(default_factory=uuid.uuid4)
     last_checkin: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    # Вікно звички у хвилинах від початку доби (розбирається з time_frame один раз при створенні/редагуванні,
+    # для наявних рядків - міграціями 11-12)
+    window_start: Optional[int] = None
+    window_end: Optional[int] = None
 
     def calculate_progress(self) -> float:
-        return (self.current_day / self.total_days) * 100.0
\ No newline at end of file
+        return (self.current_day / self.total_days) * 100.0
+
+    @property
+    def has_window(self) -> bool:
+        return self.window_start is not None and self.window_end is not None
+
+    @property
+    def crosses_midnight(self) -> bool:
+        return self.has_window and self.window_end < self.window_start
+
+    def habit_day(self, moment: datetime) -> date:
+        """
+        День, до вікна якого належить момент. Для вікна через північ хвилини після опівночі
+        до кінця вікна (з толерантністю) ще належать вікну попереднього дня.
+        """
+        if self.crosses_midnight and moment.hour * 60 + moment.minute < self.window_end + GRACE_MINUTES:
+            return moment.date() - timedelta(days=1)
+        return moment.date()
+
+    def day_boundary(self, day: date) -> datetime:
+        """Момент, з якого починається день звички day (див. habit_day)."""
+        boundary = datetime.combine(day, time.min)
+        if self.crosses_midnight:
+            boundary += timedelta(minutes=self.window_end + GRACE_MINUTES)
+        return boundary
+
+    def window_deadlines(self, day: date) -> Tuple[datetime, datetime]:
+        """Моменти (старт, завершення), після яких вікно дня day вважається пропущеним."""
+        midnight = datetime.combine(day, time.min)
+        end = self.window_end + MINUTES_PER_DAY if self.crosses_midnight else self.window_end
+        return (midnight + timedelta(minutes=self.window_start + GRACE_MINUTES),
+                midnight + timedelta(minutes=end + GRACE_MINUTES))
\ No newline at end of file
@@ -0,0 +1,195 @@
+import uuid
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+from .models import (
+    Goal, SubGoal, Hero, Difficulty, LongTermGoal, HeroClass, Gender,
+    Enemy, EnemyRarity, DamageType, Item, ItemType, EquipmentSlot, WeaponClass, WeaponHandType, InventoryItem,
+    HeroEvent
+)
+
+
+# --- Компактне кодування значень у БД ---
+# ID - 16 байт (BLOB), Enum - малі цілі коди, час - ціле число мікросекунд від 1970-01-01
+# (наївний локальний час, як у моделях; порівнюється в SQL як число).
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+@lru_cache(maxsize=None)
+def enum_codes(enum_cls) -> Dict[Any, int]:
+    """
+    Член Enum -> код у БД. Числові Enum (Difficulty) зберігаються своїм значенням,
+    решта - порядковим номером в оголошенні (нові члени додаються лише в кінець!).
+    """
+    return {member: member.value if isinstance(member.value, int) else index
+            for index, member in enumerate(enum_cls, start=1)}
+
+
+def uuid_to_db(value) -> Optional[bytes]:
+    """UUID або його рядок -> 16 байт."""
+    if value is None:
+        return None
+    return (value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))).bytes
+
+
+def datetime_to_db(value: Optional[datetime]) -> Optional[int]:
+    return None if value is None else (value - _EPOCH) // _MICROSECOND
+
+
+def enum_to_db(member) -> Optional[int]:
+    return None if member is None else enum_codes(type(member))[member]
+
+
+# --- Декодери значень колонок ---
+
+def enum_decoder(enum_cls, strict: bool = True) -> Callable[[Any], Any]:
+    """
+    Декодер коду з БД у член Enum через словник, побудований один раз.
+    strict=True - невідомий код дає ValueError (як Enum(value)),
+    strict=False - повертає None.
+    """
+    table = {code: member for member, code in enum_codes(enum_cls).items()}
+    if not strict:
+        return table.get
+
+    def decode(value):
+        try:
+            return table[value]
+        except KeyError:
+            raise ValueError(f"{value!r} is not a valid {enum_cls.__name__}") from None
+
+    return decode
+
+
+def _uuid_from_db(value: bytes) -> uuid.UUID:
+    return uuid.UUID(bytes=value)
+
+
+def _datetime_from_db(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def _datetime_or_none(value: Optional[int]) -> Optional[datetime]:
+    return None if value is None else _datetime_from_db(value)
+
+
+def _uuid_text_from_db(value: bytes) -> str:
+    return str(uuid.UUID(bytes=value))
+
+
+def _text_or_empty(value: Optional[str]) -> str:
+    # У старих БД текстові колонки могли бути NULL
+    return value if value else ""
+
+
+UUID = _uuid_from_db
+UUID_TEXT = _uuid_text_from_db
+DATETIME = _datetime_from_db
+OPTIONAL_DATETIME = _datetime_or_none
+BOOL = bool
+TEXT_OR_EMPTY = _text_or_empty
+
+
+class RowMapper:
+    """
+    Перетворює рядок БД на об'єкт моделі за іменами колонок.
+    Для кожного набору колонок (cursor.description) один раз генерується функція
+    виду `lambda row: Model(a=row[0], b=dec_b(row[1]), ...)` - без позиційних
+    індексів у коді сховища і без пошуку по Enum на кожне поле.
+    Колонки, яких немає в схемі моделі (напр. hero_id), пропускаються.
+    """
+
+    def __init__(self, model, columns: Dict[str, Optional[Callable]]):
+        self.model = model
+        # колонка -> декодер (None - значення як є); ім'я колонки = ім'я поля моделі
+        self.columns = columns
+        self._compiled: Dict[Tuple[Tuple[str, ...], int], Callable] = {}
+
+    def for_cursor(self, cursor, offset: int = 0) -> Callable[[tuple], Any]:
+        """Мапер для результату щойно виконаного запиту (колонки, починаючи з offset)."""
+        names = tuple(d[0] for d in cursor.description[offset:])
+        return self.compile(names, offset)
+
+    def compile(self, names: Sequence[str], offset: int = 0) -> Callable[[tuple], Any]:
+        key = (tuple(names), offset)
+        mapper = self._compiled.get(key)
+        if mapper is None:
+            mapper = self._compiled[key] = self._generate(key[0], offset)
+        return mapper
+
+    def _generate(self, names: Tuple[str, ...], offset: int) -> Callable[[tuple], Any]:
+        namespace = {"_model": self.model}
+        args = []
+        for index, name in enumerate(names, start=offset):
+            if name not in self.columns:
+                continue
+            decoder = self.columns[name]
+            if decoder is None:
+                args.append(f"{name}=row[{index}]")
+            else:
+                namespace[f"_dec_{name}"] = decoder
+                args.append(f"{name}=_dec_{name}(row[{index}])")
+        source = f"def _map(row):\n    return _model({', '.join(args)})\n"
+        exec(source, namespace)
+        return namespace["_map"]
+
+
+# --- Схеми моделей ---
+
+HERO_MAPPER = RowMapper(Hero, {
+    "id": UUID, "nickname": None, "hero_class": enum_decoder(HeroClass), "gender": enum_decoder(Gender),
+    "appearance": None, "level": None, "current_xp": None, "xp_to_next_level": None, "gold": None,
+    "streak_days": None, "hp": None, "max_hp": None, "stat_points": None, "str_stat": None, "int_stat": None,
+    "dex_stat": None, "vit_stat": None, "def_stat": None, "mana": None, "max_mana": None,
+    "buff_multiplier": None, "last_login": DATETIME,
+})
+
+ITEM_MAPPER = RowMapper(Item, {
+    "id": UUID, "name": None,
+    "item_type": enum_decoder(ItemType, strict=False), "slot": enum_decoder(EquipmentSlot, strict=False),
+    "weapon_class": enum_decoder(WeaponClass, strict=False),
+    "weapon_hands": enum_decoder(WeaponHandType, strict=False),
+    "damage_type": enum_decoder(DamageType, strict=False),
+    "bonus_str": None, "bonus_int": None, "bonus_dex": None, "bonus_vit": None, "bonus_def": None,
+    "base_dmg": None, "double_attack_chance": None, "price": None, "level": None, "image_path": None,
+})
+
+ENEMY_MAPPER = RowMapper(Enemy, {
+    "id": UUID, "name": None, "rarity": enum_decoder(EnemyRarity), "level": None, "current_hp": None,
+    "max_hp": None, "damage": None, "damage_type": enum_decoder(DamageType), "reward_xp": None,
+    "reward_gold": None, "drop_chance": None, "image_path": None,
+})
+
+GOAL_MAPPER = RowMapper(Goal, {
+    "id": UUID, "title": None, "description": None, "deadline": DATETIME,
+    "difficulty": enum_decoder(Difficulty), "created_at": DATETIME, "is_completed": BOOL,
+    "penalty_applied": BOOL, "previous_state": TEXT_OR_EMPTY, "completed_at": OPTIONAL_DATETIME,
+    "total_subgoals": None, "completed_subgoals": None,
+})
+
+SUB_GOAL_MAPPER = RowMapper(SubGoal, {
+    "id": UUID, "title": None, "description": TEXT_OR_EMPTY, "is_completed": BOOL,
+})
+
+LONG_TERM_GOAL_MAPPER = RowMapper(LongTermGoal, {
+    "id": UUID, "title": None, "description": None, "total_days": None, "start_date": DATETIME,
+    "time_frame": None, "current_day": None, "checked_days": None, "missed_days": None,
+    "is_completed": BOOL, "daily_state": None, "last_update_date": OPTIONAL_DATETIME,
+    "completed_at": OPTIONAL_DATETIME, "window_start": None, "window_end": None,
+})
+
+HERO_EVENT_MAPPER = RowMapper(HeroEvent, {
+    "seq": None, "goal_id": UUID_TEXT, "action": None, "kind": None, "delta": None, "payload": TEXT_OR_EMPTY,
+})
+
+
+def inventory_mapper(cursor) -> Callable[[tuple], InventoryItem]:
+    """Мапер рядка інвентаря: перші дві колонки - запис інвентаря, далі - предмет бібліотеки."""
+    to_item = ITEM_MAPPER.for_cursor(cursor, offset=2)
+
+    def _map(row):
+        return InventoryItem(item=to_item(row), is_equipped=BOOL(row[1]), id=UUID(row[0]))
+
+    return _map
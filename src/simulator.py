@@ -0,0 +1,219 @@
+"""
+Безголовий симулятор часу для GoalService: тижні та місяці синтетичної активності
+(квести, виконання, звички, пропущені дедлайни) без Qt і без очікування реального часу.
+
+    python -m src.simulator --days 365 --seed 1
+
+Швидкість - близько 500 днів/с (рік симуляції менш ніж за секунду): кожна з ~10 дій гравця
+за день - справжня транзакція SQLite, і саме вони займають більшість часу.
+"""
+import argparse
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from .models import Hero, HeroClass, Gender, Difficulty
+from .storage import StorageService
+from .logic import GoalService
+
+# Після дедлайну подія розкладу настає, коли now > due
+_EPSILON = timedelta(microseconds=1)
+
+
+class SimulatedClock:
+    """Годинник, який рухається лише вперед за командою симулятора (GoalService(clock=...))."""
+
+    def __init__(self, start: datetime):
+        self.current = start
+
+    def __call__(self) -> datetime:
+        return self.current
+
+    def advance_to(self, moment: datetime):
+        if moment > self.current:
+            self.current = moment
+
+
+@dataclass
+class SimulationProfile:
+    """Поведінка синтетичного гравця."""
+    goals_per_day: float = 1.5        # Середня кількість нових квестів за день
+    goal_deadline_days: int = 2       # Дедлайн квесту - через стільки днів о 18:00
+    completion_rate: float = 0.75     # Частка квестів, виконаних до дедлайну
+    habits: int = 2                   # Скільки звичок ведеться одночасно
+    habit_days: int = 21              # Тривалість челенджу звички
+    checkin_rate: float = 0.8         # Частка днів, коли звичку виконано у вікні
+    skip_day_rate: float = 0.05       # Частка днів, коли застосунок не відкривали зовсім
+
+
+@dataclass
+class DaySnapshot:
+    """Стан героя та ворога наприкінці симульованого дня (о 24:00)."""
+    day: int
+    date: date
+    level: int
+    current_xp: int
+    gold: int
+    hp: int
+    max_hp: int
+    enemy: str
+    enemy_hp: int
+    goals_completed: int
+    habit_checkins: int
+    alerts: int
+
+
+@dataclass
+class SimulationReport:
+    """Траєкторія симуляції та її швидкість."""
+    snapshots: List[DaySnapshot] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def days_per_second(self) -> float:
+        return len(self.snapshots) / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def __str__(self):
+        if not self.snapshots:
+            return "Симуляція не виконувалась."
+        first, last = self.snapshots[0], self.snapshots[-1]
+        lines = [
+            f"Симуляція: {len(self.snapshots)} днів ({first.date} - {last.date}) "
+            f"за {self.elapsed_seconds:.2f} с ({self.days_per_second:.0f} днів/с)",
+            f"  Квестів виконано: {sum(s.goals_completed for s in self.snapshots)}, "
+            f"звичок зараховано: {sum(s.habit_checkins for s in self.snapshots)}, "
+            f"штрафів: {sum(s.alerts for s in self.snapshots)}",
+            f"  Герой: рівень {last.level}, XP {last.current_xp}, золото {last.gold}, HP {last.hp}/{last.max_hp}",
+            f"  Мінімум HP: {min(s.hp for s in self.snapshots)}, ворог: {last.enemy} ({last.enemy_hp} HP)",
+        ]
+        return "\n".join(lines)
+
+
+class Simulator:
+    """
+    Веде GoalService через дні симуляції на власному годиннику.
+    Перевірки дедлайнів виконуються так само, як у MainWindow: тік запускається одразу
+    після кожної події розкладу (next_deadline), тож штрафи настають у той самий момент.
+    seed задає власний генератор random.Random симулятора: від нього залежать бій, вороги
+    та поведінка гравця, а глобальний random залишається недоторканим.
+    """
+
+    def __init__(self, profile: Optional[SimulationProfile] = None, start: Optional[datetime] = None,
+                 seed: Optional[int] = None, db_path: str = ":memory:", items_path: Optional[str] = None):
+        self.profile = profile or SimulationProfile()
+        self.rng = random.Random(seed)
+        start = start or datetime.combine(date.today(), datetime.min.time())
+        self.clock = SimulatedClock(start)
+        self.storage = StorageService(db_path, items_path=items_path)
+
+        hero = Hero("Simulated", HeroClass.WARRIOR, Gender.MALE, "", last_login=start)
+        self.storage.create_hero(hero)
+        self.service = GoalService(self.storage, str(hero.id), clock=self.clock, rng=self.rng)
+        # Коли гравець виконає квест (None - дедлайн буде пропущено)
+        self._plans = {}
+        self._alerts = 0
+
+    def close(self):
+        self.service.flush()
+        self.storage.close()
+
+    def run(self, days: int) -> SimulationReport:
+        report = SimulationReport()
+        started = time.perf_counter()
+        for _ in range(days):
+            report.snapshots.append(self._simulate_day(len(report.snapshots) + 1))
+        report.elapsed_seconds = time.perf_counter() - started
+        return report
+
+    def _advance_to(self, moment: datetime):
+        """Переводить годинник до moment, виконуючи тіки для всіх подій розкладу на шляху."""
+        service = self.service
+        while True:
+            due = service.next_deadline()
+            if due is None or due >= moment:
+                break
+            self.clock.advance_to(due + _EPSILON)
+            self._alerts += len(service.run_tick().alerts)
+        self.clock.advance_to(moment)
+
+    def _simulate_day(self, day_number: int) -> DaySnapshot:
+        profile, service = self.profile, self.service
+        today = self.clock().date()
+
+        def at(hours: int, minutes: int = 0) -> datetime:
+            return datetime.combine(today, datetime.min.time()) + timedelta(hours=hours, minutes=minutes)
+
+        self._alerts = 0
+        goals_completed = habit_checkins = 0
+        app_opened = self.rng.random() >= profile.skip_day_rate
+
+        if app_opened:
+            # Ранок: нові квести
+            self._advance_to(at(7))
+            service.archive_if_due()
+            for _ in range(self._goals_for_today()):
+                self._create_goal(today)
+
+            # Вікно звичок; завершені челенджі замінюються новими (стартують завтра)
+            self._advance_to(at(8, 2))
+            habits = service.list_long_term_goals()
+            for _ in range(profile.habits - len(habits)):
+                service.create_long_term_goal("Звичка", "", profile.habit_days, "08:00 - 09:00")
+            for habit in habits:
+                if habit.daily_state == 'pending' and self.rng.random() < profile.checkin_rate:
+                    service.start_habit(habit)
+            self._advance_to(at(8, 40))
+            for habit in habits:
+                if habit.daily_state == 'started':
+                    service.finish_habit(habit)
+                    habit_checkins += 1
+
+            # День: квести, заплановані на сьогодні
+            self._advance_to(at(12))
+            for goal in service.get_all_goals():
+                if not goal.is_completed and self._plans.get(str(goal.id)) == today:
+                    del self._plans[str(goal.id)]
+                    service.complete_goal(goal)
+                    goals_completed += 1
+
+            self._advance_to(at(24))
+        else:
+            # Застосунок закрито: жодних тіків, пропуски наздоганяються при наступному відкритті
+            self.clock.advance_to(at(24))
+
+        # Спостереження не змінює стан: без _check_streak та генерації ворога
+        hero, enemy = service.repo.get_hero(), service.repo.get_enemy()
+        return DaySnapshot(day_number, today, hero.level, hero.current_xp, hero.gold, hero.hp, hero.max_hp,
+                           enemy.name if enemy else "", enemy.current_hp if enemy else 0,
+                           goals_completed, habit_checkins, self._alerts)
+
+    def _goals_for_today(self) -> int:
+        whole, fraction = divmod(self.profile.goals_per_day, 1)
+        return int(whole) + (1 if self.rng.random() < fraction else 0)
+
+    def _create_goal(self, today: date):
+        profile = self.profile
+        deadline = datetime.combine(today + timedelta(days=profile.goal_deadline_days), datetime.min.time())
+        difficulty = self.rng.choice(list(Difficulty))
+        goal = self.service.create_goal("Квест", "", deadline + timedelta(hours=18), difficulty)
+        if self.rng.random() < profile.completion_rate:
+            self._plans[str(goal.id)] = today + timedelta(days=self.rng.randint(0, profile.goal_deadline_days))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Безголова симуляція GoalService у прискореному часі.")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--db", default=":memory:", help="Файл БД (за замовчуванням - у пам'яті)")
+    args = parser.parse_args(argv)
+
+    simulator = Simulator(seed=args.seed, db_path=args.db)
+    try:
+        print(simulator.run(args.days))
+    finally:
+        simulator.close()
+
+
+if __name__ == "__main__":
+    main()
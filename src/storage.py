@@ -1,14 +1,22 @@
+import hashlib
 import sqlite3
+import threading
 import uuid
 import os
 import sys
 import re
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional
+from typing import Callable, List, Optional, Tuple
+from .item_catalogue import ItemCatalogue
+from .migrations import MigrationReport, migrate
+from .row_mappers import (
+    HERO_MAPPER, ITEM_MAPPER, ENEMY_MAPPER, GOAL_MAPPER, SUB_GOAL_MAPPER, LONG_TERM_GOAL_MAPPER,
+    HERO_EVENT_MAPPER, inventory_mapper, uuid_to_db, datetime_to_db, enum_to_db
+)
 from .models import (
-    Goal, SubGoal, Hero, Difficulty, LongTermGoal, HeroClass, Gender,
-    Enemy, EnemyRarity, DamageType, Item, ItemType, EquipmentSlot, InventoryItem,
-    WeaponClass, WeaponHandType
+    Goal, Hero, LongTermGoal, Enemy, DamageType, Item, ItemType, EquipmentSlot, InventoryItem,
+    WeaponClass, WeaponHandType, GoalSearchHit, HeroEvent
 )
 
 
@@ -16,155 +24,259 @@ def get_project_root():
     return os.path.dirname(os.path.abspath(sys.argv[0]))
 
 
+# Ім'я файлу предмета: Назва_STR_INT_DEX_VIT_DEF[_DOUBLE_ATTACK].png
+ITEM_PATTERN_6 = re.compile(r"^(.*)_(\d+)_(\d+)_(\d+)_(\d+)_(\d+)_(\d+)\.png$", re.IGNORECASE)
+ITEM_PATTERN_5 = re.compile(r"^(.*)_(\d+)_(\d+)_(\d+)_(\d+)_(\d+)\.png$", re.IGNORECASE)
+
+ITEMS_FINGERPRINT_KEY = "items_fingerprint"
+
+# Межі збігу у highlight/snippet результатів search_goals (UI замінює їх на свою розмітку)
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+GOAL_COLUMNS = ("id, title, description, deadline, difficulty, created_at, is_completed, penalty_applied, "
+                "previous_state, progress, completed_at, total_subgoals, completed_subgoals")
+LONG_TERM_GOAL_COLUMNS = ("id, hero_id, title, description, total_days, start_date, time_frame, current_day, "
+                          "checked_days, missed_days, is_completed, daily_state, last_update_date, completed_at, "
+                          "window_start, window_end")
+
+# Колонка hero_equipment_bonuses/items_library -> ключ словника бонусів спорядження
+EQUIPMENT_BONUS_KEYS = {
+    "bonus_str": "str", "bonus_int": "int", "bonus_dex": "dex", "bonus_vit": "vit", "bonus_def": "def",
+    "base_dmg": "base_dmg", "double_attack_chance": "double_attack_chance",
+}
+
+# Архів переглядається від нещодавно виконаних до старих
+ARCHIVE_ORDER = (("completed_at", True), ("id", True))
+
+# Режими сортування сторінок цілей: (колонка, за спаданням). Повторюють сортування QuestTab;
+# id - тай-брейк, щоб ключ курсора був унікальним. Під кожен режим є індекс (міграція 4).
+GOAL_SORT_ORDERS = {
+    "deadline_asc": (("is_completed", False), ("deadline", False), ("id", False)),
+    "deadline_desc": (("is_completed", True), ("deadline", True), ("id", True)),
+    "difficulty": (("is_completed", False), ("difficulty", True), ("id", True)),
+    "progress": (("is_completed", False), ("progress", True), ("id", True)),
+    "created": (("is_completed", True), ("created_at", True), ("id", True)),
+}
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    З'єднання, яке живе весь час роботи StorageService.
+    close() нічого не робить: закриває з'єднання лише сам StorageService.close().
+    """
+
+    def close(self):
+        pass
+
+    def force_close(self):
+        super().close()
+
+
 class StorageService:
-    def __init__(self, db_path: str):
+    # Налаштування, які застосовуються один раз при відкритті з'єднання
+    PRAGMAS = (
+        "PRAGMA foreign_keys = ON",
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA busy_timeout = 5000",
+    )
+
+    def __init__(self, db_path: str, items_path: Optional[str] = None):
         self.db_path = db_path
+        self.items_path = items_path or os.path.join(get_project_root(), "assets", "items")
+        # Одне постійне з'єднання на потік (GUI-потік, Qt worker-и тощо)
+        self._local = threading.local()
+        self._connections = []  # [(thread, conn)] - для close()
+        self._lock = threading.Lock()
+        # Каталог предметів (спільний для всіх героїв); None - перечитати при наступному зверненні
+        self._item_catalogue: Optional[ItemCatalogue] = None
         self.init_db()
         self.seed_items_from_folder()
 
-    def _get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
-
-    def init_db(self):
-        conn = self._get_connection()
-        cursor = conn.cursor()
+    def __enter__(self):
+        return self
 
-        # Heroes
-        cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS heroes (
-                        id TEXT PRIMARY KEY,
-                        nickname TEXT UNIQUE NOT NULL,
-                        hero_class TEXT,
-                        gender TEXT,
-                        appearance TEXT,
-                        level INTEGER DEFAULT 1,
-                        current_xp INTEGER DEFAULT 0,
-                        xp_to_next_level INTEGER DEFAULT 100,
-                        gold INTEGER DEFAULT 0,
-                        streak_days INTEGER DEFAULT 0,
-                        hp INTEGER DEFAULT 100,
-                        max_hp INTEGER DEFAULT 100,
-                        stat_points INTEGER DEFAULT 0,
-                        str_stat INTEGER DEFAULT 0,
-                        int_stat INTEGER DEFAULT 0,
-                        dex_stat INTEGER DEFAULT 0,
-                        vit_stat INTEGER DEFAULT 0,
-                        def_stat INTEGER DEFAULT 0,
-                        mana INTEGER DEFAULT 10,
-                        max_mana INTEGER DEFAULT 10,
-                        buff_multiplier REAL DEFAULT 1.0,
-                        last_login TEXT
-                    )
-                """)
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
 
-        # Goals (з полем previous_state)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS goals (
-                id TEXT PRIMARY KEY, 
-                hero_id TEXT NOT NULL, 
-                title TEXT NOT NULL, 
-                description TEXT, 
-                deadline TEXT, 
-                difficulty INTEGER, 
-                created_at TEXT, 
-                is_completed INTEGER DEFAULT 0, 
-                penalty_applied INTEGER DEFAULT 0, 
-                previous_state TEXT DEFAULT '',
-                FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE
-            )
-        """)
-
-        # Міграція для goals (якщо бази вже створені)
-        try:
-            cursor.execute("ALTER TABLE goals ADD COLUMN previous_state TEXT DEFAULT ''")
-        except sqlite3.OperationalError:
-            pass
-
-        # Sub Goals
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sub_goals (
-                id TEXT PRIMARY KEY, 
-                goal_id TEXT NOT NULL, 
-                title TEXT NOT NULL, 
-                description TEXT DEFAULT '',
-                is_completed INTEGER DEFAULT 0, 
-                FOREIGN KEY (goal_id) REFERENCES goals (id) ON DELETE CASCADE
-            )
-        """)
-
-        # Міграція для sub_goals
-        try:
-            cursor.execute("ALTER TABLE sub_goals ADD COLUMN description TEXT DEFAULT ''")
-        except sqlite3.OperationalError:
-            pass
-
-        cursor.execute(
-            "CREATE TABLE IF NOT EXISTS long_term_goals (id TEXT PRIMARY KEY, hero_id TEXT NOT NULL, title TEXT NOT NULL, description TEXT, total_days INTEGER, start_date TEXT, time_frame TEXT, current_day INTEGER DEFAULT 1, checked_days INTEGER DEFAULT 0, missed_days INTEGER DEFAULT 0, is_completed INTEGER DEFAULT 0, daily_state TEXT DEFAULT 'pending', last_update_date TEXT, FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE)")
-        cursor.execute(
-            "CREATE TABLE IF NOT EXISTS current_enemies (hero_id TEXT PRIMARY KEY, id TEXT NOT NULL, name TEXT, rarity TEXT, level INTEGER, current_hp INTEGER, max_hp INTEGER, damage INTEGER, damage_type TEXT, reward_xp INTEGER, reward_gold INTEGER, drop_chance REAL, image_path TEXT, FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE)")
+    def _get_connection(self) -> PooledConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+        return conn
 
-        # Items Library
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS items_library (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                item_type TEXT,
-                slot TEXT,
-                weapon_class TEXT,
-                weapon_hands TEXT,
-                damage_type TEXT,
-                bonus_str INTEGER DEFAULT 0,
-                bonus_int INTEGER DEFAULT 0,
-                bonus_dex INTEGER DEFAULT 0,
-                bonus_vit INTEGER DEFAULT 0,
-                bonus_def INTEGER DEFAULT 0,
-                base_dmg INTEGER DEFAULT 0,
-                double_attack_chance INTEGER DEFAULT 0,
-                price INTEGER DEFAULT 0,
-                level INTEGER DEFAULT 1,
-                image_path TEXT UNIQUE
-            )
-        """)
+    def _open_connection(self) -> PooledConnection:
+        # check_same_thread=False лише для того, щоб close() міг закрити з'єднання
+        # інших потоків; кожне з'єднання використовується тільки своїм потоком.
+        # isolation_level=None: транзакціями керує лише transaction(), без неявних BEGIN
+        conn = sqlite3.connect(self.db_path, factory=PooledConnection, check_same_thread=False,
+                               isolation_level=None)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+
+        current = threading.current_thread()
+        with self._lock:
+            # Прибираємо з'єднання потоків, які вже завершились
+            alive = []
+            for thread, old_conn in self._connections:
+                if thread.is_alive():
+                    alive.append((thread, old_conn))
+                else:
+                    old_conn.force_close()
+            alive.append((current, conn))
+            self._connections = alive
+        return conn
 
+    @contextmanager
+    def transaction(self):
+        """
+        Одиниця роботи: всі записи всередині блоку фіксуються одним COMMIT.
+        Вкладені блоки стають SAVEPOINT-ами, тож методи сховища, викликані
+        всередині дії сервісу, не фіксують зміни окремо.
+        Блок - завжди запис, тому BEGIN IMMEDIATE: блокування запису береться одразу
+        (з очікуванням busy_timeout), а не посеред транзакції, де WAL повертає SQLITE_BUSY без очікування.
+        """
+        conn = self._get_connection()
+        depth = getattr(self._local, "tx_depth", 0)
+        savepoint = f"sp_{depth}"
+        conn.execute("BEGIN IMMEDIATE" if depth == 0 else f"SAVEPOINT {savepoint}")
+        self._local.tx_depth = depth + 1
         try:
-            cursor.execute("ALTER TABLE items_library ADD COLUMN double_attack_chance INTEGER DEFAULT 0")
-        except sqlite3.OperationalError:
-            pass
+            yield conn
+        except BaseException:
+            self._local.tx_depth = depth
+            # Колбеки відкоченого рівня (і вкладених у нього) не виконуються
+            callbacks = self._commit_callbacks()
+            callbacks[:] = [(level, callback) for level, callback in callbacks if level <= depth]
+            if depth == 0:
+                conn.rollback()
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+        else:
+            self._local.tx_depth = depth
+            if depth == 0:
+                conn.commit()
+                callbacks = self._commit_callbacks()
+                pending, callbacks[:] = list(callbacks), []
+                for _, callback in pending:
+                    callback()
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+
+    def after_commit(self, callback: Callable[[], None]):
+        """
+        Виконує callback, коли зміни поточної транзакції зафіксовано (поза транзакцією - одразу).
+        Якщо транзакцію (або SAVEPOINT, у якому зареєстровано колбек) відкочено, колбек відкидається.
+        """
+        depth = getattr(self._local, "tx_depth", 0)
+        if depth == 0:
+            callback()
+        else:
+            self._commit_callbacks().append((depth, callback))
+
+    def _commit_callbacks(self) -> list:
+        callbacks = getattr(self._local, "commit_callbacks", None)
+        if callbacks is None:
+            callbacks = self._local.commit_callbacks = []
+        return callbacks
+
+    def close(self):
+        """Закриває всі з'єднання. Наступний запит відкриє нове з'єднання."""
+        with self._lock:
+            for _, conn in self._connections:
+                conn.force_close()
+            self._connections = []
+            self._local = threading.local()
+
+    def init_db(self) -> MigrationReport:
+        """
+        Застосовує міграції схеми (див. src/migrations.py).
+        Звіт повертається і зберігається в self.migration_report - показувати його вирішує викликач.
+        """
+        self.migration_report = migrate(self._get_connection())
+        return self.migration_report
+
+    def seed_items_from_folder(self) -> dict:
+        """
+        Синхронізує бібліотеку предметів з папкою assets/items.
+        Відбиток папки (імена, розміри, час зміни файлів) зберігається в БД:
+        якщо папка не змінилась - нічого не робимо, інакше обробляємо лише
+        додані, змінені та видалені файли в одній транзакції.
+        """
+        summary = {"added": 0, "changed": 0, "removed": 0}
+        if not os.path.exists(self.items_path): return summary
+
+        current = {}
+        with os.scandir(self.items_path) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    current[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        fingerprint = hashlib.sha1(repr(sorted(current.items())).encode("utf-8")).hexdigest()
 
-        # Inventory
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS inventory (
-                id TEXT PRIMARY KEY,
-                hero_id TEXT NOT NULL,
-                item_id TEXT NOT NULL,
-                is_equipped INTEGER DEFAULT 0,
-                FOREIGN KEY (hero_id) REFERENCES heroes (id) ON DELETE CASCADE,
-                FOREIGN KEY (item_id) REFERENCES items_library (id)
-            )
-        """)
-
-        conn.commit()
-        conn.close()
-
-    def seed_items_from_folder(self):
-        base_path = get_project_root()
-        items_path = os.path.join(base_path, "assets", "items")
-
-        if not os.path.exists(items_path): return
-
-        files = os.listdir(items_path)
         conn = self._get_connection()
         cursor = conn.cursor()
+        cursor.execute("SELECT value FROM app_meta WHERE key = ?", (ITEMS_FINGERPRINT_KEY,))
+        row = cursor.fetchone()
+        if row and row[0] == fingerprint:
+            return summary
 
-        pattern_6 = re.compile(r"^(.*)_(\d+)_(\d+)_(\d+)_(\d+)_(\d+)_(\d+)\.png$", re.IGNORECASE)
-        pattern_5 = re.compile(r"^(.*)_(\d+)_(\d+)_(\d+)_(\d+)_(\d+)\.png$", re.IGNORECASE)
+        cursor.execute("SELECT image_path, size, mtime_ns FROM items_manifest")
+        stored = {name: (size, mtime_ns) for name, size, mtime_ns in cursor.fetchall()}
 
-        for filename in files:
-            match = pattern_6.match(filename)
-            double_attack = 0
+        added = [name for name in current if name not in stored]
+        changed = [name for name in current if name in stored and stored[name] != current[name]]
+        removed = [name for name in stored if name not in current]
 
+        with self.transaction() as conn:
+            for filename in added + changed:
+                self._seed_item_file(cursor, filename)
+                size, mtime_ns = current[filename]
+                cursor.execute(
+                    "INSERT OR REPLACE INTO items_manifest (image_path, size, mtime_ns) VALUES (?, ?, ?)",
+                    (filename, size, mtime_ns))
+
+            for filename in changed:
+                # Бонуси предмета могли змінитись - перераховуємо героїв, на яких він одягнений
+                self._refresh_equipment_bonuses(conn, """
+                    SELECT inv.hero_id FROM items_library lib JOIN inventory inv ON inv.item_id = lib.id
+                    WHERE lib.image_path = ? AND inv.is_equipped = 1
+                """, (filename,))
+
+            for filename in removed:
+                # Предмети, які вже є в чиємусь інвентарі, залишаються в бібліотеці
+                cursor.execute("""
+                    DELETE FROM items_library
+                    WHERE image_path = ? AND NOT EXISTS (SELECT 1 FROM inventory WHERE item_id = items_library.id)
+                """, (filename,))
+                cursor.execute("DELETE FROM items_manifest WHERE image_path = ?", (filename,))
+
+            cursor.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)",
+                           (ITEMS_FINGERPRINT_KEY, fingerprint))
+
+        summary.update(added=len(added), changed=len(changed), removed=len(removed))
+        self._item_catalogue = None
+        return summary
+
+    def _seed_item_file(self, cursor, filename: str):
+        match = ITEM_PATTERN_6.match(filename)
+        double_attack = 0
+
+        if match:
+            raw_name = match.group(1)
+            str_val = int(match.group(2))
+            int_val = int(match.group(3))
+            dex_val = int(match.group(4))
+            vit_val = int(match.group(5))
+            def_val = int(match.group(6))
+            double_attack = int(match.group(7))
+        else:
+            match = ITEM_PATTERN_5.match(filename)
             if match:
                 raw_name = match.group(1)
                 str_val = int(match.group(2))
@@ -172,70 +284,57 @@ class StorageService:
                 dex_val = int(match.group(4))
                 vit_val = int(match.group(5))
                 def_val = int(match.group(6))
-                double_attack = int(match.group(7))
             else:
-                match = pattern_5.match(filename)
-                if match:
-                    raw_name = match.group(1)
-                    str_val = int(match.group(2))
-                    int_val = int(match.group(3))
-                    dex_val = int(match.group(4))
-                    vit_val = int(match.group(5))
-                    def_val = int(match.group(6))
-                else:
-                    continue
-
-            clean_name = raw_name.replace("_", " ")
-            item_type, slot, w_class = self._guess_item_type_and_slot(clean_name)
-
-            price = 250
-            lower = clean_name.lower()
-            if "заліз" in lower or "iron" in lower:
-                price = 750
-            elif "крилат" in lower or "wing" in lower:
-                price = 1250
-            elif "крижан" in lower or "ice" in lower:
-                price = 1750
-            elif "вогн" in lower or "fire" in lower:
-                price = 2500
-            elif "профес" in lower:
-                price = 750
-
-            base_dmg = 0
-            if item_type == ItemType.WEAPON:
-                if w_class == WeaponClass.SHIELD:
-                    base_dmg = 0
-                else:
-                    base_dmg = max(str_val, int_val, dex_val) * 2
-                    if base_dmg == 0: base_dmg = 5
-
-            try:
-                item_id = str(uuid.uuid4())
-                cursor.execute("""
-                    INSERT OR IGNORE INTO items_library (
-                        id, name, item_type, slot, weapon_class, weapon_hands, damage_type,
-                        bonus_str, bonus_int, bonus_dex, bonus_vit, bonus_def, base_dmg,
-                        double_attack_chance, price, level, image_path
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    item_id, clean_name, item_type.value, slot.value,
-                    w_class.value, WeaponHandType.ONE_HANDED.value, DamageType.PHYSICAL.value,
-                    str_val, int_val, dex_val, vit_val, def_val, base_dmg,
-                    double_attack, price, 1, filename
-                ))
+                return
+
+        clean_name = raw_name.replace("_", " ")
+        item_type, slot, w_class = self._guess_item_type_and_slot(clean_name)
+
+        price = 250
+        lower = clean_name.lower()
+        if "заліз" in lower or "iron" in lower:
+            price = 750
+        elif "крилат" in lower or "wing" in lower:
+            price = 1250
+        elif "крижан" in lower or "ice" in lower:
+            price = 1750
+        elif "вогн" in lower or "fire" in lower:
+            price = 2500
+        elif "профес" in lower:
+            price = 750
+
+        base_dmg = 0
+        if item_type == ItemType.WEAPON:
+            if w_class == WeaponClass.SHIELD:
+                base_dmg = 0
+            else:
+                base_dmg = max(str_val, int_val, dex_val) * 2
+                if base_dmg == 0: base_dmg = 5
 
-                cursor.execute("""
-                    UPDATE items_library 
-                    SET base_dmg = ?, double_attack_chance = ?, 
-                        bonus_str = ?, bonus_int = ?, bonus_dex = ?, bonus_vit = ?, bonus_def = ?
-                    WHERE image_path = ?
-                """, (base_dmg, double_attack, str_val, int_val, dex_val, vit_val, def_val, filename))
+        try:
+            item_id = uuid.uuid4().bytes
+            cursor.execute("""
+                INSERT OR IGNORE INTO items_library (
+                    id, name, item_type, slot, weapon_class, weapon_hands, damage_type,
+                    bonus_str, bonus_int, bonus_dex, bonus_vit, bonus_def, base_dmg,
+                    double_attack_chance, price, level, image_path
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                item_id, clean_name, enum_to_db(item_type), enum_to_db(slot),
+                enum_to_db(w_class), enum_to_db(WeaponHandType.ONE_HANDED), enum_to_db(DamageType.PHYSICAL),
+                str_val, int_val, dex_val, vit_val, def_val, base_dmg,
+                double_attack, price, 1, filename
+            ))
 
-            except Exception as e:
-                print(f"Error adding item {filename}: {e}")
+            cursor.execute("""
+                UPDATE items_library 
+                SET base_dmg = ?, double_attack_chance = ?, 
+                    bonus_str = ?, bonus_int = ?, bonus_dex = ?, bonus_vit = ?, bonus_def = ?
+                WHERE image_path = ?
+            """, (base_dmg, double_attack, str_val, int_val, dex_val, vit_val, def_val, filename))
 
-        conn.commit()
-        conn.close()
+        except Exception as e:
+            print(f"Error adding item {filename}: {e}")
 
     def _guess_item_type_and_slot(self, name: str):
         name_lower = name.lower()
@@ -266,273 +365,516 @@ class StorageService:
         return ItemType.WEAPON, EquipmentSlot.MAIN_HAND, WeaponClass.NONE
 
     def add_item_to_inventory(self, hero_id: str, item: Item):
-        conn = self._get_connection()
-        inv_id = uuid.uuid4()
-        conn.execute("INSERT INTO inventory (id, hero_id, item_id, is_equipped) VALUES (?, ?, ?, 0)",
-                     (str(inv_id), hero_id, str(item.id)))
-        conn.commit()
-        conn.close()
+        self.add_items_to_inventory(hero_id, [item])
+
+    def add_items_to_inventory(self, hero_id: str, items: List[Item]):
+        """Додає предмети в інвентар одним executemany в одній транзакції."""
+        hero_key = uuid_to_db(hero_id)
+        rows = [(uuid.uuid4().bytes, hero_key, uuid_to_db(item.id)) for item in items]
+        if not rows:
+            return
+        with self.transaction() as conn:
+            conn.executemany("INSERT INTO inventory (id, hero_id, item_id, is_equipped) VALUES (?, ?, ?, 0)", rows)
 
     def get_inventory(self, hero_id: str) -> List[InventoryItem]:
         conn = self._get_connection()
         cursor = conn.cursor()
         query = "SELECT inv.id, inv.is_equipped, lib.* FROM inventory inv JOIN items_library lib ON inv.item_id = lib.id WHERE inv.hero_id = ?"
-        cursor.execute(query, (hero_id,))
-        rows = cursor.fetchall()
-        conn.close()
-        inventory = []
-        for row in rows:
-            item_type = next((t for t in ItemType if t.value == row[4]), None)
-            slot = next((s for s in EquipmentSlot if s.value == row[5]), None)
-
-            item = Item(
-                id=uuid.UUID(row[2]),
-                name=row[3],
-                item_type=item_type,
-                slot=slot,
-                bonus_str=row[9],
-                bonus_int=row[10],
-                bonus_dex=row[11],
-                bonus_vit=row[12],
-                bonus_def=row[13],
-                base_dmg=row[14],
-                double_attack_chance=row[15],
-                price=row[16],
-                level=row[17],
-                image_path=row[18]
-            )
-            inventory.append(InventoryItem(item=item, is_equipped=bool(row[1]), id=uuid.UUID(row[0])))
-        return inventory
+        cursor.execute(query, (uuid_to_db(hero_id),))
+        to_inventory_item = inventory_mapper(cursor)
+        return [to_inventory_item(row) for row in cursor.fetchall()]
 
     def equip_item(self, hero_id: str, inventory_id: uuid.UUID, slot_value: str):
-        conn = self._get_connection()
-        conn.execute(
-            "UPDATE inventory SET is_equipped = 0 WHERE hero_id = ? AND is_equipped = 1 AND item_id IN (SELECT id FROM items_library WHERE slot = ?)",
-            (hero_id, slot_value))
-        conn.execute("UPDATE inventory SET is_equipped = 1 WHERE id = ?", (str(inventory_id),))
-        conn.commit()
-        conn.close()
+        hero_key = uuid_to_db(hero_id)
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE inventory SET is_equipped = 0 WHERE hero_id = ? AND is_equipped = 1 AND item_id IN (SELECT id FROM items_library WHERE slot = ?)",
+                (hero_key, enum_to_db(EquipmentSlot(slot_value))))
+            conn.execute("UPDATE inventory SET is_equipped = 1 WHERE id = ?", (uuid_to_db(inventory_id),))
+            self._refresh_equipment_bonuses(conn, "?", (hero_key,))
 
     def unequip_item(self, inventory_id: uuid.UUID):
-        conn = self._get_connection()
-        conn.execute("UPDATE inventory SET is_equipped = 0 WHERE id = ?", (str(inventory_id),))
-        conn.commit()
-        conn.close()
+        inventory_key = uuid_to_db(inventory_id)
+        with self.transaction() as conn:
+            conn.execute("UPDATE inventory SET is_equipped = 0 WHERE id = ?", (inventory_key,))
+            self._refresh_equipment_bonuses(conn, "SELECT hero_id FROM inventory WHERE id = ?", (inventory_key,))
+
+    @staticmethod
+    def _refresh_equipment_bonuses(conn, heroes_sql: str, params: tuple):
+        """Перераховує рядки hero_equipment_bonuses для героїв з підзапиту heroes_sql (в поточній транзакції)."""
+        columns = ", ".join(EQUIPMENT_BONUS_KEYS)
+        sums = ", ".join(f"coalesce(sum(lib.{column}), 0)" for column in EQUIPMENT_BONUS_KEYS)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO hero_equipment_bonuses (hero_id, {columns})
+            SELECT h.id, {sums}
+            FROM heroes h
+            LEFT JOIN inventory inv ON inv.hero_id = h.id AND inv.is_equipped = 1
+            LEFT JOIN items_library lib ON lib.id = inv.item_id
+            WHERE h.id IN ({heroes_sql})
+            GROUP BY h.id
+        """, params)
+
+    def get_equipment_bonuses(self, hero_id: str) -> dict:
+        """Суми бонусів одягнених предметів героя ('str', 'int', ..., 'base_dmg', 'double_attack_chance')."""
+        cursor = self._get_connection().execute(
+            f"SELECT {', '.join(EQUIPMENT_BONUS_KEYS)} FROM hero_equipment_bonuses WHERE hero_id = ?",
+            (uuid_to_db(hero_id),))
+        row = cursor.fetchone() or (0,) * len(EQUIPMENT_BONUS_KEYS)
+        return dict(zip(EQUIPMENT_BONUS_KEYS.values(), row))
 
     def get_all_library_items(self) -> List[Item]:
         conn = self._get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM items_library")
-        rows = cursor.fetchall()
-        conn.close()
-        items = []
-        for row in rows:
-            item_type = next((t for t in ItemType if t.value == row[2]), None)
-            slot = next((s for s in EquipmentSlot if s.value == row[3]), None)
-            item = Item(
-                id=uuid.UUID(row[0]),
-                name=row[1],
-                item_type=item_type,
-                slot=slot,
-                bonus_str=row[7],
-                bonus_int=row[8],
-                bonus_dex=row[9],
-                bonus_vit=row[10],
-                bonus_def=row[11],
-                base_dmg=row[12],
-                double_attack_chance=row[13],
-                price=row[14],
-                level=row[15],
-                image_path=row[16]
-            )
-            items.append(item)
-        return items
+        to_item = ITEM_MAPPER.for_cursor(cursor)
+        return [to_item(row) for row in cursor.fetchall()]
+
+    def get_item_catalogue(self) -> ItemCatalogue:
+        """
+        Каталог предметів з індексами (див. ItemCatalogue): читається з БД один раз
+        і перебудовується лише після змін бібліотеки сідером.
+        """
+        catalogue = self._item_catalogue
+        if catalogue is None:
+            catalogue = self._item_catalogue = ItemCatalogue(self.get_all_library_items())
+        return catalogue
 
     def create_hero(self, hero: Hero):
-        conn = self._get_connection()
         try:
-            conn.execute("""
-                INSERT INTO heroes (
-                    id, nickname, hero_class, gender, appearance, level, hp, max_hp, last_login,
-                    stat_points, str_stat, int_stat, dex_stat, vit_stat, def_stat, mana, max_mana, buff_multiplier
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                str(hero.id), hero.nickname, hero.hero_class.value, hero.gender.value,
-                hero.appearance, hero.level, hero.hp, hero.max_hp, hero.last_login.isoformat(),
-                hero.stat_points, hero.str_stat, hero.int_stat, hero.dex_stat,
-                hero.vit_stat, hero.def_stat, hero.mana, hero.max_mana, hero.buff_multiplier
-            ))
-            conn.commit()
+            with self.transaction() as conn:
+                conn.execute("""
+                    INSERT INTO heroes (
+                        id, nickname, hero_class, gender, appearance, level, hp, max_hp, last_login,
+                        stat_points, str_stat, int_stat, dex_stat, vit_stat, def_stat, mana, max_mana, buff_multiplier
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    uuid_to_db(hero.id), hero.nickname, enum_to_db(hero.hero_class), enum_to_db(hero.gender),
+                    hero.appearance, hero.level, hero.hp, hero.max_hp, datetime_to_db(hero.last_login),
+                    hero.stat_points, hero.str_stat, hero.int_stat, hero.dex_stat,
+                    hero.vit_stat, hero.def_stat, hero.mana, hero.max_mana, hero.buff_multiplier
+                ))
         except sqlite3.IntegrityError:
             raise ValueError("Цей нікнейм вже зайнятий!")
-        finally:
-            conn.close()
 
     def get_hero_by_nickname(self, nickname: str) -> Optional[Hero]:
         conn = self._get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM heroes WHERE nickname = ?", (nickname,))
         row = cursor.fetchone()
-        conn.close()
-        return self._map_row_to_hero(row) if row else None
+        return HERO_MAPPER.for_cursor(cursor)(row) if row else None
 
     def get_hero_by_id(self, hero_id: str) -> Optional[Hero]:
         conn = self._get_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM heroes WHERE id = ?", (hero_id,))
+        cursor.execute("SELECT * FROM heroes WHERE id = ?", (uuid_to_db(hero_id),))
         row = cursor.fetchone()
-        conn.close()
-        return self._map_row_to_hero(row) if row else None
-
-    def _map_row_to_hero(self, row) -> Hero:
-        return Hero(
-            id=uuid.UUID(row[0]), nickname=row[1], hero_class=HeroClass(row[2]), gender=Gender(row[3]),
-            appearance=row[4],
-            level=row[5], current_xp=row[6], xp_to_next_level=row[7], gold=row[8], streak_days=row[9], hp=row[10],
-            max_hp=row[11],
-            stat_points=row[12], str_stat=row[13], int_stat=row[14], dex_stat=row[15],
-            vit_stat=row[16], def_stat=row[17], mana=row[18], max_mana=row[19],
-            buff_multiplier=row[20],
-            last_login=datetime.fromisoformat(row[21])
-        )
+        return HERO_MAPPER.for_cursor(cursor)(row) if row else None
 
     def update_hero(self, hero: Hero):
-        conn = self._get_connection()
-        conn.execute("""
-            UPDATE heroes SET 
-                level=?, current_xp=?, xp_to_next_level=?, gold=?, streak_days=?, hp=?, max_hp=?, last_login=?,
-                stat_points=?, str_stat=?, int_stat=?, dex_stat=?, vit_stat=?, def_stat=?, mana=?, max_mana=?, buff_multiplier=?
-            WHERE id=?
-        """, (
-            hero.level, hero.current_xp, hero.xp_to_next_level, hero.gold, hero.streak_days,
-            hero.hp, hero.max_hp, hero.last_login.isoformat(),
-            hero.stat_points, hero.str_stat, hero.int_stat, hero.dex_stat,
-            hero.vit_stat, hero.def_stat, hero.mana, hero.max_mana, hero.buff_multiplier,
-            str(hero.id)
-        ))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute("""
+                UPDATE heroes SET 
+                    level=?, current_xp=?, xp_to_next_level=?, gold=?, streak_days=?, hp=?, max_hp=?, last_login=?,
+                    stat_points=?, str_stat=?, int_stat=?, dex_stat=?, vit_stat=?, def_stat=?, mana=?, max_mana=?, buff_multiplier=?
+                WHERE id=?
+            """, (
+                hero.level, hero.current_xp, hero.xp_to_next_level, hero.gold, hero.streak_days,
+                hero.hp, hero.max_hp, datetime_to_db(hero.last_login),
+                hero.stat_points, hero.str_stat, hero.int_stat, hero.dex_stat,
+                hero.vit_stat, hero.def_stat, hero.mana, hero.max_mana, hero.buff_multiplier,
+                uuid_to_db(hero.id)
+            ))
 
     def save_goal(self, goal: Goal, hero_id: str):
+        """
+        Зберігає ціль, записуючи лише те, що змінилось з моменту останнього
+        завантаження/збереження: змінені підцілі оновлюються, видалені - видаляються.
+        Якщо нічого не змінилось, запитів до БД немає.
+        """
+        self.save_goals([goal], hero_id)
+
+    def save_goals(self, goals: List[Goal], hero_id: str):
+        """
+        Пакетний save_goal: зміни всіх цілей записуються трьома executemany
+        (цілі, видалені підцілі, змінені підцілі) в одній транзакції.
+        """
+        hero_key = uuid_to_db(hero_id)
+        goal_rows, removed, changed, snapshots = [], [], [], []
+        for goal in goals:
+            if not goal._subgoals_loaded:
+                raise ValueError(f"Ціль {goal.id} завантажена без підцілей - її не можна зберегти")
+            goal_id = uuid_to_db(goal.id)
+            goal_row = self._goal_row(goal, hero_key)
+            sub_rows = self._sub_goal_rows(goal)
+
+            saved = goal._saved_state
+            if saved is None:
+                saved = self._read_goal_state(goal_id)
+            saved_goal_row, saved_sub_rows = saved
+
+            if saved_goal_row != goal_row:
+                goal_rows.append((goal_id,) + goal_row + (100.0 if goal.is_completed else 0.0,))
+            removed.extend((sub_id,) for sub_id in saved_sub_rows if sub_id not in sub_rows)
+            changed.extend((sub_id, goal_id) + row for sub_id, row in sub_rows.items()
+                           if saved_sub_rows.get(sub_id) != row)
+            snapshots.append((goal, (goal_row, sub_rows)))
+
+        if goal_rows or removed or changed:
+            with self.transaction() as conn:
+                if goal_rows:
+                    # UPSERT замість INSERT OR REPLACE: REPLACE видаляє рядок і каскадно видалив би підцілі.
+                    # Лічильники підцілей і прогрес цілі з підцілями ведуть тригери (міграція 9).
+                    conn.executemany("""
+                        INSERT INTO goals (id, hero_id, title, description, deadline, difficulty, created_at,
+                                           is_completed, penalty_applied, previous_state, completed_at, progress)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(id) DO UPDATE SET
+                            hero_id = excluded.hero_id, title = excluded.title, description = excluded.description,
+                            deadline = excluded.deadline, difficulty = excluded.difficulty,
+                            created_at = excluded.created_at, is_completed = excluded.is_completed,
+                            penalty_applied = excluded.penalty_applied, previous_state = excluded.previous_state,
+                            completed_at = excluded.completed_at,
+                            progress = CASE WHEN goals.total_subgoals = 0 THEN excluded.progress ELSE goals.progress END
+                    """, goal_rows)
+                if removed:
+                    conn.executemany("DELETE FROM sub_goals WHERE id = ?", removed)
+                if changed:
+                    conn.executemany("""
+                        INSERT INTO sub_goals (id, goal_id, title, description, is_completed) VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(id) DO UPDATE SET
+                            goal_id = excluded.goal_id, title = excluded.title,
+                            description = excluded.description, is_completed = excluded.is_completed
+                    """, changed)
+
+        def apply_snapshots():
+            # Знімок "записаного" стану - лише після COMMIT: після відкоту ціль лишається "брудною"
+            # і лічильники підцілей - такі самі, як щойно порахували тригери
+            for goal, state in snapshots:
+                goal._saved_state = state
+                goal.total_subgoals = len(state[1])
+                goal.completed_subgoals = sum(row[2] for row in state[1].values())
+
+        self.after_commit(apply_snapshots)
+
+    @staticmethod
+    def _goal_row(goal: Goal, hero_key: bytes) -> tuple:
+        return (hero_key, goal.title, goal.description, datetime_to_db(goal.deadline), enum_to_db(goal.difficulty),
+                datetime_to_db(goal.created_at), 1 if goal.is_completed else 0, 1 if goal.penalty_applied else 0,
+                goal.previous_state, datetime_to_db(goal.completed_at))
+
+    @staticmethod
+    def _sub_goal_rows(goal: Goal) -> dict:
+        return {sub.id.bytes: (sub.title, sub.description, 1 if sub.is_completed else 0) for sub in goal.subgoals}
+
+    def _read_goal_state(self, goal_id: bytes) -> tuple:
+        """Поточний стан цілі в БД - для об'єктів, які не були завантажені через load_goals."""
         conn = self._get_connection()
         cursor = conn.cursor()
-        try:
-            # Оновлено запит для збереження previous_state
-            cursor.execute(
-                "INSERT OR REPLACE INTO goals (id, hero_id, title, description, deadline, difficulty, created_at, is_completed, penalty_applied, previous_state) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                (str(goal.id), hero_id, goal.title, goal.description, goal.deadline.isoformat(), goal.difficulty.value,
-                 goal.created_at.isoformat(), 1 if goal.is_completed else 0, 1 if goal.penalty_applied else 0,
-                 goal.previous_state))
-
-            cursor.execute("DELETE FROM sub_goals WHERE goal_id = ?", (str(goal.id),))
-            for sub in goal.subgoals:
-                cursor.execute(
-                    "INSERT INTO sub_goals (id, goal_id, title, description, is_completed) VALUES (?, ?, ?, ?, ?)",
-                    (str(sub.id), str(goal.id), sub.title, sub.description, 1 if sub.is_completed else 0))
-            conn.commit()
-        finally:
-            conn.close()
+        cursor.execute("""
+            SELECT hero_id, title, description, deadline, difficulty, created_at, is_completed,
+                   penalty_applied, previous_state, completed_at
+            FROM goals WHERE id = ?
+        """, (goal_id,))
+        goal_row = cursor.fetchone()
+        cursor.execute("SELECT id, title, description, is_completed FROM sub_goals WHERE goal_id = ?", (goal_id,))
+        sub_rows = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+        return goal_row, sub_rows
 
     def load_goals(self, hero_id: str) -> List[Goal]:
+        hero_key = uuid_to_db(hero_id)
         conn = self._get_connection()
         cursor = conn.cursor()
-        goals_list = []
-        # Оновлено запит для завантаження previous_state
-        cursor.execute(
-            "SELECT id, title, description, deadline, difficulty, created_at, is_completed, penalty_applied, previous_state FROM goals WHERE hero_id = ?",
-            (hero_id,))
-        rows = cursor.fetchall()
-        for row in rows:
-            g_id, title, desc, dl_str, diff_val, ca_str, is_comp, is_penalized, prev_state = row
-            goal = Goal(title=title, description=desc, deadline=datetime.fromisoformat(dl_str),
-                        difficulty=Difficulty(diff_val))
-            goal.id = uuid.UUID(g_id)
-            goal.created_at = datetime.fromisoformat(ca_str)
-            goal.is_completed = bool(is_comp)
-            goal.penalty_applied = bool(is_penalized)
-            # prev_state може бути None у старих БД, тому ставимо ""
-            goal.previous_state = prev_state if prev_state else ""
-
-            cursor.execute("SELECT id, title, is_completed, description FROM sub_goals WHERE goal_id = ?", (g_id,))
-            for s_row in cursor.fetchall():
-                description_val = s_row[3] if s_row[3] is not None else ""
-                sub = SubGoal(title=s_row[1], description=description_val)
-                sub.id = uuid.UUID(s_row[0])
-                sub.is_completed = bool(s_row[2])
-                goal.add_subgoal(sub)
-            goals_list.append(goal)
-        conn.close()
+        cursor.execute(f"SELECT {GOAL_COLUMNS} FROM goals WHERE hero_id = ?", (hero_key,))
+        to_goal = GOAL_MAPPER.for_cursor(cursor)
+        goals_list = [to_goal(row) for row in cursor.fetchall()]
+        if not goals_list:
+            return goals_list
+
+        # Усі підцілі героя одним запитом (замість окремого запиту на кожну ціль).
+        # ORDER BY rowid зберігає порядок, у якому підцілі були додані.
+        cursor.execute("""
+            SELECT s.goal_id, s.id, s.title, s.is_completed, s.description
+            FROM sub_goals s JOIN goals g ON s.goal_id = g.id
+            WHERE g.hero_id = ?
+            ORDER BY s.rowid
+        """, (hero_key,))
+        self._attach_sub_goals(cursor, goals_list, hero_key)
         return goals_list
 
+    def load_goals_page(self, hero_id: str, sort_mode: str = "deadline_asc", cursor: Optional[tuple] = None,
+                        limit: int = 50, with_subgoals: bool = True) -> Tuple[List[Goal], Optional[tuple]]:
+        """
+        Одна сторінка цілей героя, відсортована в SQL (див. GOAL_SORT_ORDERS).
+        cursor - ключ останньої цілі попередньої сторінки (keyset, без OFFSET).
+        with_subgoals=False - без запиту до sub_goals: прогрес береться з лічильників,
+        але такі цілі лише для показу (save_goals їх відхиляє).
+        Повертає (цілі, курсор наступної сторінки або None, якщо це остання).
+        """
+        order = GOAL_SORT_ORDERS[sort_mode]
+        hero_key = uuid_to_db(hero_id)
+        where, params = "hero_id = ?", [hero_key]
+        if cursor is not None:
+            predicate, predicate_params = self._keyset_predicate(order, cursor)
+            where += f" AND ({predicate})"
+            params += predicate_params
+        order_by = ", ".join(f"{column} {'DESC' if desc else 'ASC'}" for column, desc in order)
+
+        db_cursor = self._get_connection().cursor()
+        db_cursor.execute(f"SELECT {GOAL_COLUMNS} FROM goals WHERE {where} ORDER BY {order_by} LIMIT ?",
+                          params + [limit + 1])
+        rows = db_cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        names = [d[0] for d in db_cursor.description]
+        to_goal = GOAL_MAPPER.for_cursor(db_cursor)
+        goals_list = [to_goal(row) for row in rows]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = tuple(last[names.index(column)] for column, _ in order)
+
+        if not with_subgoals:
+            for goal in goals_list:
+                goal._subgoals_loaded = False
+        elif goals_list:
+            placeholders = ", ".join("?" * len(goals_list))
+            db_cursor.execute(f"""
+                SELECT goal_id, id, title, is_completed, description FROM sub_goals
+                WHERE goal_id IN ({placeholders}) ORDER BY rowid
+            """, [goal.id.bytes for goal in goals_list])
+            self._attach_sub_goals(db_cursor, goals_list, hero_key)
+        return goals_list, next_cursor
+
+    def load_goal(self, goal_id: uuid.UUID) -> Optional[Goal]:
+        """Одна ціль з підцілями (напр. результат пошуку, якого немає на завантажених сторінках)."""
+        cursor = self._get_connection().cursor()
+        goal_key = uuid_to_db(goal_id)
+        cursor.execute(f"SELECT {GOAL_COLUMNS}, hero_id FROM goals WHERE id = ?", (goal_key,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        goal, hero_key = GOAL_MAPPER.for_cursor(cursor)(row), row[-1]
+        cursor.execute("SELECT goal_id, id, title, is_completed, description FROM sub_goals WHERE goal_id = ? ORDER BY rowid",
+                       (goal_key,))
+        self._attach_sub_goals(cursor, [goal], hero_key)
+        return goal
+
+    def search_goals(self, hero_id: str, query: str, limit: int = 20) -> List[GoalSearchHit]:
+        """
+        Повнотекстовий пошук по назвах, описах цілей та їх підцілях (FTS5).
+        Результати впорядковані за релевантністю (bm25: назва важить більше за опис і підцілі),
+        збіги в текстах обрамлені HIGHLIGHT_START / HIGHLIGHT_END.
+        """
+        match = self._fts_query(query)
+        if not match:
+            return []
+        cursor = self._get_connection().cursor()
+        cursor.execute("""
+            SELECT g.id,
+                   highlight(goals_fts, 0, ?1, ?2),
+                   snippet(goals_fts, 1, ?1, ?2, '…', 16),
+                   snippet(goals_fts, 2, ?1, ?2, '…', 16),
+                   bm25(goals_fts, 10.0, 4.0, 2.0) AS score
+            FROM goals_fts JOIN goals g ON g.rowid = goals_fts.rowid
+            WHERE goals_fts MATCH ?3 AND g.hero_id = ?4
+            ORDER BY score
+            LIMIT ?5
+        """, (HIGHLIGHT_START, HIGHLIGHT_END, match, uuid_to_db(hero_id), limit))
+        return [GoalSearchHit(goal_id=uuid.UUID(bytes=g_id), title=title, description=description, subgoals=subgoals,
+                              score=score)
+                for g_id, title, description, subgoals, score in cursor.fetchall()]
+
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        """Текст користувача -> запит FTS5: кожне слово як префікс у лапках (без синтаксису FTS)."""
+        return " ".join(f'"{token}"*' for token in re.findall(r"\w+", text))
+
+    @staticmethod
+    def _keyset_predicate(order, cursor: tuple) -> Tuple[str, list]:
+        """(a > ?) OR (a = ? AND b < ?) OR ... - з урахуванням напрямку кожної колонки."""
+        clauses, params = [], []
+        for i, (column, desc) in enumerate(order):
+            parts = [f"{prev} = ?" for prev, _ in order[:i]] + [f"{column} {'<' if desc else '>'} ?"]
+            clauses.append("(" + " AND ".join(parts) + ")")
+            params.extend(cursor[:i + 1])
+        return " OR ".join(clauses), params
+
+    def _attach_sub_goals(self, cursor, goals_list: List[Goal], hero_key: bytes):
+        """Розкладає рядки (goal_id, підціль...) по цілях і запам'ятовує збережений стан."""
+        goals_by_id = {goal.id.bytes: goal for goal in goals_list}
+        to_sub_goal = SUB_GOAL_MAPPER.for_cursor(cursor)
+        for row in cursor.fetchall():
+            goal = goals_by_id.get(row[0])
+            if goal is None: continue
+            goal.subgoals.append(to_sub_goal(row))  # лічильники вже прочитані з goals
+
+        for goal in goals_list:
+            goal._saved_state = (self._goal_row(goal, hero_key), self._sub_goal_rows(goal))
+
     def delete_goal(self, goal_id: uuid.UUID):
-        conn = self._get_connection()
-        conn.execute("DELETE FROM goals WHERE id = ?", (str(goal_id),))
-        conn.commit()
-        conn.close()
+        self.delete_goals([goal_id])
+
+    def delete_goals(self, goal_ids: List[uuid.UUID]):
+        """Видаляє цілі (разом з підцілями) одним executemany в одній транзакції."""
+        rows = [(uuid_to_db(goal_id),) for goal_id in goal_ids]
+        if not rows:
+            return
+        with self.transaction() as conn:
+            conn.executemany("DELETE FROM goals WHERE id = ?", rows)
 
     def save_long_term_goal(self, goal: LongTermGoal, hero_id: str):
-        conn = self._get_connection()
-        last_update = goal.last_update_date.isoformat() if goal.last_update_date else None
-        conn.execute(
-            "INSERT OR REPLACE INTO long_term_goals (id, hero_id, title, description, total_days, start_date, time_frame, current_day, checked_days, missed_days, is_completed, daily_state, last_update_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (str(goal.id), hero_id, goal.title, goal.description, goal.total_days, goal.start_date.isoformat(),
-             goal.time_frame, goal.current_day, goal.checked_days, goal.missed_days, 1 if goal.is_completed else 0,
-             goal.daily_state, last_update))
-        conn.commit()
-        conn.close()
+        self.save_long_term_goals([goal], hero_id)
+
+    def save_long_term_goals(self, goals: List[LongTermGoal], hero_id: str):
+        """Пакетний save_long_term_goal: один executemany в одній транзакції."""
+        hero_key = uuid_to_db(hero_id)
+        rows = [(uuid_to_db(goal.id), hero_key, goal.title, goal.description, goal.total_days,
+                 datetime_to_db(goal.start_date), goal.time_frame, goal.current_day, goal.checked_days,
+                 goal.missed_days, 1 if goal.is_completed else 0, goal.daily_state,
+                 datetime_to_db(goal.last_update_date), datetime_to_db(goal.completed_at),
+                 goal.window_start, goal.window_end) for goal in goals]
+        if not rows:
+            return
+        with self.transaction() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO long_term_goals ({LONG_TERM_GOAL_COLUMNS}) "
+                f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows)
 
     def load_long_term_goals(self, hero_id: str) -> List[LongTermGoal]:
         conn = self._get_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM long_term_goals WHERE hero_id = ? AND is_completed = 0", (hero_id,))
-        rows = cursor.fetchall()
-        goals = []
-        for row in rows:
-            g = LongTermGoal(title=row[2], description=row[3], total_days=row[4],
-                             start_date=datetime.fromisoformat(row[5]), time_frame=row[6])
-            g.id = uuid.UUID(row[0])
-            g.current_day = row[7]
-            g.checked_days = row[8]
-            g.missed_days = row[9]
-            g.is_completed = bool(row[10])
-            g.daily_state = row[11]
-            if row[12]: g.last_update_date = datetime.fromisoformat(row[12])
-            goals.append(g)
-        conn.close()
-        return goals
+        cursor.execute(f"SELECT {LONG_TERM_GOAL_COLUMNS} FROM long_term_goals WHERE hero_id = ? AND is_completed = 0",
+                       (uuid_to_db(hero_id),))
+        to_goal = LONG_TERM_GOAL_MAPPER.for_cursor(cursor)
+        return [to_goal(row) for row in cursor.fetchall()]
 
     def delete_long_term_goal(self, goal_id: uuid.UUID):
         """Видаляє довгострокову звичку з БД."""
-        conn = self._get_connection()
-        conn.execute("DELETE FROM long_term_goals WHERE id = ?", (str(goal_id),))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM long_term_goals WHERE id = ?", (uuid_to_db(goal_id),))
+
+    # --- Журнал змін героя ---
+    def append_hero_events(self, hero_id: str, events: List[HeroEvent]):
+        """Дописує події в журнал (в транзакції дії, якщо вона відкрита)."""
+        if not events:
+            return
+        hero_key, created_at = uuid_to_db(hero_id), datetime_to_db(datetime.now())
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO hero_events (hero_id, goal_id, action, kind, delta, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(hero_key, uuid_to_db(e.goal_id), e.action, e.kind, e.delta, e.payload, created_at) for e in events])
+
+    def load_hero_events(self, hero_id: str, goal_id) -> List[HeroEvent]:
+        """Події журналу, пов'язані з ціллю, у порядку запису."""
+        cursor = self._get_connection().cursor()
+        cursor.execute("""
+            SELECT seq, goal_id, action, kind, delta, payload FROM hero_events
+            WHERE goal_id = ? AND hero_id = ? ORDER BY seq
+        """, (uuid_to_db(goal_id), uuid_to_db(hero_id)))
+        to_event = HERO_EVENT_MAPPER.for_cursor(cursor)
+        return [to_event(row) for row in cursor.fetchall()]
+
+    def hero_event_totals(self, hero_id: str) -> dict:
+        """Сума дельт журналу за типом ({"gold": 120, ...}) - відтворення змін, внесених діями з журналом."""
+        cursor = self._get_connection().cursor()
+        cursor.execute("SELECT kind, SUM(delta) FROM hero_events WHERE hero_id = ? GROUP BY kind", (uuid_to_db(hero_id),))
+        return dict(cursor.fetchall())
+
+    # --- Архів ---
+    def archive_completed(self, hero_id: str, completed_before: datetime) -> Tuple[int, int]:
+        """
+        Переносить цілі (з підцілями) та звички, виконані до completed_before, в архівні таблиці.
+        Гарячі таблиці після цього містять лише активні та нещодавно виконані записи.
+        Повертає (кількість цілей, кількість звичок).
+        """
+        params = (uuid_to_db(hero_id), datetime_to_db(completed_before))
+        archived_at = datetime_to_db(datetime.now())
+        due = "hero_id = ? AND is_completed = 1 AND completed_at <= ?"
+        with self.transaction() as conn:
+            conn.execute(f"""
+                INSERT OR REPLACE INTO goals_archive (hero_id, {GOAL_COLUMNS}, archived_at)
+                SELECT hero_id, {GOAL_COLUMNS}, ? FROM goals WHERE {due}
+            """, (archived_at,) + params)
+            conn.execute(f"""
+                INSERT OR REPLACE INTO sub_goals_archive (id, goal_id, title, description, is_completed)
+                SELECT id, goal_id, title, description, is_completed FROM sub_goals
+                WHERE goal_id IN (SELECT id FROM goals WHERE {due})
+                ORDER BY rowid
+            """, params)
+            # Підцілі видаляються каскадно, індекс пошуку - тригерами
+            goals_count = conn.execute(f"DELETE FROM goals WHERE {due}", params).rowcount
+
+            conn.execute(f"""
+                INSERT OR REPLACE INTO long_term_goals_archive ({LONG_TERM_GOAL_COLUMNS}, archived_at)
+                SELECT {LONG_TERM_GOAL_COLUMNS}, ? FROM long_term_goals WHERE {due}
+            """, (archived_at,) + params)
+            habits_count = conn.execute(f"DELETE FROM long_term_goals WHERE {due}", params).rowcount
+        return goals_count, habits_count
+
+    def load_archived_goals(self, hero_id: str, cursor: Optional[tuple] = None,
+                            limit: int = 50) -> Tuple[List[Goal], Optional[tuple]]:
+        """Сторінка архівних цілей героя (нові спочатку); курсор - як у load_goals_page."""
+        hero_key = uuid_to_db(hero_id)
+        where, params = "hero_id = ?", [hero_key]
+        if cursor is not None:
+            predicate, predicate_params = self._keyset_predicate(ARCHIVE_ORDER, cursor)
+            where += f" AND ({predicate})"
+            params += predicate_params
+
+        db_cursor = self._get_connection().cursor()
+        db_cursor.execute(f"""
+            SELECT {GOAL_COLUMNS} FROM goals_archive WHERE {where}
+            ORDER BY completed_at DESC, id DESC LIMIT ?
+        """, params + [limit + 1])
+        rows = db_cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        to_goal = GOAL_MAPPER.for_cursor(db_cursor)
+        goals_list = [to_goal(row) for row in rows]
+        next_cursor = None
+        if has_more:
+            last = goals_list[-1]
+            next_cursor = (datetime_to_db(last.completed_at), last.id.bytes)
+
+        if goals_list:
+            placeholders = ", ".join("?" * len(goals_list))
+            db_cursor.execute(f"""
+                SELECT goal_id, id, title, is_completed, description FROM sub_goals_archive
+                WHERE goal_id IN ({placeholders}) ORDER BY rowid
+            """, [goal.id.bytes for goal in goals_list])
+            self._attach_sub_goals(db_cursor, goals_list, hero_key)
+        return goals_list, next_cursor
+
+    def load_archived_long_term_goals(self, hero_id: str, limit: int = 100) -> List[LongTermGoal]:
+        """Завершені звички з архіву (нові спочатку)."""
+        cursor = self._get_connection().cursor()
+        cursor.execute(f"""
+            SELECT {LONG_TERM_GOAL_COLUMNS} FROM long_term_goals_archive WHERE hero_id = ?
+            ORDER BY completed_at DESC LIMIT ?
+        """, (uuid_to_db(hero_id), limit))
+        to_goal = LONG_TERM_GOAL_MAPPER.for_cursor(cursor)
+        return [to_goal(row) for row in cursor.fetchall()]
 
     def save_enemy(self, enemy: Enemy, hero_id: str):
-        conn = self._get_connection()
-        conn.execute(
-            "INSERT OR REPLACE INTO current_enemies (hero_id, id, name, rarity, level, current_hp, max_hp, damage, damage_type, reward_xp, reward_gold, drop_chance, image_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (hero_id, str(enemy.id), enemy.name, enemy.rarity.value, enemy.level, enemy.current_hp, enemy.max_hp,
-             enemy.damage, enemy.damage_type.value, enemy.reward_xp, enemy.reward_gold, enemy.drop_chance,
-             enemy.image_path))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO current_enemies (hero_id, id, name, rarity, level, current_hp, max_hp, damage, damage_type, reward_xp, reward_gold, drop_chance, image_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (uuid_to_db(hero_id), uuid_to_db(enemy.id), enemy.name, enum_to_db(enemy.rarity), enemy.level,
+                 enemy.current_hp, enemy.max_hp, enemy.damage, enum_to_db(enemy.damage_type), enemy.reward_xp,
+                 enemy.reward_gold, enemy.drop_chance, enemy.image_path))
 
     def load_enemy(self, hero_id: str) -> Optional[Enemy]:
         conn = self._get_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM current_enemies WHERE hero_id = ?", (hero_id,))
+        cursor.execute("SELECT * FROM current_enemies WHERE hero_id = ?", (uuid_to_db(hero_id),))
         row = cursor.fetchone()
-        conn.close()
-        if row:
-            return Enemy(id=uuid.UUID(row[1]), name=row[2], rarity=EnemyRarity(row[3]), level=row[4], current_hp=row[5],
-                         max_hp=row[6], damage=row[7], damage_type=DamageType(row[8]), reward_xp=row[9],
-                         reward_gold=row[10], drop_chance=row[11], image_path=row[12])
-        return None
+        return ENEMY_MAPPER.for_cursor(cursor)(row) if row else None
 
     def delete_enemy(self, hero_id: str):
-        conn = self._get_connection()
-        conn.execute("DELETE FROM current_enemies WHERE hero_id = ?", (hero_id,))
-        conn.commit()
-        conn.close()
\ No newline at end of file
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM current_enemies WHERE hero_id = ?", (uuid_to_db(hero_id),))
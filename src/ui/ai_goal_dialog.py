@@ -294,7 +294,7 @@ class AIGoalDialog(QDialog):
                 new_goal.add_subgoal(new_sub)
 
             # Зберігаємо підцілі
-            self.main_service.storage.save_goal(new_goal, self.main_service.hero_id)
+            self.main_service.save_goal(new_goal)
 
             QMessageBox.information(self, "Успіх", "Ціль успішно створена з допомогою AI!")
             self.accept()  # Закриваємо діалог
@@ -0,0 +1,40 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class DbDispatcher(QObject):
+    """
+    Міст між потоком БД (AsyncStorage) та GUI-потоком.
+    call() ставить функцію в чергу потоку БД, а колбек з результатом
+    виконується вже в GUI-потоці (через сигнал Qt), тож у ньому можна малювати віджети.
+    Якщо власник (діалог) закрито раніше, ніж прийшов результат, колбек не викликається.
+    """
+    _finished = pyqtSignal(object, object, object)  # future, on_result, on_error
+
+    def __init__(self, async_storage, parent=None):
+        super().__init__(parent)
+        self.async_storage = async_storage
+        self._finished.connect(self._deliver)
+
+    def call(self, fn, *args, on_result=None, on_error=None, **kwargs):
+        future = self.async_storage.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda f: self._emit(f, on_result, on_error))
+        return future
+
+    def _emit(self, future, on_result, on_error):
+        # Викликається в потоці БД; сигнал доставляється в потік, якому належить диспетчер
+        try:
+            self._finished.emit(future, on_result, on_error)
+        except RuntimeError:
+            pass  # Qt-об'єкт уже знищено разом із власником
+
+    def _deliver(self, future, on_result, on_error):
+        try:
+            result = future.result()
+        except Exception as e:
+            if on_error:
+                on_error(e)
+            else:
+                print(f"DB task error: {e}")
+            return
+        if on_result:
+            on_result(result)
@@ -120,7 +120,7 @@ class EditGoalDialog(AddGoalDialog):
         self.goal.difficulty = difficulty
 
         try:
-            self.service.storage.save_goal(self.goal, self.service.hero_id)
+            self.service.save_goal(self.goal)
             self.accept()
         except Exception as e:
             QMessageBox.critical(self, "Помилка", str(e))
@@ -174,7 +174,7 @@ class SubgoalsDialog(QDialog):
             self.list_widget.setItemWidget(item, widget)
 
     def toggle_subgoal(self, subgoal, state):
-        subgoal.is_completed = (state == Qt.Checked)
+        self.goal.set_subgoal_completed(subgoal, state == Qt.Checked)
 
         # --- АВТОВИКОНАННЯ ЦІЛІ ---
         # Перевіряємо, чи є підцілі і чи всі вони виконані
@@ -194,7 +194,7 @@ class SubgoalsDialog(QDialog):
                 self.goal.is_completed = True
 
         # Зберігаємо
-        self.service.storage.save_goal(self.goal, self.service.hero_id)
+        self.service.save_goal(self.goal)
 
     def add_subgoal(self):
         text, ok = QInputDialog.getText(self, "Нова підціль", "Введіть назву підцілі:")
@@ -202,7 +202,7 @@ class SubgoalsDialog(QDialog):
             new_sub = SubGoal(title=text)
             self.goal.add_subgoal(new_sub)
             self.goal.is_completed = False  # Скидаємо виконання при додаванні нової
-            self.service.storage.save_goal(self.goal, self.service.hero_id)
+            self.service.save_goal(self.goal)
             self.update_list()
 
     def edit_subgoal(self):
@@ -215,7 +215,7 @@ class SubgoalsDialog(QDialog):
         text, ok = QInputDialog.getText(self, "Редагувати", "Нова назва:", text=sub.title)
         if ok and text:
             sub.title = text
-            self.service.storage.save_goal(self.goal, self.service.hero_id)
+            self.service.save_goal(self.goal)
             self.update_list()
 
     def delete_subgoal(self):
@@ -224,6 +224,6 @@ class SubgoalsDialog(QDialog):
             QMessageBox.warning(self, "Увага", "Оберіть підціль для видалення")
             return
 
-        del self.goal.subgoals[row]
-        self.service.storage.save_goal(self.goal, self.service.hero_id)
+        self.goal.remove_subgoal(self.goal.subgoals[row])
+        self.service.save_goal(self.goal)
         self.update_list()
\ No newline at end of file
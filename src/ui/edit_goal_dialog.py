@@ -2,6 +2,7 @@ from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtCore import QDateTime
 from src.ui.dialogs import AddGoalDialog
 from src.logic import GoalService
+from src.ui.db_dispatcher import DbDispatcher
 
 
 class EditGoalDialog(AddGoalDialog):
@@ -10,6 +11,8 @@ class EditGoalDialog(AddGoalDialog):
     def __init__(self, parent, service: GoalService, goal):
         super().__init__(parent, service)
         self.goal = goal
+        # Запис виконується в потоці БД (чергу надає головне вікно)
+        self.db = DbDispatcher(parent.async_storage, self)
         self.setWindowTitle("Редагувати Квест ✏️")
 
         self.title_input.setText(goal.title)
@@ -40,8 +43,6 @@ class EditGoalDialog(AddGoalDialog):
         self.goal.deadline = deadline
         self.goal.difficulty = difficulty
 
-        try:
-            self.service.storage.save_goal(self.goal, self.service.hero_id)
-            self.accept()
-        except Exception as e:
-            QMessageBox.critical(self, "Помилка", str(e))
\ No newline at end of file
+        # Діалог закривається, коли запис підтверджено
+        self.db.call(self.service.save_goal, self.goal, on_result=lambda _: self.accept(),
+                     on_error=lambda e: QMessageBox.critical(self, "Помилка", str(e)))
\ No newline at end of file
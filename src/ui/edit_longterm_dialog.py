@@ -19,13 +19,9 @@ class EditLongTermDialog(AddLongTermDialog):
 
         self.desc_input.setText(goal.description)
 
-        try:
-            times = goal.time_frame.split(" - ")
-            if len(times) == 2:
-                self.start_time.setTime(QTime.fromString(times[0], "HH:mm"))
-                self.end_time.setTime(QTime.fromString(times[1], "HH:mm"))
-        except:
-            pass
+        if goal.has_window:
+            self.start_time.setTime(QTime(goal.window_start // 60, goal.window_start % 60))
+            self.end_time.setTime(QTime(goal.window_end // 60, goal.window_end % 60))
 
         self.lbl_warning.setVisible(False)
         self.btn_save.setText("Зберегти Зміни")
@@ -38,16 +34,10 @@ class EditLongTermDialog(AddLongTermDialog):
         t_end = self.end_time.time().toString("HH:mm")
         time_frame = f"{t_start} - {t_end}"
 
-        if not title:
-            QMessageBox.warning(self, "Помилка", "Введіть назву!")
-            return
-
-        self.goal.title = title
-        self.goal.description = desc
-        self.goal.time_frame = time_frame
-
         try:
-            self.service.storage.save_long_term_goal(self.goal, self.service.hero_id)
+            self.service.update_long_term_goal(self.goal, title, desc, time_frame)
             self.accept()
+        except ValueError as e:
+            QMessageBox.warning(self, "Помилка", str(e))
         except Exception as e:
-            QMessageBox.critical(self, "Помилка", f"Не вдалося оновити:\n{str(e)}")
\ No newline at end of file
+            QMessageBox.critical(self, "Помилка", f"Не вдалося оновити:\n{str(e)}")
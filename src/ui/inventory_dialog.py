@@ -7,6 +7,7 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QPixmap, QIcon
 from src.models import EquipmentSlot, Item
+from src.ui.db_dispatcher import DbDispatcher
 
 
 def get_project_root():
@@ -17,6 +18,8 @@ class InventoryDialog(QDialog):
     def __init__(self, parent, service):
         super().__init__(parent)
         self.service = service
+        # Інвентар читається в потоці БД (чергу надає головне вікно)
+        self.db = DbDispatcher(parent.async_storage, self)
         self.setWindowTitle("Інвентар та Спорядження 🎒")
         self.resize(900, 600)
         # Видалено світлий фон
@@ -123,13 +126,19 @@ class InventoryDialog(QDialog):
         self.refresh_ui()
 
     def refresh_ui(self):
+        """Запитує інвентар; інтерфейс оновлюється, коли дані прийдуть."""
+        self.db.call(self.service.detached, self.service.get_inventory, on_result=self.render_inventory, on_error=self.show_error)
+
+    def show_error(self, e):
+        print(f"Inventory Error: {e}")
+
+    def render_inventory(self, inventory):
         """Оновлює інтерфейс."""
         # Очищення гріду
         for i in reversed(range(self.items_grid.count())):
             self.items_grid.itemAt(i).widget().setParent(None)
 
         try:
-            inventory = self.service.get_inventory()
             equipped_items = {item.item.slot: item for item in inventory if item.is_equipped}
             bag_items = [item for item in inventory if not item.is_equipped]
 
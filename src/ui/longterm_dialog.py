@@ -112,14 +112,10 @@ class EditLongTermDialog(AddLongTermDialog):
 
         self.desc_input.setText(goal.description)
 
-        # Парсинг часу "HH:mm - HH:mm"
-        try:
-            times = goal.time_frame.split(" - ")
-            if len(times) == 2:
-                self.start_time.setTime(QTime.fromString(times[0], "HH:mm"))
-                self.end_time.setTime(QTime.fromString(times[1], "HH:mm"))
-        except:
-            pass
+        # Вікно звички зберігається у хвилинах доби
+        if goal.has_window:
+            self.start_time.setTime(QTime(goal.window_start // 60, goal.window_start % 60))
+            self.end_time.setTime(QTime(goal.window_end // 60, goal.window_end % 60))
 
         # Приховуємо попередження про старт з наступного дня, бо це редагування
         self.lbl_warning.setVisible(False)
@@ -133,18 +129,10 @@ class EditLongTermDialog(AddLongTermDialog):
         t_end = self.end_time.time().toString("HH:mm")
         time_frame = f"{t_start} - {t_end}"
 
-        if not title:
-            QMessageBox.warning(self, "Помилка", "Введіть назву!")
-            return
-
-        # Оновлюємо
-        self.goal.title = title
-        self.goal.description = desc
-        self.goal.time_frame = time_frame
-
         try:
-            # Зберігаємо через метод сервісу (або напряму в storage)
-            self.service.storage.save_long_term_goal(self.goal, self.service.hero_id)
+            self.service.update_long_term_goal(self.goal, title, desc, time_frame)
             self.accept()
+        except ValueError as e:
+            QMessageBox.warning(self, "Помилка", str(e))
         except Exception as e:
-            QMessageBox.critical(self, "Помилка", f"Не вдалося оновити:\n{str(e)}")
\ No newline at end of file
+            QMessageBox.critical(self, "Помилка", f"Не вдалося оновити:\n{str(e)}")
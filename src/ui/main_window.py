@@ -8,6 +8,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 
 from src.logic import GoalService
+from src.async_storage import AsyncStorage
+from src.ui.db_dispatcher import DbDispatcher
 
 # Імпорти діалогів
 from src.ui.dialogs import AddGoalDialog
@@ -28,15 +30,25 @@ from src.ui.tabs.quest_tab import QuestTab
 from src.ui.tabs.habit_tab import HabitTab
 from src.ui.skills_dialog import SkillsDialog
 
+# Найдовша пауза між перевірками розкладу (денна архівація, переведений годинник)
+MAX_TICK_INTERVAL_MS = 60 * 1000
+
 
 class MainWindow(QMainWindow):
     logout_signal = pyqtSignal()
 
-    def __init__(self, service: GoalService):
+    def __init__(self, service: GoalService, async_storage: AsyncStorage):
         super().__init__()
         self.service = service
         self.time_offset = timedelta(0)
 
+        # Запити до БД з таймера та дій виконуються в потоці БД. Потік належить застосунку
+        # (один на всі вікна, зупиняється при виході), тому вікно його лише використовує
+        self.async_storage = async_storage
+        self.db = DbDispatcher(self.async_storage, self)
+        self._tick_pending = False
+        self._tick_requested = False
+
         self.setWindowTitle("Learning Goals RPG 🛡️")
         self.resize(1000, 800)
 
@@ -49,9 +61,15 @@ class MainWindow(QMainWindow):
 
         self.setup_ui()
 
-        self.main_timer = QTimer(self)
-        self.main_timer.timeout.connect(self.on_tick)
-        self.main_timer.start(1000)
+        # Годинник оновлюється щосекунди без звернень до БД
+        self.clock_timer = QTimer(self)
+        self.clock_timer.timeout.connect(self.on_clock)
+        self.clock_timer.start(1000)
+
+        # Перевірки дедлайнів - одноразовим таймером до найближчої події розкладу
+        self.deadline_timer = QTimer(self)
+        self.deadline_timer.setSingleShot(True)
+        self.deadline_timer.timeout.connect(self.on_tick)
 
         self.refresh_data()
 
@@ -100,61 +118,139 @@ class MainWindow(QMainWindow):
         self.time_offset += timedelta(hours=2)
         self.on_tick()
 
+    def on_clock(self):
+        self.middle_panel.update_clock(datetime.now() + self.time_offset)
+
     def on_tick(self):
+        # Попередня перевірка ще в черзі (повільний диск/заблокована БД) - не накопичуємо нові,
+        # а запускаємо одну після неї: дія користувача могла змінити розклад уже після її читання
+        if self._tick_pending:
+            self._tick_requested = True
+            return
+        self._tick_pending = True
         simulated_now = datetime.now() + self.time_offset
-        try:
-            hero = self.service.get_hero()
+        self.db.call(self.service.detached, self._run_tick, simulated_now,
+                     on_result=lambda res: self._on_tick_done(res, simulated_now),
+                     on_error=self._on_tick_error)
+
+    def _run_tick(self, simulated_now):
+        """
+        Виконується в потоці БД. Якщо жодна подія розкладу не настала - без запитів до БД.
+        Повертає дані для панелей (через service.detached - копії, а не живі об'єкти сесії).
+        """
+        tick = self.service.run_tick(custom_now=simulated_now)
+        self.service.archive_if_due(custom_now=simulated_now)
+        next_due = self.service.next_deadline(custom_now=simulated_now)
+        if not tick.alerts:
+            # Новий день без штрафів теж змінює звички - список перемальовується з того ж знімка
+            return tick.alerts, None, None, tick.loaded_habits, next_due
+        return tick.alerts, tick.hero, tick.enemy, tick.loaded_habits, next_due
+
+    def _on_tick_done(self, result, simulated_now):
+        alerts, hero, enemy, loaded_habits, next_due = result
+        if not self._finish_tick():
+            self._arm_deadline_timer(next_due, simulated_now)
+
+        if loaded_habits is not None:
+            self.habit_tab.render_list(loaded_habits, simulated_now)
+        if alerts:
+            # Штрафи завдає ворог герою - обидва вже у знімку тіку, панелі малюються без повторного читання
+            self.hero_panel.update_data(hero)
             self.middle_panel.update_data(hero, simulated_now)
-        except:
-            pass
+            self.enemy_widget.update_enemy(enemy)
+            self.quest_tab.update_list()
+            if loaded_habits is None:
+                self.habit_tab.update_list()
+            QMessageBox.warning(self, "УВАГА!", "\n\n".join(alerts))
+
+    def _on_tick_error(self, e):
+        if not self._finish_tick():
+            self._arm_deadline_timer(None, None)
+        if not isinstance(e, ValueError):  # ValueError - сесію завершено
+            print(f"Error checking deadlines: {e}")
 
-        try:
-            alerts_q = self.service.check_deadlines(custom_now=simulated_now)
-            _, alerts_h = self.service.get_long_term_goals(custom_now=simulated_now)
-            all_alerts = alerts_q + alerts_h
+    def _finish_tick(self) -> bool:
+        """Знімає позначку перевірки; True - її запросили знову, і повторну вже запущено (вона й заведе таймер)."""
+        self._tick_pending = False
+        if not self._tick_requested:
+            return False
+        self._tick_requested = False
+        self.on_tick()
+        return True
 
-            if all_alerts:
-                self.refresh_data()
-                QMessageBox.warning(self, "УВАГА!", "\n\n".join(all_alerts))
-        except Exception as e:
-            print(f"Error checking deadlines: {e}")
+    def _arm_deadline_timer(self, next_due, simulated_now):
+        """Перезапускає одноразовий таймер до найближчої події (не довше MAX_TICK_INTERVAL_MS)."""
+        delay_ms = MAX_TICK_INTERVAL_MS
+        if next_due is not None:
+            # +1 мс: подія настає, коли час уже більший за момент дедлайну
+            delay_ms = (next_due - simulated_now).total_seconds() * 1000 + 1
+            delay_ms = int(min(max(delay_ms, 0), MAX_TICK_INTERVAL_MS))
+        self.deadline_timer.start(delay_ms)
 
     def refresh_data(self):
-        try:
-            hero = self.service.get_hero()
-            enemy = self.service.get_current_enemy()
-            simulated_now = datetime.now() + self.time_offset
+        self.db.call(self.service.detached, self._load_hero_and_enemy, on_result=self._show_hero_and_enemy,
+                     on_error=self._on_refresh_error)
 
-            self.hero_panel.update_data(hero)
-            self.middle_panel.update_data(hero, simulated_now)
-            self.enemy_widget.update_enemy(enemy)
-        except ValueError:
-            pass
-
-        # Оновлюємо списки через методи вкладок
+        # Оновлюємо списки через методи вкладок (теж через потік БД, у порядку черги)
         if hasattr(self, 'quest_tab'):
             self.quest_tab.update_list()
         if hasattr(self, 'habit_tab'):
             self.habit_tab.update_list()
 
+        # Дії користувача могли змінити розклад дедлайнів - перевіряємо і перезапускаємо таймер
+        self.on_tick()
+
+    def _load_hero_and_enemy(self):
+        """Виконується в потоці БД."""
+        return self.service.get_hero(), self.service.get_current_enemy()
+
+    def _show_hero_and_enemy(self, result):
+        hero, enemy = result
+        simulated_now = datetime.now() + self.time_offset
+        self.hero_panel.update_data(hero)
+        self.middle_panel.update_data(hero, simulated_now)
+        self.enemy_widget.update_enemy(enemy)
+
+    def _on_refresh_error(self, e):
+        if not isinstance(e, ValueError):  # ValueError - сесію завершено, нічого малювати
+            print(f"Error refreshing data: {e}")
+
     # --- МЕТОДИ КАРТОК И ДЕЙСТВИЙ ---
     # Эти методы остаются в MainWindow, так как они управляют общей логикой приложения
 
     def on_card_subgoal_checked(self, goal, subgoal, is_checked):
-        subgoal.is_completed = is_checked
-        self.service.storage.save_goal(goal, self.service.hero_id)
-
-        if is_checked:
-            if not goal.is_completed and goal.subgoals and all(s.is_completed for s in goal.subgoals):
-                msg = self.service.complete_goal(goal)
-                QMessageBox.information(self, "Квест виконано!", f"Всі підцілі завершено!\n{msg}")
-        else:
-            if goal.is_completed:
-                msg = self.service.undo_complete_goal(goal)
-                QMessageBox.warning(self, "Відміна виконання", f"Ціль повернута до активних.\n{msg}")
+        goal.set_subgoal_completed(subgoal, is_checked)
+        self.db.call(self._save_subgoal_check, goal, is_checked, on_result=self._on_subgoal_check_done,
+                     on_error=self._on_subgoal_check_error)
+
+    def _save_subgoal_check(self, goal, is_checked):
+        """Виконується в потоці БД: галочка та можливе авто-виконання/скасування - одна транзакція."""
+        completed_msg = undo_msg = None
+        with self.service.unit_of_work():
+            goal = self.service.save_goal(goal)
+
+            if is_checked:
+                if not goal.is_completed and goal.all_subgoals_done:
+                    completed_msg = self.service.complete_goal(goal)
+            else:
+                if goal.is_completed:
+                    undo_msg = self.service.undo_complete_goal(goal)
+        return completed_msg, undo_msg
+
+    def _on_subgoal_check_done(self, result):
+        completed_msg, undo_msg = result
+        if completed_msg:
+            QMessageBox.information(self, "Квест виконано!", f"Всі підцілі завершено!\n{completed_msg}")
+        if undo_msg:
+            QMessageBox.warning(self, "Відміна виконання", f"Ціль повернута до активних.\n{undo_msg}")
 
         self.refresh_data()
 
+    def _on_subgoal_check_error(self, e):
+        QMessageBox.critical(self, "Помилка", f"Не вдалося зберегти підціль:\n{str(e)}")
+        # Картка показує галочку, якої немає в БД - перемальовуємо зі збереженого стану
+        self.refresh_data()
+
     def on_add_goal(self):
         if AddGoalDialog(self, self.service).exec_(): self.refresh_data()
 
@@ -181,20 +277,19 @@ class MainWindow(QMainWindow):
 
         if reply == QMessageBox.Yes:
             try:
-                for g in completed:
-                    self.service.delete_goal(g.id)
+                self.service.delete_goals(g.id for g in completed)
                 self.refresh_data()
                 QMessageBox.information(self, "Успіх", "Виконані квести видалено.")
             except Exception as e:
                 QMessageBox.critical(self, "Помилка", f"Не вдалося видалити:\n{str(e)}")
 
     def complete_goal(self, goal):
-        try:
-            msg = self.service.complete_goal(goal)
-            QMessageBox.information(self, "Результат", msg)
-            self.refresh_data()
-        except Exception as e:
-            QMessageBox.critical(self, "Помилка", f"Не вдалося завершити квест:\n{str(e)}")
+        self.db.call(self.service.complete_goal, goal, on_result=self._on_goal_completed,
+                     on_error=lambda e: QMessageBox.critical(self, "Помилка", f"Не вдалося завершити квест:\n{str(e)}"))
+
+    def _on_goal_completed(self, msg):
+        QMessageBox.information(self, "Результат", msg)
+        self.refresh_data()
 
     def delete_goal(self, goal):
         try:
@@ -285,5 +380,6 @@ class MainWindow(QMainWindow):
     def on_logout(self):
         reply = QMessageBox.question(self, 'Вихід', "Вийти з акаунту?", QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
+            self.service.flush()
             self.logout_signal.emit()
             self.close()
\ No newline at end of file
@@ -143,8 +143,11 @@ class MiddlePanel(QFrame):
             f"QPushButton {{ background-color: {color}; color: {text_color}; border: none; border-radius: 5px; font-weight: bold; font-size: 16px; }} QPushButton:hover {{ background-color: {hover_color}; }}")
         return btn
 
-    def update_data(self, hero, simulated_time):
+    def update_clock(self, simulated_time):
         self.lbl_clock.setText(simulated_time.strftime("%H:%M:%S"))
+
+    def update_data(self, hero, simulated_time):
+        self.update_clock(simulated_time)
         if hero.nickname.lower() == "tester":
             self.btn_debug.show()
         else:
@@ -1,23 +1,40 @@
-import re
+import html
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem,
-    QLabel, QAbstractItemView, QWidget, QHBoxLayout
+    QLabel, QAbstractItemView
 )
-from PyQt5.QtCore import Qt
-from src.models import Goal
+from PyQt5.QtCore import Qt, QSize, QTimer
+from src.models import GoalSearchHit
+from src.storage import HIGHLIGHT_START, HIGHLIGHT_END
+
+SEARCH_LIMIT = 30
+SEARCH_DELAY_MS = 150
+# background-color: #f1c40f (желтый), color: #000 (черный)
+HIGHLIGHT_HTML = '<span style="background-color: #f1c40f; color: #000; font-weight: bold;">'
 
 
 class SearchDialog(QDialog):
-    def __init__(self, parent, goals: list[Goal]):
+    """
+    Пошук цілей по індексу FTS5 у БД (назви, описи, підцілі).
+    Запити виконуються в потоці БД через DbDispatcher, тож введення не гальмує.
+    """
+
+    def __init__(self, parent, service, db):
         super().__init__(parent)
         self.setWindowTitle("Пошук цілей 🔍")
         self.resize(500, 600)
-        self.goals = sorted(goals, key=lambda g: g.title.lower())  # Сортировка по алфавиту
-        self.selected_goal = None
+        self.service = service
+        self.db = db
+        self.selected_goal_id = None
+        self.pending_query = ""
+        self.request_no = 0  # номер останнього запиту: старіші відповіді відкидаються
+
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(SEARCH_DELAY_MS)
+        self.debounce.timeout.connect(self.run_search)
 
         self.setup_ui()
-        # Инициализируем список всеми целями
-        self.update_list("")
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -66,99 +83,67 @@ class SearchDialog(QDialog):
             }
         """)
         # Живой поиск
-        self.input_search.textChanged.connect(self.update_list)
+        self.input_search.textChanged.connect(self.on_text_changed)
         layout.addWidget(self.input_search)
 
         # Фокус сразу на поле ввода
         self.input_search.setFocus()
 
-    def update_list(self, text):
-        """Фильтрует цели и подсвечивает совпадения."""
+    def on_text_changed(self, text):
+        # Запит іде в БД лише після паузи у введенні
+        self.pending_query = text.strip()
+        self.debounce.start()
+
+    def run_search(self):
+        """Ставить пошук у чергу потоку БД; відповіді на застарілі запити ігноруються."""
+        query = self.pending_query
+        self.request_no += 1
+        if not query:
+            self.update_list([])
+            return
+        request_no = self.request_no
+        self.db.call(self.service.search_goals, query, SEARCH_LIMIT,
+                     on_result=lambda hits: self._on_results(request_no, hits),
+                     on_error=lambda e: print(f"Search error: {e}"))
+
+    def _on_results(self, request_no, hits):
+        if request_no == self.request_no:
+            self.update_list(hits)
+
+    def update_list(self, hits: list[GoalSearchHit]):
+        """Показує знайдені цілі (вже впорядковані за релевантністю) з підсвіченими збігами."""
         self.list_widget.clear()
-        query = text.strip()
-
-        for goal in self.goals:
-            # Проверяем совпадения
-            match_found = False
-
-            # Подготовка текста для отображения (HTML)
-            title_html = goal.title
-            desc_html = goal.description
-            subs_html = []
-
-            # Если запрос пустой, просто показываем все
-            if not query:
-                match_found = True
-            else:
-                # Поиск в заголовке
-                if self._highlight_text(query, goal.title):
-                    title_html = self._highlight_text(query, goal.title)
-                    match_found = True
-
-                # Поиск в описании
-                if self._highlight_text(query, goal.description):
-                    desc_html = self._highlight_text(query, goal.description)
-                    match_found = True
-
-                # Поиск в подцелях
-                for sub in goal.subgoals:
-                    if self._highlight_text(query, sub.title) or self._highlight_text(query, sub.description):
-                        h_title = self._highlight_text(query, sub.title) or sub.title
-                        # h_desc = self._highlight_text(query, sub.description) or sub.description
-                        subs_html.append(f"• {h_title}")
-                        match_found = True
-
-            if match_found:
-                item = QListWidgetItem()
-                item.setData(Qt.UserRole, goal)  # Храним объект цели в элементе
-
-                # Формируем HTML для отображения в списке
-                display_html = f"<div style='font-weight: bold; font-size: 15px;'>{title_html}</div>"
-                if desc_html:
-                    display_html += f"<div style='color: #aaa; font-size: 12px; margin-top: 4px;'>{desc_html}</div>"
-
-                if subs_html:
-                    subs_str = "<br>".join(subs_html)
-                    display_html += f"<div style='color: #888; font-size: 11px; margin-top: 4px; font-style: italic;'>Знайдено у підцілях:<br>{subs_str}</div>"
-
-                # Создаем виджет для отображения HTML внутри Item
-                lbl = QLabel(display_html)
-                lbl.setWordWrap(True)
-                lbl.setTextFormat(Qt.RichText)
-                lbl.setStyleSheet("background: transparent;")
-
-                # Расчет высоты
-                # (Упрощенно, можно точнее через sizeHint)
-                height = 50
-                if len(desc_html) > 50: height += 20
-                if subs_html: height += len(subs_html) * 15
-
-                item.setSizeHint(lbl.sizeHint() + models_size_fix(50, 20))  # Небольшой фикс, лучше динамически
-
-                # Добавляем в список
-                self.list_widget.addItem(item)
-                self.list_widget.setItemWidget(item, lbl)
-
-    def _highlight_text(self, query, text):
-        """Возвращает текст с HTML подсветкой или None, если совпадений нет."""
-        if not text: return None
-        if not query: return text
-
-        # Экранируем спецсимволы и ищем без учета регистра
-        pattern = re.compile(f"({re.escape(query)})", re.IGNORECASE)
-
-        if pattern.search(text):
-            # Заменяем на версию с желтым фоном
-            # background-color: #f1c40f (желтый), color: #000 (черный)
-            return pattern.sub(r'<span style="background-color: #f1c40f; color: #000; font-weight: bold;">\1</span>',
-                               text)
-        return None
+
+        for hit in hits:
+            item = QListWidgetItem()
+            item.setData(Qt.UserRole, hit.goal_id)  # Храним ID цели в элементе
+
+            # Формируем HTML для отображения в списке
+            display_html = f"<div style='font-weight: bold; font-size: 15px;'>{_to_html(hit.title)}</div>"
+            if hit.description:
+                display_html += f"<div style='color: #aaa; font-size: 12px; margin-top: 4px;'>{_to_html(hit.description)}</div>"
+            if HIGHLIGHT_START in hit.subgoals:
+                display_html += f"<div style='color: #888; font-size: 11px; margin-top: 4px; font-style: italic;'>Знайдено у підцілях:<br>{_to_html(hit.subgoals)}</div>"
+
+            # Создаем виджет для отображения HTML внутри Item
+            lbl = QLabel(display_html)
+            lbl.setWordWrap(True)
+            lbl.setTextFormat(Qt.RichText)
+            lbl.setStyleSheet("background: transparent;")
+
+            item.setSizeHint(lbl.sizeHint() + QSize(50, 20))
+
+            # Добавляем в список
+            self.list_widget.addItem(item)
+            self.list_widget.setItemWidget(item, lbl)
 
     def on_item_double_clicked(self, item):
-        self.selected_goal = item.data(Qt.UserRole)
+        self.selected_goal_id = item.data(Qt.UserRole)
         self.accept()
 
 
-def models_size_fix(w, h):
-    from PyQt5.QtCore import QSize
-    return QSize(w, h)  # Заглушка для QSize, если импорт сверху не сработал корректно в контексте eval
\ No newline at end of file
+def _to_html(text: str) -> str:
+    """Екранує текст з БД і замінює маркери збігів FTS на жовту підсвітку."""
+    return (html.escape(text)
+            .replace(HIGHLIGHT_START, HIGHLIGHT_HTML)
+            .replace(HIGHLIGHT_END, "</span>"))
@@ -2,10 +2,12 @@ import os
 import sys
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QScrollArea, QFrame, QGridLayout, QWidget, QMessageBox
+    QScrollArea, QFrame, QGridLayout, QWidget, QMessageBox, QComboBox, QCheckBox
 )
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QPixmap, QIcon
+from src.ui.db_dispatcher import DbDispatcher
+from src.models import EquipmentSlot, WeaponClass
 
 
 def get_project_root():
@@ -16,6 +18,8 @@ class ShopDialog(QDialog):
     def __init__(self, parent, service):
         super().__init__(parent)
         self.service = service
+        # Каталог і баланс читаються в потоці БД (чергу надає головне вікно)
+        self.db = DbDispatcher(parent.async_storage, self)
         self.setWindowTitle("Магазин 🛒")
         self.resize(950, 950)
         # Видалено світлий фон
@@ -29,6 +33,26 @@ class ShopDialog(QDialog):
         self.lbl_balance.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.lbl_balance)
 
+        # Фільтри вітрини (індекси каталогу предметів)
+        filters = QHBoxLayout()
+        self.slot_combo = QComboBox()
+        self.slot_combo.addItem("Усі слоти", None)
+        for slot in EquipmentSlot:
+            self.slot_combo.addItem(slot.value, slot)
+        self.class_combo = QComboBox()
+        self.class_combo.addItem("Будь-яка зброя", None)
+        for weapon_class in WeaponClass:
+            if weapon_class != WeaponClass.NONE:
+                self.class_combo.addItem(weapon_class.value, weapon_class)
+        self.chk_affordable = QCheckBox("Лише доступні")
+        for combo in (self.slot_combo, self.class_combo):
+            combo.currentIndexChanged.connect(lambda *_: self.refresh_ui())
+        self.chk_affordable.stateChanged.connect(lambda *_: self.refresh_ui())
+        filters.addWidget(self.slot_combo)
+        filters.addWidget(self.class_combo)
+        filters.addWidget(self.chk_affordable)
+        layout.addLayout(filters)
+
         # Список товарів
         scroll = QScrollArea()
         scroll.setWidgetResizable(True)
@@ -53,19 +77,26 @@ class ShopDialog(QDialog):
         self.refresh_ui()
 
     def refresh_ui(self):
+        """Запитує баланс і товари; вітрина оновлюється, коли дані прийдуть."""
+        # Значення фільтрів читаються в GUI-потоці
+        self.db.call(self._load_shop, self.slot_combo.currentData(), self.class_combo.currentData(),
+                     self.chk_affordable.isChecked(), on_result=self.render_shop,
+                     on_error=lambda e: print(f"Shop Error: {e}"))
+
+    def _load_shop(self, slot, weapon_class, affordable_only):
+        """Виконується в потоці БД."""
+        return self.service.get_hero().gold, self.service.get_shop_items(slot, weapon_class, affordable_only)
+
+    def render_shop(self, data):
+        gold, items = data
         # Очищення
         for i in reversed(range(self.grid.count())):
             self.grid.itemAt(i).widget().setParent(None)
 
         # Баланс
-        hero = self.service.get_hero()
-        self.lbl_balance.setText(f"💰 Баланс: {hero.gold}")
-
-        # Товари
-        items = self.service.get_all_library_items()
-        # Сортуємо за ціною
-        items.sort(key=lambda x: x.price)
+        self.lbl_balance.setText(f"💰 Баланс: {gold}")
 
+        # Товари (каталог уже впорядкований за ціною)
         columns = 4
         row, col = 0, 0
 
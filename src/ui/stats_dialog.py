@@ -1,8 +1,9 @@
 from PyQt5.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QFrame, QGridLayout
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QFrame, QGridLayout, QMessageBox
 )
 from PyQt5.QtCore import Qt
 from src.logic import GoalService
+from src.ui.db_dispatcher import DbDispatcher
 
 
 class StatsDialog(QDialog):
@@ -14,12 +15,26 @@ class StatsDialog(QDialog):
         # Видалено світлий фон
         # self.setStyleSheet("background-color: white;")
 
-        self.hero = self.service.get_hero()
-        self.bonuses = self.service.calculate_equipment_bonuses()
+        # Герой, бонуси спорядження та урон читаються в потоці БД (чергу надає головне вікно)
+        self.db = DbDispatcher(parent.async_storage, self)
 
-        layout = QVBoxLayout(self)
-        layout.setSpacing(10)
-        layout.setContentsMargins(20, 20, 20, 20)
+        self.main_layout = QVBoxLayout(self)
+        self.main_layout.setSpacing(10)
+        self.main_layout.setContentsMargins(20, 20, 20, 20)
+
+        self.db.call(self.service.detached, self._load_stats, on_result=self.build_ui, on_error=self.show_error)
+
+    def _load_stats(self):
+        """Виконується в потоці БД; service.detached повертає копії, а не живі об'єкти сесії."""
+        hero = self.service.get_hero()
+        return hero, self.service.calculate_equipment_bonuses(), self.service.calculate_hero_damage(hero)
+
+    def show_error(self, e):
+        QMessageBox.warning(self, "Помилка", str(e))
+
+    def build_ui(self, result):
+        self.hero, self.bonuses, (phys_dmg, magic_dmg) = result
+        layout = self.main_layout
 
         # --- ЗАГОЛОВОК: ОЧКИ ---
         self.lbl_points = QLabel(f"Вільні очки: {self.hero.stat_points}")
@@ -38,8 +53,6 @@ class StatsDialog(QDialog):
         lbl_combat_header.setStyleSheet("font-weight: bold; color: #bdc3c7; font-size: 12px; border: none; background: transparent;")
         combat_layout.addWidget(lbl_combat_header, 0, Qt.AlignHCenter)
 
-        # Розрахунок урону
-        phys_dmg, magic_dmg = self.service.calculate_hero_damage(self.hero)
         double_chance = self.bonuses.get('double_attack_chance', 0)
 
         # Grid для бойових статів
@@ -153,31 +166,35 @@ class StatsDialog(QDialog):
 
     def increase_stat(self, attr_name, lbl_widget, bonus_key):
         if self.hero.stat_points > 0:
-            current_base = getattr(self.hero, attr_name)
-            setattr(self.hero, attr_name, current_base + 1)
-            self.hero.stat_points -= 1
+            self.db.call(self._increase_stat, attr_name,
+                         on_result=lambda result: self.show_stat(result, attr_name, lbl_widget, bonus_key),
+                         on_error=self.show_error)
 
-            self.hero.update_derived_stats()
-            self.service.storage.update_hero(self.hero)
+    def _increase_stat(self, attr_name):
+        """Виконується в потоці БД: increase_stat уже повертає копію героя."""
+        hero = self.service.increase_stat(attr_name)
+        return hero, self.service.calculate_hero_damage(hero)
 
-            new_base = current_base + 1
-            bonus_val = self.bonuses.get(bonus_key, 0)
-            total_val = new_base + bonus_val
+    def show_stat(self, result, attr_name, lbl_widget, bonus_key):
+        self.hero, (new_phys, new_magic) = result
 
-            if bonus_val > 0:
-                val_text = f"{total_val} <span style='color:#bdc3c7; font-size:14px;'>({new_base} + <span style='color:#27ae60;'>{bonus_val}</span>)</span>"
-            else:
-                val_text = f"{total_val}"
+        new_base = getattr(self.hero, attr_name)
+        bonus_val = self.bonuses.get(bonus_key, 0)
+        total_val = new_base + bonus_val
+
+        if bonus_val > 0:
+            val_text = f"{total_val} <span style='color:#bdc3c7; font-size:14px;'>({new_base} + <span style='color:#27ae60;'>{bonus_val}</span>)</span>"
+        else:
+            val_text = f"{total_val}"
 
-            lbl_widget.setText(val_text)
-            self.lbl_points.setText(f"Вільні очки: {self.hero.stat_points}")
+        lbl_widget.setText(val_text)
+        self.lbl_points.setText(f"Вільні очки: {self.hero.stat_points}")
 
-            if self.hero.stat_points == 0:
-                self.disable_all_buttons()
+        if self.hero.stat_points == 0:
+            self.disable_all_buttons()
 
-            new_phys, new_magic = self.service.calculate_hero_damage(self.hero)
-            self.lbl_phys.setText(str(new_phys))
-            self.lbl_magic.setText(str(new_magic))
+        self.lbl_phys.setText(str(new_phys))
+        self.lbl_magic.setText(str(new_magic))
 
     def disable_all_buttons(self):
         for attr in ["str_stat", "int_stat", "dex_stat", "vit_stat", "def_stat"]:
@@ -277,7 +277,7 @@ class SubgoalsDialog(QDialog):
                 self.goal.add_subgoal(new_sub)
 
             self.goal.is_completed = False
-            self.service.storage.save_goal(self.goal, self.service.hero_id)
+            self.service.save_goal(self.goal)
             self.update_list()
             QMessageBox.information(self, "Успіх", "Підцілі успішно додано!")
 
@@ -298,11 +298,11 @@ class SubgoalsDialog(QDialog):
             self.list_widget.setItemWidget(item, widget)
 
     def toggle_subgoal(self, subgoal, state):
-        subgoal.is_completed = (state == Qt.Checked)
+        self.goal.set_subgoal_completed(subgoal, state == Qt.Checked)
         if self.goal.subgoals and all(s.is_completed for s in self.goal.subgoals):
             if not self.goal.is_completed:
                 self.goal.is_completed = True
-        self.service.storage.save_goal(self.goal, self.service.hero_id)
+        self.service.save_goal(self.goal)
 
     def add_subgoal(self):
         dialog = SubGoalInputDialog(self)
@@ -312,7 +312,7 @@ class SubgoalsDialog(QDialog):
                 new_sub = SubGoal(title=title, description=desc)
                 self.goal.add_subgoal(new_sub)
                 self.goal.is_completed = False
-                self.service.storage.save_goal(self.goal, self.service.hero_id)
+                self.service.save_goal(self.goal)
                 self.update_list()
 
     def edit_subgoal(self):
@@ -333,7 +333,7 @@ class SubgoalsDialog(QDialog):
             if title:
                 sub.title = title
                 sub.description = desc
-                self.service.storage.save_goal(self.goal, self.service.hero_id)
+                self.service.save_goal(self.goal)
                 self.update_list()
 
     def delete_subgoal(self):
@@ -350,6 +350,6 @@ class SubgoalsDialog(QDialog):
             subs_to_delete = [item.data(Qt.UserRole) for item in selected_items]
             for sub in subs_to_delete:
                 if sub in self.goal.subgoals:
-                    self.goal.subgoals.remove(sub)
-            self.service.storage.save_goal(self.goal, self.service.hero_id)
+                    self.goal.remove_subgoal(sub)
+            self.service.save_goal(self.goal)
             self.update_list()
\ No newline at end of file
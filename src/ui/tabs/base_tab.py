@@ -1,4 +1,4 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QComboBox, QScrollArea, QMessageBox
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QComboBox, QScrollArea, QMessageBox, QLabel
 from PyQt5.QtCore import Qt
 
 
@@ -28,6 +28,17 @@ class BaseTab(QWidget):
         scroll.setWidget(container)
         self.layout.addWidget(scroll)
 
+    def clear_list(self):
+        """Удаляет все карточки из списка."""
+        while self.list_layout.count():
+            child = self.list_layout.takeAt(0)
+            if child.widget(): child.widget().deleteLater()
+
+    def show_error(self, e):
+        """Показывает ошибку загрузки вместо списка."""
+        self.clear_list()
+        self.list_layout.addWidget(QLabel(f"Помилка: {e}", styleSheet="color: red;"))
+
     def create_tab_controls(self, btn_text, btn_command, refresh_command,
                             sort_items=None, on_sort_change=None,
                             add_cleanup=False, cleanup_command=None,
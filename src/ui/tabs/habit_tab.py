@@ -24,15 +24,20 @@ class HabitTab(BaseTab):
         self.create_scroll_area()
 
     def update_list(self):
+        """
+        Запитує звички в потоці БД; список перемальовується, коли дані прийдуть.
+        Лише читання: зміну дня і пропуски (зі зведеним алертом) обробляє тік MainWindow.
+        """
+        simulated_now = datetime.now() + self.mw.time_offset
+        self.mw.db.call(self.mw.service.list_long_term_goals,
+                        on_result=lambda goals: self.render_list(goals, simulated_now),
+                        on_error=self.show_error)
+
+    def render_list(self, lt_goals, simulated_now):
         """Обновляет список привычек."""
-        while self.list_layout.count():
-            child = self.list_layout.takeAt(0)
-            if child.widget(): child.widget().deleteLater()
+        self.clear_list()
 
-        simulated_now = datetime.now() + self.mw.time_offset
         try:
-            lt_goals, _ = self.mw.service.get_long_term_goals(custom_now=simulated_now)
-
             if self.sort_combo:
                 mode = self.sort_combo.currentText()
                 if "Дата старту (нові)" in mode:
@@ -1,9 +1,18 @@
-from PyQt5.QtWidgets import QLabel
+from PyQt5.QtWidgets import QLabel, QPushButton
 from PyQt5.QtCore import Qt
 from .base_tab import BaseTab
 from src.ui.cards import QuestCard
 from src.ui.search_dialog import SearchDialog
 
+# Пункти сортування -> режим сортування сторінок у БД (StorageService.load_goals_page)
+SORT_MODES = {
+    "Дедлайн (спочатку старі)": "deadline_asc",
+    "Дедлайн (спочатку нові)": "deadline_desc",
+    "Пріоритет (Складність)": "difficulty",
+    "Прогрес": "progress",
+    "Дата створення": "created",
+}
+
 
 class QuestTab(BaseTab):
     def __init__(self, parent, main_window):
@@ -15,6 +24,10 @@ class QuestTab(BaseTab):
         self.pinned_goal_id = None
         # Стан: чи потрібно програти анімацію (тільки 1 раз після пошуку)
         self.should_animate_pin = False
+        # Стан посторінкового завантаження: курсор наступної сторінки (None - сторінок більше немає)
+        self.sort_mode = "deadline_asc"
+        self.next_cursor = None
+        self.more_button = None
 
         self.setup_ui()
 
@@ -24,8 +37,7 @@ class QuestTab(BaseTab):
             btn_text="➕ Новий Квест",
             btn_command=self.mw.on_add_goal,
             refresh_command=self.mw.refresh_data,
-            sort_items=["Дедлайн (спочатку старі)", "Дедлайн (спочатку нові)", "Пріоритет (Складність)", "Прогрес",
-                        "Дата створення"],
+            sort_items=list(SORT_MODES),
             on_sort_change=self.on_sort_change,  # Викликаємо власний метод обробки
             add_cleanup=True,
             cleanup_command=self.mw.on_auto_delete_completed,
@@ -45,85 +57,106 @@ class QuestTab(BaseTab):
 
     def open_search(self):
         """Открывает диалог поиска."""
-        goals = self.mw.service.get_all_goals()
-        dialog = SearchDialog(self, goals)
+        dialog = SearchDialog(self, self.mw.service, self.mw.db)
 
         if dialog.exec_():
-            selected_goal = dialog.selected_goal
-            if selected_goal:
+            if dialog.selected_goal_id:
                 # Зберігаємо ID цілі, щоб вона була зверху навіть після оновлення
-                self.pinned_goal_id = selected_goal.id
+                self.pinned_goal_id = dialog.selected_goal_id
                 self.should_animate_pin = True
                 self.update_list()
 
     def update_list(self):
+        """Запитує першу сторінку квестів у потоці БД; список перемальовується, коли дані прийдуть."""
+        sort_mode = SORT_MODES.get(self.sort_combo.currentText(), "deadline_asc") if self.sort_combo else "deadline_asc"
+        self.mw.db.call(self.mw.service.detached, self._load_page, sort_mode, None,
+                        on_result=self.render_list, on_error=self.show_error)
+
+    def load_more(self):
+        """Дозавантажує наступну сторінку (кнопка "Показати ще")."""
+        if self.next_cursor is None:
+            return
+        self.mw.db.call(self.mw.service.detached, self._load_page, self.sort_mode, self.next_cursor,
+                        on_result=self.append_page, on_error=self.show_error)
+
+    def _load_page(self, sort_mode, cursor):
+        """Виконується в потоці БД (через service.detached - картки отримують копії цілей)."""
+        goals, next_cursor = self.mw.service.get_goals_page(sort_mode, cursor)
+        pinned = self.mw.service.get_goal(self.pinned_goal_id) if self.pinned_goal_id else None
+        return sort_mode, goals, next_cursor, pinned
+
+    def render_list(self, page):
         """
-        Обновляет список квестов.
+        Обновляет список квестов (перша сторінка, вже відсортована в БД).
         Використовує self.pinned_goal_id для утримання цілі зверху.
         """
-        # Очистка текущего списка
-        while self.list_layout.count():
-            child = self.list_layout.takeAt(0)
-            if child.widget(): child.widget().deleteLater()
+        self.clear_list()
+        self.more_button = None
+        sort_mode, goals, self.next_cursor, pinned_goal = page
+        self.sort_mode = sort_mode
 
         try:
-            # Получаем данные через main_window -> service
-            goals = self.mw.service.get_all_goals()
-
-            # 1. Сортировка по умолчанию или по выбору
-            if self.sort_combo:
-                mode = self.sort_combo.currentText()
-                if "Дедлайн (спочатку старі)" in mode:
-                    goals.sort(key=lambda x: (x.is_completed, x.deadline))
-                elif "Дедлайн (спочатку нові)" in mode:
-                    goals.sort(key=lambda x: (x.is_completed, x.deadline), reverse=True)
-                elif "Пріоритет" in mode:
-                    goals.sort(key=lambda x: (x.is_completed, -x.difficulty.value))
-                elif "Прогрес" in mode:
-                    goals.sort(key=lambda x: (x.is_completed, -x.calculate_progress()))
-                elif "Дата створення" in mode:
-                    goals.sort(key=lambda x: (x.is_completed, x.created_at), reverse=True)
-            else:
-                goals.sort(key=lambda x: (x.is_completed, x.deadline))
-
-            # 2. Якщо є закріплена ціль, переміщуємо її на початок
-            target_card = None
-
+            # Закріплена ціль показується першою незалежно від того, на якій вона сторінці
             if self.pinned_goal_id:
-                # Шукаємо ціль у списку
-                pinned_goal = next((g for g in goals if g.id == self.pinned_goal_id), None)
                 if pinned_goal:
-                    goals.remove(pinned_goal)
-                    goals.insert(0, pinned_goal)  # Вставляємо на 1 місце
+                    goals = [pinned_goal] + [g for g in goals if g.id != pinned_goal.id]
                 else:
                     # Якщо ціль видалили або не знайшли
                     self.pinned_goal_id = None
 
-            # 3. Отображение
             if not goals:
                 self.list_layout.addWidget(
                     QLabel("Немає активних квестів.", styleSheet="color: #7f8c8d; font-size: 14px;",
                            alignment=Qt.AlignCenter))
-            else:
-                for g in goals:
-                    card = QuestCard(
-                        g,
-                        self.mw.complete_goal,
-                        self.mw.delete_goal,
-                        self.mw.edit_goal,
-                        self.mw.manage_subgoals,
-                        self.mw.on_card_subgoal_checked
-                    )
-                    self.list_layout.addWidget(card)
-
-                    # Перевіряємо, чи це наша закріплена ціль
-                    if self.pinned_goal_id and g.id == self.pinned_goal_id:
-                        target_card = card
-
-            # 4. Анімація (тільки якщо це результат пошуку, а не просто оновлення галочки)
+                return
+
+            target_card = self._add_cards(goals)
+
+            # Анімація (тільки якщо це результат пошуку, а не просто оновлення галочки)
             if target_card and self.should_animate_pin:
                 target_card.play_highlight_animation()
                 self.should_animate_pin = False  # Більше не анімуємо при наступних оновленнях
 
+            self._update_more_button()
+
         except Exception as e:
-            self.list_layout.addWidget(QLabel(f"Помилка: {e}", styleSheet="color: red;"))
\ No newline at end of file
+            self.list_layout.addWidget(QLabel(f"Помилка: {e}", styleSheet="color: red;"))
+
+    def append_page(self, page):
+        sort_mode, goals, self.next_cursor, _ = page
+        if sort_mode != self.sort_mode:
+            return  # Сортування змінилось, поки сторінка вантажилась
+        # Закріплена ціль уже показана зверху
+        self._add_cards([g for g in goals if g.id != self.pinned_goal_id])
+        self._update_more_button()
+
+    def _add_cards(self, goals):
+        """Додає картки в кінець списку. Повертає картку закріпленої цілі, якщо вона серед них."""
+        target_card = None
+        for g in goals:
+            card = QuestCard(
+                g,
+                self.mw.complete_goal,
+                self.mw.delete_goal,
+                self.mw.edit_goal,
+                self.mw.manage_subgoals,
+                self.mw.on_card_subgoal_checked
+            )
+            self.list_layout.addWidget(card)
+
+            # Перевіряємо, чи це наша закріплена ціль
+            if self.pinned_goal_id and g.id == self.pinned_goal_id:
+                target_card = card
+        return target_card
+
+    def _update_more_button(self):
+        """Кнопка "Показати ще" завжди остання в списку і видима, лише поки є наступна сторінка."""
+        if self.more_button is not None:
+            self.list_layout.removeWidget(self.more_button)
+            self.more_button.deleteLater()
+            self.more_button = None
+        if self.next_cursor is not None:
+            self.more_button = QPushButton("Показати ще")
+            self.more_button.setCursor(Qt.PointingHandCursor)
+            self.more_button.clicked.connect(self.load_more)
+            self.list_layout.addWidget(self.more_button)
\ No newline at end of file
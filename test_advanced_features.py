@@ -1,9 +1,12 @@
 import unittest
 import json
+import random
+import os
+import tempfile
 import uuid
 from unittest.mock import MagicMock, patch
 from src.models import Hero, HeroClass, Gender, Enemy, EnemyRarity, DamageType, Goal, Difficulty, Item, ItemType, \
-    EquipmentSlot
+    EquipmentSlot, LongTermGoal
 
 # Імпортуємо всі міксини для створення повного тестового класу
 from src.logic.shop_logic import ShopLogic
@@ -13,6 +16,10 @@ from src.logic.skill_logic import SkillLogic
 from src.logic.quest_logic import QuestLogic
 from src.logic.hero_logic import HeroLogic
 from src.logic.item_logic import ItemLogic
+from src.logic import GoalService
+from src.logic.scheduler import GRACE_PERIOD
+from src.simulator import Simulator
+from src.storage import StorageService
 
 
 class FullGameService(ShopLogic, HabitLogic, CombatLogic, SkillLogic, QuestLogic, HeroLogic, ItemLogic):
@@ -58,6 +65,9 @@ class TestAdvancedFeatures(unittest.TestCase):
         # Налаштування storage
         self.mock_storage.get_hero_by_id.return_value = self.hero
         self.mock_storage.get_inventory.return_value = []  # Спочатку пустий інвентар
+        self.mock_storage.get_equipment_bonuses.return_value = {
+            'str': 0, 'int': 0, 'dex': 0, 'vit': 0, 'def': 0, 'base_dmg': 0, 'double_attack_chance': 0
+        }
 
         # --- Базовий Ворог ---
         self.enemy = Enemy(
@@ -107,16 +117,62 @@ class TestAdvancedFeatures(unittest.TestCase):
             self.service.use_skill(1)  # Будь-який скіл
         self.assertEqual(str(cm.exception), "Недостатньо мани!")
 
+    # === ВІДКЛАДЕНИЙ ЗАПИС ГЕРОЯ (SessionRepository) ===
+
+    def test_hero_writes_coalesced_per_action(self):
+        """Кілька змін героя в межах однієї дії - один UPDATE наприкінці."""
+        with self.service.unit_of_work():
+            self.service._add_rewards(self.hero, 10, 10)
+            self.service._add_rewards(self.hero, 10, 10)
+            self.service.save_hero(self.hero)
+            self.mock_storage.update_hero.assert_not_called()
+
+        self.mock_storage.update_hero.assert_called_once_with(self.hero)
+        self.assertEqual(self.hero.gold, 20)
+
+    def test_hero_changes_discarded_on_failed_action(self):
+        """При помилці дії відкладені зміни не записуються."""
+        with self.assertRaises(RuntimeError):
+            with self.service.unit_of_work():
+                self.service.save_hero(self.hero)
+                raise RuntimeError("boom")
+
+        self.service.flush()
+        self.mock_storage.update_hero.assert_not_called()
+
+    def test_hero_saved_immediately_outside_action(self):
+        self.service.save_hero(self.hero)
+        self.mock_storage.update_hero.assert_called_once_with(self.hero)
+
+    def test_increase_stat_returns_detached_copy(self):
+        """GUI отримує копію героя: зміни копії не зачіпають живий об'єкт сесії."""
+        self.hero.stat_points = 1
+        shown = self.service.increase_stat("str_stat")
+
+        self.assertEqual((self.hero.str_stat, self.hero.stat_points), (11, 0))
+        self.mock_storage.update_hero.assert_called_once_with(self.hero)
+        self.assertIsNot(shown, self.hero)
+        self.assertEqual(shown.str_stat, 11)
+        shown.gold = 999
+        self.assertEqual(self.hero.gold, 0)
+
+        with self.assertRaises(ValueError):
+            self.service.increase_stat("str_stat")
+
     # === ТЕСТИ КВЕСТІВ І UNDO (QuestLogic) ===
 
     def test_quest_completion_and_undo(self):
         """
-        Критичний тест: Виконання квесту -> Створення Snapshot -> Скасування (Undo).
+        Критичний тест: Виконання квесту -> Дельти в журналі -> Скасування (Undo).
         """
+        # Журнал подій у пам'яті замість таблиці hero_events
+        ledger = []
+        self.mock_storage.append_hero_events.side_effect = lambda hero_id, events: ledger.extend(events)
+        self.mock_storage.load_hero_events.side_effect = \
+            lambda hero_id, goal_id: [e for e in ledger if e.goal_id == str(goal_id)]
+
         # 1. Підготовка
         goal = Goal(title="Test Goal", description="Desc", deadline=datetime.now(), difficulty=Difficulty.EASY)
-        initial_gold = self.hero.gold  # 0
-        initial_xp = self.hero.current_xp  # 0
 
         # Мок для attack_enemy, бо complete_goal викликає атаку
         # Повертає (msg, is_dead, loot)
@@ -127,7 +183,8 @@ class TestAdvancedFeatures(unittest.TestCase):
 
         # Перевірки після виконання
         self.assertTrue(goal.is_completed)
-        self.assertTrue(len(goal.previous_state) > 0)  # Снепшот записався
+        self.assertEqual(goal.previous_state, "")  # Знімок більше не пишеться
+        self.assertEqual({(e.kind, e.delta) for e in ledger}, {("gold", 50), ("current_xp", 50)})
         self.assertEqual(self.hero.gold, 50)  # +50 за Easy
         self.assertEqual(self.hero.current_xp, 50)
 
@@ -141,8 +198,37 @@ class TestAdvancedFeatures(unittest.TestCase):
         self.assertFalse(goal.is_completed)
         self.assertEqual(self.hero.gold, 0)  # Повернулось
         self.assertEqual(self.hero.current_xp, 0)  # Повернулось
-        self.assertEqual(self.hero.hp, 50)  # HP відновилось зі снепшота (було 50 в setUp)
+        # Навмисна зміна поведінки: журнал скасовує лише зміни самого квесту. Знімок previous_state
+        # відкочував увесь стан героя, тож шкода, отримана вже після виконання, "лікувалась" до 50
+        self.assertEqual(self.hero.hp, 1)
         self.assertIn("відновлено", msg)
+        # Обернені дельти дописані в журнал, тож повторне виконання/скасування знову працює
+        self.assertEqual([e.delta for e in ledger if e.action == "undo" and e.kind == "gold"], [-50])
+
+    def test_legacy_snapshot_undo(self):
+        """Квест, виконаний до появи журналу, скасовується зі знімка previous_state."""
+        self.mock_storage.load_hero_events.return_value = []
+        goal = Goal(title="Old Goal", description="", deadline=datetime.now(), is_completed=True,
+                    previous_state=json.dumps({"hero": {"level": 10, "gold": 5, "current_xp": 7, "hp": 40}}))
+
+        msg = self.service.undo_complete_goal(goal)
+
+        self.assertFalse(goal.is_completed)
+        self.assertEqual((self.hero.gold, self.hero.current_xp, self.hero.hp), (5, 7, 40))
+        self.assertIn("відновлено", msg)
+
+    def test_unreadable_snapshot_falls_back_to_reward_rollback(self):
+        """Нечитабельний знімок не застосовується частково: скасовуються лише нагороди квесту."""
+        self.mock_storage.load_hero_events.return_value = []
+        self.hero.gold, self.hero.current_xp = 80, 70
+        goal = Goal(title="Old Goal", description="", deadline=datetime.now(), difficulty=Difficulty.EASY,
+                    is_completed=True, previous_state="{broken")
+
+        msg = self.service.undo_complete_goal(goal)
+
+        self.assertFalse(goal.is_completed)
+        self.assertEqual((self.hero.gold, self.hero.current_xp), (30, 20))
+        self.assertIn("частковий відкат", msg)
 
     # === ТЕСТИ БОЙОВОЇ СИСТЕМИ (CombatLogic + ItemLogic) ===
 
@@ -169,31 +255,290 @@ class TestAdvancedFeatures(unittest.TestCase):
             dmg = self.service.take_damage(self.hero, self.enemy)
             self.assertEqual(dmg, 6)
 
-    def test_equipment_bonus_calculation(self):
-        """Перевірка підрахунку статів від речей."""
-        # Створюємо 2 предмета
-        item1 = Item(name="Helm", item_type=ItemType.ARMOR, slot=EquipmentSlot.HEAD, bonus_str=5)
-        item2 = Item(name="Sword", item_type=ItemType.WEAPON, slot=EquipmentSlot.MAIN_HAND, base_dmg=10)
+    def test_repeated_damage_in_one_step(self):
+        """Урон за кілька пропущених днів рахується одним кроком з урахуванням захисту і ухилень."""
+        self.hero.def_stat = 2
+        self.hero.dex_stat = 0
+        hp = self.hero.hp
 
-        # Робимо з них InventoryItem і кажемо, що вони одягнені
-        inv_item1 = MagicMock()
-        inv_item1.item = item1
-        inv_item1.is_equipped = True
+        damage, dodged = self.service.take_repeated_damage(self.hero, self.enemy, 3)
+        self.assertEqual((damage, dodged), (18, 0))
+        self.assertEqual(self.hero.hp, max(0, hp - 18))
 
-        inv_item2 = MagicMock()
-        inv_item2.item = item2
-        inv_item2.is_equipped = True
+        self.hero.dex_stat = 100  # гарантоване ухилення
+        self.assertEqual(self.service.take_repeated_damage(self.hero, self.enemy, 4), (0, 4))
 
-        # Мокаємо get_inventory, щоб він повернув ці речі
-        self.mock_storage.get_inventory.return_value = [inv_item1, inv_item2]
+    def test_equipment_bonus_calculation(self):
+        """Бонуси спорядження береться з матеріалізованого рядка БД і враховуються в шкоді."""
+        # Шолом (+5 STR) і меч (+10 базової шкоди) одягнені - суми веде БД
+        self.mock_storage.get_equipment_bonuses.return_value.update(str=5, base_dmg=10)
 
-        # Викликаємо метод ItemLogic
         bonuses = self.service.calculate_equipment_bonuses()
 
         self.assertEqual(bonuses['str'], 5)
         self.assertEqual(bonuses['base_dmg'], 10)
         self.assertEqual(bonuses['int'], 0)
 
+        # Фізична шкода: base_damage + (STR 10 + 5) * 2 + 10; інвентар не читається
+        phys, _ = self.service.calculate_hero_damage(self.hero)
+        self.assertEqual(phys, self.hero.base_damage + 30 + 10)
+        self.mock_storage.get_inventory.assert_not_called()
+        self.mock_storage.get_equipment_bonuses.assert_called_once_with(self.hero_id)
+
+class TestGoalServiceWithStorage(unittest.TestCase):
+    """Сценарії GoalService на справжній БД: транзакції дій, журнал undo, розклад і кеш тіків."""
+
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.storage = StorageService(self.db_path)
+
+    def tearDown(self):
+        self.storage.close()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_complete_goal_is_one_commit(self):
+        """Виконання квесту (нагороди, атака, новий ворог) - один COMMIT."""
+        hero = Hero("UowHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        service = GoalService(self.storage, str(hero.id))
+        goal = service.create_goal("Quest", "", datetime.now() + timedelta(days=1), Difficulty.EASY)
+        service.get_current_enemy()
+
+        queries = []
+        conn = self.storage._get_connection()
+        conn.set_trace_callback(queries.append)
+        try:
+            service.complete_goal(goal)
+        finally:
+            conn.set_trace_callback(None)
+
+        self.assertEqual(queries.count("COMMIT"), 1)
+        self.assertTrue(self.storage.load_goals(str(hero.id))[0].is_completed)
+
+    def test_undo_uses_event_ledger(self):
+        """Виконання пише дельти в hero_events; undo застосовує обернені, журнал у сумі дає нуль."""
+        hero = Hero("LedgerHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        service = GoalService(self.storage, hero_id)
+        enemy = service.get_current_enemy()
+        enemy.current_hp = 1  # Ворог гине від атаки і замінюється новим
+        service.repo.save_enemy(enemy)
+        goal = service.create_goal("Quest", "", datetime.now() + timedelta(days=1), Difficulty.HARD)
+        before = (hero.gold, hero.current_xp, hero.level)
+
+        service.complete_goal(goal)
+        self.assertNotEqual(service.get_current_enemy().id, enemy.id)
+        self.assertEqual(self.storage.load_goals(hero_id)[0].previous_state, "")
+        kinds = {e.kind for e in self.storage.load_hero_events(hero_id, goal.id)}
+        self.assertTrue({"gold", "current_xp", "enemy_replaced"} <= kinds)
+
+        service.undo_complete_goal(goal)
+        service.flush()
+        restored = self.storage.get_hero_by_id(hero_id)
+        self.assertEqual((restored.gold, restored.current_xp, restored.level), before)
+        restored_enemy = self.storage.load_enemy(hero_id)
+        self.assertEqual((restored_enemy.id, restored_enemy.current_hp), (enemy.id, 1))
+        self.assertFalse(any(self.storage.hero_event_totals(hero_id).values()))
+
+    def test_undo_after_spending_rewards(self):
+        """Витрачене після виконання не йде в мінус при undo; шкода іншому ворогу не скасовується."""
+        hero = Hero("SpendHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        service = GoalService(self.storage, hero_id)
+        enemy = service.get_current_enemy()
+        enemy.current_hp = enemy.max_hp = 10 ** 6  # Ворог переживає атаку
+        service.repo.save_enemy(enemy)
+        goal = service.create_goal("Epic", "", datetime.now() + timedelta(days=1), Difficulty.EPIC)
+
+        service.complete_goal(goal)
+        live = service.get_hero()
+        self.assertEqual((live.gold, live.stat_points), (500, 2))
+        self.assertLess(service.get_current_enemy().current_hp, 10 ** 6)
+
+        # Гравець витрачає золото й очки, ворога замінено новим
+        with service.unit_of_work():
+            live.gold = 0
+            service.save_hero(live)
+        service.increase_stat("str_stat")
+        service.increase_stat("str_stat")
+        service.repo.delete_enemy()
+        new_enemy = service.get_current_enemy()
+        new_hp = new_enemy.current_hp
+
+        service.undo_complete_goal(goal)
+        service.flush()
+        restored = self.storage.get_hero_by_id(hero_id)
+        self.assertEqual((restored.gold, restored.stat_points, restored.level), (0, 0, 1))
+        self.assertGreaterEqual(restored.current_xp, 0)
+        self.assertGreaterEqual(restored.hp, 0)
+        self.assertEqual(restored.str_stat, hero.str_stat + 2)
+        self.assertEqual(self.storage.load_enemy(hero_id).current_hp, new_hp)
+
+    def test_deadline_schedule_runs_only_due_events(self):
+        """Перевірка за розкладом штрафує лише прострочені квести; до наступної події - без запитів до БД."""
+        hero = Hero("ScheduleHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        service = GoalService(self.storage, str(hero.id))
+        now = datetime(2030, 6, 1, 12, 0)
+        later = service.create_goal("Later", "", now + timedelta(hours=1), Difficulty.EASY)
+        overdue = service.create_goal("Overdue", "", now - timedelta(hours=1), Difficulty.EASY)
+
+        alerts = service.run_due_checks(custom_now=now)
+        self.assertEqual(len(alerts), 1)
+        self.assertIn("Overdue", alerts[0])
+        self.assertTrue(overdue.penalty_applied)
+        self.assertFalse(later.penalty_applied)
+        self.assertEqual(service.next_deadline(custom_now=now), later.deadline + GRACE_PERIOD)
+
+        queries = []
+        conn = self.storage._get_connection()
+        conn.set_trace_callback(queries.append)
+        try:
+            self.assertEqual(service.run_due_checks(custom_now=now + timedelta(minutes=30)), [])
+        finally:
+            conn.set_trace_callback(None)
+        self.assertEqual(queries, [])
+
+        # Редагування та виконання переплановують розклад
+        later.deadline = now + timedelta(hours=3)
+        service.save_goal(later)
+        self.assertEqual(service.next_deadline(custom_now=now), later.deadline + GRACE_PERIOD)
+        service.create_long_term_goal("Run", "", 10, "08:00 - 09:00")
+        habit = self.storage.load_long_term_goals(str(hero.id))[0]
+        later.is_completed = True
+        service.save_goal(later)
+        self.assertEqual(service.next_deadline(custom_now=now),
+                         datetime.combine(habit.start_date.date(), datetime.min.time()))
+
+    def test_tick_reads_each_entity_once(self):
+        """Тік з простроченими квестами і звичками читає кожну сутність раз і пише все одним COMMIT."""
+        hero = Hero("TickHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        service = GoalService(self.storage, hero_id)
+        now = datetime(2030, 6, 1, 12, 0)
+        for i in range(3):
+            service.create_goal(f"Late {i}", "", now - timedelta(hours=i + 1), Difficulty.EASY)
+        for title in ("Run", "Read"):
+            self.storage.save_long_term_goal(LongTermGoal(title=title, description="", total_days=10,
+                                                          start_date=now - timedelta(days=3),
+                                                          time_frame="08:00 - 09:00",
+                                                          window_start=8 * 60, window_end=9 * 60), hero_id)
+        service = GoalService(self.storage, hero_id)  # нова сесія: порожній кеш
+
+        queries = []
+        conn = self.storage._get_connection()
+        conn.set_trace_callback(queries.append)
+        try:
+            tick = service.run_tick(custom_now=now)
+        finally:
+            conn.set_trace_callback(None)
+
+        # 3 квести, один зведений алерт за 3 пропущені дні обох звичок і 2 пропущені старти сьогодні
+        self.assertEqual(len(tick.alerts), 6)
+        self.assertIn("Пропущено днів звичок: 6", tick.alerts[3])
+        queries = [q.strip() for q in queries if not q.startswith("--")]
+        for table in ("heroes", "current_enemies", "goals", "long_term_goals"):
+            reads = [q for q in queries if q.startswith("SELECT") and f"FROM {table} " in q + " "]
+            self.assertLessEqual(len(reads), 1, table)
+        self.assertEqual(queries.count("COMMIT"), 1)
+        self.assertEqual(self.storage.get_hero_by_id(hero_id).hp, tick.hero.hp)
+        habits = self.storage.load_long_term_goals(hero_id)
+        self.assertTrue(all(h.daily_state == "failed" and h.missed_days == 4 for h in habits))
+
+    def test_first_tick_after_absence_reports_catch_up(self):
+        """Після відпустки список звичок лише читає, а перший тік дає рівно один зведений алерт."""
+        hero = Hero("VacationHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        now = datetime(2030, 6, 20, 12, 0)
+        for title in ("Run", "Read"):
+            self.storage.save_long_term_goal(LongTermGoal(
+                title=title, description="", total_days=30, start_date=now - timedelta(days=15),
+                time_frame="20:00 - 21:00", window_start=20 * 60, window_end=21 * 60,
+                last_update_date=now - timedelta(days=10)), hero_id)
+
+        # Відкриття застосунку: вкладка звичок читає список раніше за перший тік
+        service = GoalService(self.storage, hero_id)
+        self.assertTrue(all(h.missed_days == 0 for h in service.list_long_term_goals()))
+
+        tick = service.run_tick(custom_now=now)
+        self.assertEqual(len(tick.alerts), 1)
+        self.assertIn("Пропущено днів звичок: 20", tick.alerts[0])
+        self.assertTrue(all(h.missed_days == 10 for h in service.list_long_term_goals()))
+        self.assertEqual(service.run_tick(custom_now=now).alerts, [])
+
+    def test_saving_detached_copy_keeps_live_object(self):
+        """Копія з GUI, передана в save_goal, не стає живим об'єктом сесії."""
+        hero = Hero("CopyHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        service = GoalService(self.storage, str(hero.id))
+        live = service.create_goal("Quest", "", datetime.now() + timedelta(days=1), Difficulty.EASY)
+
+        gui_copy = service.detached(service.get_goal, live.id)
+        gui_copy.title = "Renamed"
+        self.assertIs(service.save_goal(gui_copy), live)
+        self.assertEqual(live.title, "Renamed")
+        gui_copy.title = "Not saved"
+        self.assertEqual(service.get_goal(live.id).title, "Renamed")
+
+        # Ціль, якої ще немає в кеші сесії, кешується свіжою копією
+        fresh_service = GoalService(self.storage, str(hero.id))
+        stray = Goal(title="Stray", description="", deadline=datetime.now() + timedelta(days=2))
+        cached = fresh_service.save_goal(stray)
+        self.assertIsNot(cached, stray)
+        stray.title = "Not saved"
+        self.assertEqual(fresh_service.get_goal(stray.id).title, "Stray")
+        self.assertEqual(self.storage.load_goal(stray.id).title, "Stray")
+
+    def test_idle_tick_served_from_cache(self):
+        """Повторна перевірка дедлайнів без змін не читає БД."""
+        hero = Hero("CacheHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        service = GoalService(self.storage, str(hero.id))
+        goal = service.create_goal("Quest", "", datetime.now() + timedelta(days=1), Difficulty.EASY)
+        service.check_deadlines()
+
+        queries = []
+        conn = self.storage._get_connection()
+        conn.set_trace_callback(queries.append)
+        try:
+            service.check_deadlines()
+        finally:
+            conn.set_trace_callback(None)
+
+        self.assertFalse([q for q in queries if q.strip().startswith("SELECT")])
+        self.assertEqual(service.repo.cache_stats()["goals"], {"hits": 1, "misses": 1})
+        # Один живий об'єкт на ID: сервіс повертає той самий квест
+        self.assertIs(service.get_all_goals()[0], goal)
+
+        service.delete_goal(goal.id)
+        self.assertEqual(service.get_all_goals(), [])
+
+    def test_simulator_runs_on_injected_clock(self):
+        """Симулятор веде GoalService власним годинником: відтворюваний результат без реального часу."""
+        def simulate():
+            simulator = Simulator(seed=7, start=datetime(2030, 1, 1))
+            try:
+                return simulator.run(60), simulator.service.get_hero()
+            finally:
+                simulator.close()
+
+        global_state = random.getstate()
+        report, hero = simulate()
+        # Випадковість іде з власного генератора симулятора - глобальний random не зачеплено
+        self.assertEqual(random.getstate(), global_state)
+        self.assertEqual(len(report.snapshots), 60)
+        self.assertEqual(report.snapshots[-1].date, datetime(2030, 3, 1).date())
+        self.assertEqual(hero.last_login.date(), datetime(2030, 3, 2).date())
+        self.assertGreater(sum(s.goals_completed for s in report.snapshots), 0)
+        self.assertGreater(sum(s.habit_checkins for s in report.snapshots), 0)
+        self.assertGreater(sum(s.alerts for s in report.snapshots), 0)
+        self.assertEqual(simulate()[0].snapshots, report.snapshots)
+
 
 from datetime import datetime, timedelta
 
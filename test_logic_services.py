@@ -7,6 +7,9 @@ from src.logic.auth import AuthService
 from src.logic.shop_logic import ShopLogic
 from src.logic.habit_logic import HabitLogic
 from src.logic.combat_logic import CombatLogic
+from src.logic.scheduler import DeadlineScheduler
+from src.item_catalogue import ItemCatalogue
+from src.longterm_mechanics import LongTermManager
 from src.models import Hero, HeroClass, Gender, Item, ItemType, LongTermGoal
 
 
@@ -83,7 +86,7 @@ class TestBusinessLogic(unittest.TestCase):
     def test_shop_buy_item_success(self):
         item_id = uuid.uuid4()
         item = Item(id=item_id, name="Sword", price=500, item_type=ItemType.WEAPON, slot=None)
-        self.mock_storage.get_all_library_items.return_value = [item]
+        self.mock_storage.get_item_catalogue.return_value = ItemCatalogue([item])
 
         msg = self.service.buy_item(item_id)
 
@@ -94,22 +97,89 @@ class TestBusinessLogic(unittest.TestCase):
     def test_shop_buy_insufficient_funds(self):
         item_id = uuid.uuid4()
         item = Item(id=item_id, name="Expensive", price=2000, item_type=ItemType.WEAPON, slot=None)
-        self.mock_storage.get_all_library_items.return_value = [item]
+        self.mock_storage.get_item_catalogue.return_value = ItemCatalogue([item])
 
         with self.assertRaises(ValueError):
             self.service.buy_item(item_id)
 
+    # --- ТЕСТИ РОЗКЛАДУ ДЕДЛАЙНІВ (scheduler.py) ---
+    def test_deadline_scheduler_reschedule_and_cancel(self):
+        scheduler = DeadlineScheduler()
+        base = datetime(2030, 1, 1, 12, 0)
+        scheduler.schedule("a", base + timedelta(hours=2))
+        scheduler.schedule("b", base + timedelta(hours=1))
+        scheduler.schedule("a", base)  # перепланування: старий запис стає неактуальним
+        scheduler.schedule("c", base + timedelta(hours=3))
+        scheduler.cancel("c")
+
+        self.assertEqual(scheduler.next_due(), base)
+        self.assertEqual(scheduler.pop_due(base), [])  # подія настає, коли now > due
+        self.assertEqual(scheduler.pop_due(base + timedelta(hours=5)), ["a", "b"])
+        self.assertIsNone(scheduler.next_due())
+        self.assertEqual(len(scheduler), 0)
+
     # --- ТЕСТИ HABIT (habit_logic.py) ---
     def test_create_habit(self):
         self.service.create_long_term_goal("Run", "Daily", 30, "08:00 - 09:00")
         self.mock_storage.save_long_term_goal.assert_called_once()
 
+    def test_create_habit_rejects_malformed_window(self):
+        with self.assertRaises(ValueError):
+            self.service.create_long_term_goal("Run", "Daily", 30, "25:00 - 09:00")
+        with self.assertRaises(ValueError):
+            self.service.create_long_term_goal("Run", "Daily", 30, "ранок")
+        self.mock_storage.save_long_term_goal.assert_not_called()
+
+        self.service.create_long_term_goal("Run", "Daily", 30, "22:30 - 01:00")
+        saved = self.mock_storage.save_long_term_goal.call_args[0][0]
+        self.assertEqual((saved.window_start, saved.window_end), (22 * 60 + 30, 60))
+
+    def test_habit_window_crossing_midnight(self):
+        """Вікно 22:00 - 01:00: після опівночі звичка ще належить вікну попереднього дня."""
+        day = datetime.now().date() - timedelta(days=3)
+        goal = LongTermGoal(title="Night", description="", total_days=10,
+                            start_date=datetime.combine(day, time.min), time_frame="22:00 - 01:00",
+                            window_start=22 * 60, window_end=60,
+                            daily_state="started", last_update_date=datetime.combine(day, time(22, 10)))
+        enemy = MagicMock()
+        enemy.damage = 10
+
+        after_midnight = datetime.combine(day + timedelta(days=1), time(0, 30))
+        self.assertEqual(goal.habit_day(after_midnight), day)
+        self.assertEqual(self.service.check_habit_deadlines(goal, after_midnight, enemy, self.hero), [])
+        self.assertEqual(goal.daily_state, 'started')
+
+        self.assertEqual(goal.window_deadlines(day)[1], after_midnight + timedelta(minutes=35))
+        late = after_midnight + timedelta(minutes=34)
+        self.assertEqual(self.service.check_habit_deadlines(goal, late, enemy, self.hero), [])
+
+        # Пропущений старт наступного вікна рахується вже для нового дня
+        goal.daily_state = 'pending'
+        evening = datetime.combine(day + timedelta(days=1), time(22, 6))
+        alerts = self.service.check_habit_deadlines(goal, evening, enemy, self.hero)
+        self.assertIn("Час старту звички", alerts[0])
+
+    def test_count_missed_days_after_absence(self):
+        """Пропущені дні рахуються з дат: останній незавершений день, дні відсутності, межі челенджу."""
+        start = datetime(2030, 1, 1, 9, 0)
+        goal = LongTermGoal(title="Run", description="", total_days=10, start_date=start, daily_state="finished")
+        day = start.date()
+
+        self.assertEqual(LongTermManager.count_missed_days(goal, day, day + timedelta(days=1)), 0)
+        self.assertEqual(LongTermManager.count_missed_days(goal, day, day + timedelta(days=5)), 4)
+        goal.daily_state = 'started'
+        self.assertEqual(LongTermManager.count_missed_days(goal, day, day + timedelta(days=5)), 5)
+        # Після останнього (10-го) дня челенджу пропусків більше не додається
+        self.assertEqual(LongTermManager.count_missed_days(goal, day, day + timedelta(days=40)), 10)
+        # Звичку ще жодного разу не оновлювали
+        self.assertEqual(LongTermManager.count_missed_days(goal, None, day + timedelta(days=3)), 3)
+
     def test_check_habit_deadlines_missed_start(self):
         """Тест пропуску часу старту звички."""
         goal = LongTermGoal(
             title="Morning Run", description="", total_days=10,
             start_date=datetime.now(),
-            time_frame="08:00 - 09:00", daily_state="pending"
+            time_frame="08:00 - 09:00", window_start=8 * 60, window_end=9 * 60, daily_state="pending"
         )
 
         # Час 08:10 (пропуск старту)
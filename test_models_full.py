@@ -46,8 +46,17 @@ class TestModels(unittest.TestCase):
         # 1 з 2 виконано = 50%
         self.assertEqual(goal.calculate_progress(), 50.0)
 
-        s2.mark_done()
+        goal.set_subgoal_completed(s2, True)
         self.assertEqual(goal.calculate_progress(), 100.0)
+        self.assertTrue(goal.all_subgoals_done)
+
+        # Галочка чи видалення з UI видно в лічильниках одразу, без збереження
+        goal.set_subgoal_completed(s1, False)
+        self.assertEqual((goal.total_subgoals, goal.completed_subgoals), (2, 1))
+        self.assertFalse(goal.all_subgoals_done)
+        goal.remove_subgoal(s1)
+        self.assertEqual((goal.total_subgoals, goal.completed_subgoals), (1, 1))
+        self.assertTrue(goal.all_subgoals_done)
 
     def test_long_term_goal_logic(self):
         """Перевірка логіки довгострокових звичок."""
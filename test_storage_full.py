@@ -2,8 +2,22 @@ import unittest
 import uuid
 import os
 import tempfile
-from src.storage import StorageService
-from src.models import Hero, HeroClass, Gender, Item, ItemType, EquipmentSlot
+import inspect
+import sqlite3
+import threading
+import io
+import re
+from contextlib import redirect_stdout
+from src.storage import StorageService, GOAL_SORT_ORDERS, HIGHLIGHT_START, HIGHLIGHT_END
+from src.async_storage import AsyncStorage
+from src.migrations import migrate, latest_version, get_schema_version
+from src.row_mappers import ITEM_MAPPER, enum_decoder, enum_to_db
+from src.logic import GoalService
+from datetime import datetime, timedelta
+from src.models import (
+    Hero, HeroClass, Gender, Item, ItemType, EquipmentSlot, WeaponClass, Goal, SubGoal, Difficulty,
+    LongTermGoal, Enemy, EnemyRarity, DamageType, HeroEvent
+)
 
 
 class TestStorageService(unittest.TestCase):
@@ -15,7 +29,8 @@ class TestStorageService(unittest.TestCase):
         self.storage = StorageService(self.db_path)
 
     def tearDown(self):
-        # Закриваємо дескриптор і видаляємо файл після тесту
+        # Закриваємо з'єднання, дескриптор і видаляємо файл після тесту
+        self.storage.close()
         os.close(self.db_fd)
         os.unlink(self.db_path)
 
@@ -51,9 +66,9 @@ class TestStorageService(unittest.TestCase):
         item_id = uuid.uuid4()
         conn = self.storage._get_connection()
         conn.execute("""
-            INSERT INTO items_library (id, name, item_type, slot, price)
-            VALUES (?, ?, ?, ?, ?)
-        """, (str(item_id), "Test Dagger", ItemType.WEAPON.value, EquipmentSlot.MAIN_HAND.value, 100))
+            INSERT INTO items_library (id, name, item_type, slot, price, base_dmg)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (item_id.bytes, "Test Dagger", enum_to_db(ItemType.WEAPON), enum_to_db(EquipmentSlot.MAIN_HAND), 100, 7))
         conn.commit()
         conn.close()
 
@@ -77,6 +92,40 @@ class TestStorageService(unittest.TestCase):
         inventory_after = self.storage.get_inventory(str(hero.id))
         self.assertTrue(inventory_after[0].is_equipped)
 
+        # Бонуси одягненого предмета матеріалізовані в hero_equipment_bonuses
+        self.assertEqual(self.storage.get_equipment_bonuses(str(hero.id))["base_dmg"], 7)
+        self.storage.unequip_item(inv_item_id)
+        self.assertEqual(set(self.storage.get_equipment_bonuses(str(hero.id)).values()), {0})
+
+    def test_row_mappers_use_column_names(self):
+        """Мапери не залежать від порядку колонок; невідомі значення Enum предмета дають None."""
+        item_id = uuid.uuid4()
+        conn = sqlite3.connect(":memory:")
+        cursor = conn.execute("SELECT ? AS slot, 'Helm' AS name, 7 AS price, ? AS id, 99 AS item_type",
+                              (enum_to_db(EquipmentSlot.HEAD), item_id.bytes))
+        item = ITEM_MAPPER.for_cursor(cursor)(cursor.fetchone())
+        conn.close()
+
+        self.assertEqual(item.id, item_id)
+        self.assertEqual(item.slot, EquipmentSlot.HEAD)
+        self.assertIsNone(item.item_type)
+        self.assertEqual(item.price, 7)
+        with self.assertRaises(ValueError):
+            enum_decoder(HeroClass)("bogus")
+
+    def test_enemy_and_habit_round_trip(self):
+        hero = Hero("MapHero", HeroClass.MAGE, Gender.FEMALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        enemy = Enemy(name="Orc", rarity=EnemyRarity.BOSS, level=3, current_hp=40, max_hp=50, damage=7,
+                      damage_type=DamageType.MAGICAL, reward_xp=10, reward_gold=5, drop_chance=0.5)
+        self.storage.save_enemy(enemy, hero_id)
+        self.assertEqual(self.storage.load_enemy(hero_id), enemy)
+
+        habit = LongTermGoal(title="Run", description="", total_days=10, start_date=datetime(2024, 1, 1))
+        self.storage.save_long_term_goal(habit, hero_id)
+        self.assertEqual(self.storage.load_long_term_goals(hero_id), [habit])
+
     def test_duplicate_nickname(self):
         """Перевірка унікальності нікнейму."""
         h1 = Hero("UniqueNick", HeroClass.WARRIOR, Gender.MALE, "1")
@@ -86,6 +135,742 @@ class TestStorageService(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.storage.create_hero(h2)
 
+    def test_connection_is_reused(self):
+        """Один потік отримує одне й те саме з'єднання з налаштованими PRAGMA."""
+        conn = self.storage._get_connection()
+        self.assertIs(conn, self.storage._get_connection())
+        self.assertEqual(conn.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+
+        # close() від викликаючого коду не закриває з'єднання з пулу
+        conn.close()
+        self.assertIsNone(self.storage.get_hero_by_nickname("Nobody"))
+
+    def test_connection_per_thread(self):
+        """Інший потік (напр. Qt worker) отримує власне з'єднання."""
+        main_conn = self.storage._get_connection()
+        result = {}
+
+        def worker():
+            result['conn'] = self.storage._get_connection()
+            result['hero'] = self.storage.get_hero_by_nickname("Nobody")
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(result['conn'], main_conn)
+        self.assertIsNone(result['hero'])
+
+    def test_async_storage_keeps_order(self):
+        """Завдання виконуються в одному потоці БД у порядку надходження."""
+        hero = Hero("AsyncHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        async_storage = AsyncStorage(self.storage)
+        try:
+            for i in range(10):
+                async_storage.save_goal(Goal(title=f"G{i}", description="", deadline=datetime.now()), hero_id)
+            goals = async_storage.load_goals(hero_id).result(timeout=5)
+            worker = async_storage.submit(threading.current_thread).result(timeout=5)
+        finally:
+            async_storage.shutdown()
+
+        self.assertEqual([g.title for g in goals], [f"G{i}" for i in range(10)])
+        self.assertIsNot(worker, threading.current_thread())
+
+    def test_close_and_context_manager(self):
+        """Після close() сервіс відкриває нове з'єднання при наступному запиті."""
+        old_conn = self.storage._get_connection()
+        self.storage.close()
+        self.assertIsNot(old_conn, self.storage._get_connection())
+
+        with StorageService(self.db_path) as storage:
+            storage.create_hero(Hero("CtxHero", HeroClass.WARRIOR, Gender.MALE, "img"))
+        self.assertEqual(storage._connections, [])
+        self.assertIsNotNone(self.storage.get_hero_by_nickname("CtxHero"))
+
+    def test_load_goals_without_n_plus_one(self):
+        """Цілі та підцілі завантажуються двома запитами незалежно від кількості цілей."""
+        hero = Hero("GoalsHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+
+        for i in range(5):
+            goal = Goal(title=f"Goal {i}", description="", deadline=datetime.now() + timedelta(days=i),
+                        difficulty=Difficulty.MEDIUM)
+            for j in range(3):
+                goal.add_subgoal(SubGoal(title=f"Sub {i}.{j}", is_completed=(j == 0)))
+            self.storage.save_goal(goal, str(hero.id))
+
+        queries = []
+        conn = self.storage._get_connection()
+        conn.set_trace_callback(queries.append)
+        try:
+            goals = self.storage.load_goals(str(hero.id))
+        finally:
+            conn.set_trace_callback(None)
+
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(len(goals), 5)
+        for goal in goals:
+            index = goal.title.split()[-1]
+            self.assertEqual([s.title for s in goal.subgoals], [f"Sub {index}.{j}" for j in range(3)])
+            self.assertEqual([s.is_completed for s in goal.subgoals], [True, False, False])
+
+    def test_migrations_fast_path(self):
+        """Актуальна схема: migrate() виконує лише читання user_version, без DDL."""
+        conn = self.storage._get_connection()
+        self.assertEqual(get_schema_version(conn), latest_version())
+
+        queries = []
+        conn.set_trace_callback(queries.append)
+        try:
+            report = migrate(conn)
+        finally:
+            conn.set_trace_callback(None)
+
+        self.assertEqual(report.steps, [])
+        self.assertEqual(queries, ["PRAGMA user_version"])
+
+    def test_legacy_database_is_migrated(self):
+        """Стара БД без user_version та без нових колонок доводиться до актуальної схеми."""
+        fd, legacy_path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            conn = sqlite3.connect(legacy_path)
+            conn.execute("CREATE TABLE goals (id TEXT PRIMARY KEY, hero_id TEXT NOT NULL, title TEXT NOT NULL, "
+                         "description TEXT, deadline TEXT, difficulty INTEGER, created_at TEXT, "
+                         "is_completed INTEGER DEFAULT 0, penalty_applied INTEGER DEFAULT 0)")
+            conn.commit()
+            conn.close()
+
+            output = io.StringIO()
+            with redirect_stdout(output), StorageService(legacy_path) as storage:
+                report = storage.migration_report
+                columns = [row[1] for row in storage._get_connection().execute("PRAGMA table_info(goals)")]
+
+            # Звіт лише повертається - друкувати його вирішує застосунок
+            self.assertEqual(output.getvalue(), "")
+            self.assertEqual(report.from_version, 0)
+            self.assertEqual(report.to_version, latest_version())
+            self.assertEqual([v for v, _, _ in report.steps], list(range(1, latest_version() + 1)))
+            self.assertIn("previous_state", columns)
+        finally:
+            os.unlink(legacy_path)
+
+    def test_text_encoded_database_is_compacted(self):
+        """Міграція 8 переводить TEXT UUID, ISO-дати та рядкові Enum у BLOB/INTEGER без втрати даних."""
+        fd, legacy_path = tempfile.mkstemp()
+        os.close(fd)
+        hero_id, goal_id, sub_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        deadline = datetime(2024, 5, 1, 18, 30, 15, 123456)
+        try:
+            conn = sqlite3.connect(legacy_path)
+            migrate(conn, target=7)
+            conn.execute("INSERT INTO heroes (id, nickname, hero_class, gender, appearance, last_login) "
+                         "VALUES (?, 'Old', ?, ?, 'img', ?)",
+                         (str(hero_id), HeroClass.MAGE.value, Gender.FEMALE.value, deadline.isoformat()))
+            conn.execute("INSERT INTO goals (id, hero_id, title, description, deadline, difficulty, created_at) "
+                         "VALUES (?, ?, 'Legacy quest', 'text', ?, 2, ?)",
+                         (str(goal_id), str(hero_id), deadline.isoformat(), deadline.isoformat()))
+            conn.execute("INSERT INTO sub_goals (id, goal_id, title) VALUES (?, ?, 'Step')",
+                         (str(sub_id), str(goal_id)))
+            conn.commit()
+            conn.close()
+
+            with StorageService(legacy_path) as storage:
+                types = storage._get_connection().execute(
+                    "SELECT typeof(id), typeof(hero_id), typeof(deadline) FROM goals").fetchone()
+                hero = storage.get_hero_by_id(str(hero_id))
+                goals = storage.load_goals(str(hero_id))
+                hits = storage.search_goals(str(hero_id), "Legacy")
+
+            self.assertEqual(types, ("blob", "blob", "integer"))
+            self.assertEqual((hero.id, hero.hero_class, hero.gender), (hero_id, HeroClass.MAGE, Gender.FEMALE))
+            self.assertEqual(hero.last_login, deadline)
+            self.assertEqual(goals[0].id, goal_id)
+            self.assertEqual(goals[0].deadline, deadline)
+            self.assertEqual([s.id for s in goals[0].subgoals], [sub_id])
+            self.assertEqual([h.goal_id for h in hits], [goal_id])
+        finally:
+            os.unlink(legacy_path)
+
+    def test_compaction_quarantines_orphans(self):
+        """Рядки-сироти не видаляються міграцією 8: вони переносяться в {table}_orphans і рахуються у звіті."""
+        fd, legacy_path = tempfile.mkstemp()
+        os.close(fd)
+        goal_id = uuid.uuid4()
+        try:
+            conn = sqlite3.connect(legacy_path)
+            migrate(conn, target=7)
+            conn.execute("INSERT INTO goals (id, hero_id, title, description, deadline, difficulty, created_at) "
+                         "VALUES (?, ?, 'Orphan quest', '', NULL, 1, NULL)", (str(goal_id), str(uuid.uuid4())))
+            conn.execute("INSERT INTO sub_goals (id, goal_id, title) VALUES (?, ?, 'Step')",
+                         (str(uuid.uuid4()), str(goal_id)))
+            conn.commit()
+
+            report = migrate(conn)
+            titles = conn.execute("SELECT title FROM goals_orphans").fetchall()
+            remaining = conn.execute("SELECT COUNT(*) FROM goals").fetchone()[0]
+            conn.close()
+
+            self.assertEqual(report.to_version, latest_version())
+            self.assertEqual(report.quarantined, {"goals": 1, "sub_goals": 1})
+            self.assertIn("goals_orphans", str(report))
+            self.assertEqual(titles, [("Orphan quest",)])
+            self.assertEqual(remaining, 0)
+        finally:
+            os.unlink(legacy_path)
+
+    def test_habit_windows_are_backfilled(self):
+        """Міграція 11 розбирає time_frame наявних звичок у хвилини доби; невалідний рядок - без вікна."""
+        fd, legacy_path = tempfile.mkstemp()
+        os.close(fd)
+        hero_id = uuid.uuid4()
+        try:
+            conn = sqlite3.connect(legacy_path)
+            migrate(conn, target=10)
+            conn.execute("INSERT INTO heroes (id, nickname, hero_class, gender, appearance) "
+                         "VALUES (?, 'Old', ?, ?, 'img')", (hero_id.bytes, enum_to_db(HeroClass.MAGE), enum_to_db(Gender.FEMALE)))
+            for title, time_frame in (("Night", "22:30 - 01:00"), ("Broken", "колись")):
+                conn.execute("INSERT INTO long_term_goals (id, hero_id, title, total_days, start_date, time_frame) "
+                             "VALUES (?, ?, ?, 10, 0, ?)", (uuid.uuid4().bytes, hero_id.bytes, title, time_frame))
+            conn.commit()
+            conn.close()
+
+            with StorageService(legacy_path) as storage:
+                habits = {h.title: h for h in storage.load_long_term_goals(str(hero_id))}
+
+            self.assertEqual((habits["Night"].window_start, habits["Night"].window_end), (22 * 60 + 30, 60))
+            self.assertTrue(habits["Night"].crosses_midnight)
+            self.assertFalse(habits["Broken"].has_window)
+        finally:
+            os.unlink(legacy_path)
+
+    def test_habit_windows_are_refilled(self):
+        """Міграція 12 заповнює вікна, які лишились порожніми (напр. початок = кінець); модель сама не розбирає."""
+        fd, legacy_path = tempfile.mkstemp()
+        os.close(fd)
+        hero_id = uuid.uuid4()
+        try:
+            conn = sqlite3.connect(legacy_path)
+            migrate(conn, target=11)
+            conn.execute("INSERT INTO heroes (id, nickname, hero_class, gender, appearance) "
+                         "VALUES (?, 'Old', ?, ?, 'img')", (hero_id.bytes, enum_to_db(HeroClass.MAGE), enum_to_db(Gender.FEMALE)))
+            for title, time_frame in (("Point", "07:00 - 07:00"), ("Plain", "08:00 - 09:00"), ("Broken", "колись")):
+                conn.execute("INSERT INTO long_term_goals (id, hero_id, title, total_days, start_date, time_frame) "
+                             "VALUES (?, ?, ?, 10, 0, ?)", (uuid.uuid4().bytes, hero_id.bytes, title, time_frame))
+            conn.commit()
+            conn.close()
+
+            with StorageService(legacy_path) as storage:
+                habits = {h.title: h for h in storage.load_long_term_goals(str(hero_id))}
+
+            self.assertEqual((habits["Point"].window_start, habits["Point"].window_end), (7 * 60, 7 * 60))
+            self.assertEqual((habits["Plain"].window_start, habits["Plain"].window_end), (8 * 60, 9 * 60))
+            self.assertFalse(habits["Broken"].has_window)
+            self.assertFalse(LongTermGoal(title="Raw", description="", total_days=1, start_date=datetime.now(),
+                                          time_frame="08:00 - 09:00").has_window)
+        finally:
+            os.unlink(legacy_path)
+
+    def test_item_seeding_is_incremental(self):
+        """Сідер пропускає незмінену папку і застосовує лише різницю."""
+        with tempfile.TemporaryDirectory() as items_dir:
+            _write_item_file(items_dir, "Тестовий_меч_5_0_0_0_0.png")
+            _write_item_file(items_dir, "Тестовий_щит_0_0_0_0_2.png")
+
+            with StorageService(self.db_path, items_path=items_dir) as storage:
+                names = sorted(i.name for i in storage.get_all_library_items())
+                self.assertEqual(names, ["Тестовий меч", "Тестовий щит"])
+
+                # Папка не змінилась - жодного запису в БД
+                queries = []
+                conn = storage._get_connection()
+                conn.set_trace_callback(queries.append)
+                try:
+                    summary = storage.seed_items_from_folder()
+                finally:
+                    conn.set_trace_callback(None)
+                self.assertEqual(summary, {"added": 0, "changed": 0, "removed": 0})
+                self.assertEqual(len(queries), 1)
+
+                # Каталог читається з БД один раз
+                catalogue = storage.get_item_catalogue()
+                self.assertIs(storage.get_item_catalogue(), catalogue)
+                shield = catalogue.for_slot(EquipmentSlot.OFF_HAND)[0]
+                self.assertIs(catalogue.get(shield.id), shield)
+
+                # Клас зброї декодується з БД і потрапляє у свій індекс
+                self.assertEqual([i.name for i in catalogue.for_weapon_class(WeaponClass.SWORD)], ["Тестовий меч"])
+                self.assertEqual(shield.weapon_class, WeaponClass.SHIELD)
+                self.assertEqual(catalogue.select(weapon_class=WeaponClass.SHIELD, max_price=shield.price), [shield])
+                self.assertEqual(catalogue.select(slot=EquipmentSlot.HEAD), [])
+
+                # Один файл видалено, один додано
+                os.remove(os.path.join(items_dir, "Тестовий_щит_0_0_0_0_2.png"))
+                _write_item_file(items_dir, "Тестовий_шолом_0_2_0_0_1.png")
+                summary = storage.seed_items_from_folder()
+                self.assertEqual(summary, {"added": 1, "changed": 0, "removed": 1})
+                names = sorted(i.name for i in storage.get_all_library_items())
+                self.assertEqual(names, ["Тестовий меч", "Тестовий шолом"])
+
+                # Після змін сідера каталог перебудовано
+                catalogue = storage.get_item_catalogue()
+                self.assertEqual(sorted(i.name for i in catalogue.items), names)
+                self.assertIsNone(catalogue.get(shield.id))
+                self.assertEqual([i.name for i in catalogue.for_slot(EquipmentSlot.HEAD)], ["Тестовий шолом"])
+
+    def test_rolled_back_save_is_written_again(self):
+        """Після відкоту зовнішньої транзакції ціль не вважається записаною - наступне збереження її пише."""
+        hero = Hero("RollbackHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        goal = Goal(title="Lost?", description="", deadline=datetime.now())
+        goal.add_subgoal(SubGoal(title="Step"))
+
+        with self.assertRaises(RuntimeError):
+            with self.storage.transaction():
+                self.storage.save_goal(goal, hero_id)
+                raise RuntimeError("дія не вдалась")
+        self.assertIsNone(goal._saved_state)
+        self.assertEqual(self.storage.load_goals(hero_id), [])
+
+        self.storage.save_goal(goal, hero_id)
+        loaded = self.storage.load_goals(hero_id)
+        self.assertEqual([(g.id, len(g.subgoals)) for g in loaded], [(goal.id, 1)])
+
+    def test_save_goal_writes_only_changes(self):
+        """Збереження цілі записує лише змінені підцілі; без змін - жодного запиту."""
+        hero = Hero("DiffHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+
+        goal = Goal(title="Epic", description="", deadline=datetime.now(), difficulty=Difficulty.EPIC)
+        for i in range(8):
+            goal.add_subgoal(SubGoal(title=f"Step {i}"))
+        self.storage.save_goal(goal, hero_id)
+
+        loaded = self.storage.load_goals(hero_id)[0]
+        conn = self.storage._get_connection()
+        queries = []
+        conn.set_trace_callback(queries.append)
+        try:
+            self.storage.save_goal(loaded, hero_id)
+            self.assertEqual(queries, [])
+
+            loaded.set_subgoal_completed(loaded.subgoals[3], True)
+            loaded.remove_subgoal(loaded.subgoals[5])
+            self.storage.save_goal(loaded, hero_id)
+        finally:
+            conn.set_trace_callback(None)
+
+        # Тригери FTS трасуються повтором того самого оператора та внутрішніми "-- ..." запитами
+        # віртуальної таблиці - рахуємо лише запити клієнта
+        queries = [q for q in queries if not q.startswith("--")]
+        statements = [q for i, q in enumerate(queries) if i == 0 or q != queries[i - 1]]
+        writes = [q for q in statements if q.strip().startswith(("INSERT", "UPDATE", "DELETE"))]
+        # DELETE і UPSERT підцілі; лічильники та прогрес цілі оновлюють тригери
+        self.assertEqual(len(writes), 2)
+
+        reloaded = self.storage.load_goals(hero_id)[0]
+        self.assertEqual([s.title for s in reloaded.subgoals], [f"Step {i}" for i in range(8) if i != 5])
+        self.assertTrue(reloaded.subgoals[3].is_completed)
+        self.assertEqual((reloaded.total_subgoals, reloaded.completed_subgoals), (7, 1))
+        self.assertEqual((loaded.total_subgoals, loaded.completed_subgoals), (7, 1))
+
+        # Об'єкт без знімка стану (створений поза load_goals) теж зберігається коректно
+        goal.title = "Epic renamed"
+        self.storage.save_goal(goal, hero_id)
+        reloaded = self.storage.load_goals(hero_id)[0]
+        self.assertEqual(reloaded.title, "Epic renamed")
+        self.assertEqual(len(reloaded.subgoals), 7)
+
+    def test_sub_goal_counters_follow_triggers(self):
+        """Лічильники підцілей і прогрес у goals точні за будь-яких змін sub_goals, навіть в обхід save_goal."""
+        hero = Hero("CountHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        first = Goal(title="First", description="", deadline=datetime.now(),
+                     subgoals=[SubGoal(title="A", is_completed=True), SubGoal(title="B")])
+        second = Goal(title="Second", description="", deadline=datetime.now())
+        self.storage.save_goals([first, second], hero_id)
+
+        def counters():
+            rows = self.storage._get_connection().execute(
+                "SELECT title, total_subgoals, completed_subgoals, progress FROM goals ORDER BY title")
+            return {title: (total, done, progress) for title, total, done, progress in rows}
+
+        self.assertEqual(counters(), {"First": (2, 1, 50.0), "Second": (0, 0, 0.0)})
+
+        conn = self.storage._get_connection()
+        conn.execute("UPDATE sub_goals SET goal_id = ? WHERE id = ?", (second.id.bytes, first.subgoals[1].id.bytes))
+        self.assertEqual(counters(), {"First": (1, 1, 100.0), "Second": (1, 0, 0.0)})
+
+        second.is_completed = True
+        self.storage.save_goal(second, hero_id)
+        conn.execute("DELETE FROM sub_goals WHERE id = ?", (first.subgoals[0].id.bytes,))
+        self.assertEqual(counters(), {"First": (0, 0, 0.0), "Second": (1, 0, 0.0)})
+
+        loaded = {g.title: g for g in self.storage.load_goals(hero_id)}
+        self.assertEqual(loaded["Second"].calculate_progress(), 0.0)
+        self.assertFalse(loaded["Second"].all_subgoals_done)
+
+    def test_goals_page_without_subgoals_reads_counters(self):
+        """Сторінка без підцілей: прогрес і лічильники читаються з goals, без запиту до sub_goals."""
+        hero = Hero("PageHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        goal = Goal(title="Steps", description="", deadline=datetime.now(),
+                    subgoals=[SubGoal(title="A", is_completed=True), SubGoal(title="B"), SubGoal(title="C")])
+        self.storage.save_goal(goal, hero_id)
+
+        conn = self.storage._get_connection()
+        queries = []
+        conn.set_trace_callback(queries.append)
+        try:
+            page, _ = self.storage.load_goals_page(hero_id, limit=10, with_subgoals=False)
+        finally:
+            conn.set_trace_callback(None)
+
+        self.assertFalse(any("sub_goals" in q for q in queries))
+        summary = page[0]
+        self.assertEqual(summary.subgoals, [])
+        self.assertEqual((summary.total_subgoals, summary.completed_subgoals), (3, 1))
+        self.assertAlmostEqual(summary.calculate_progress(), 100.0 / 3)
+        self.assertFalse(summary.all_subgoals_done)
+        # Без підцілей ціль не зберігається - інакше save_goals видалив би їх з БД
+        with self.assertRaises(ValueError):
+            self.storage.save_goal(summary, hero_id)
+
+        full = self.storage.load_goals_page(hero_id, limit=10)[0][0]
+        for sub in full.subgoals:
+            full.set_subgoal_completed(sub, True)
+        self.assertTrue(full.all_subgoals_done)
+        self.storage.save_goal(full, hero_id)
+        summary = self.storage.load_goals_page(hero_id, limit=10, with_subgoals=False)[0][0]
+        self.assertEqual((summary.total_subgoals, summary.completed_subgoals), (3, 3))
+        self.assertTrue(summary.all_subgoals_done)
+
+    def test_transaction_is_one_commit(self):
+        """Записи всередині transaction() фіксуються разом або відкочуються разом."""
+        hero = Hero("TxHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+
+        queries = []
+        conn = self.storage._get_connection()
+        conn.set_trace_callback(queries.append)
+        try:
+            with self.storage.transaction():
+                hero.gold = 10
+                self.storage.update_hero(hero)
+                self.storage.save_goal(Goal(title="In tx", description="", deadline=datetime.now()), hero_id)
+        finally:
+            conn.set_trace_callback(None)
+        self.assertEqual(queries.count("COMMIT"), 1)
+
+        with self.assertRaises(RuntimeError):
+            with self.storage.transaction():
+                hero.gold = 99
+                self.storage.update_hero(hero)
+                raise RuntimeError("boom")
+        self.assertEqual(self.storage.get_hero_by_id(hero_id).gold, 10)
+
+        # Помилка, перехоплена всередині, відкочує лише вкладений блок
+        with self.storage.transaction():
+            with self.assertRaises(ValueError):
+                self.storage.create_hero(Hero("TxHero", HeroClass.MAGE, Gender.MALE, "img"))
+            self.storage.save_goal(Goal(title="After error", description="", deadline=datetime.now()), hero_id)
+        self.assertEqual(len(self.storage.load_goals(hero_id)), 2)
+
+    def test_goal_pages_match_python_sort(self):
+        """Сторінки з курсором дають той самий порядок, що й сортування QuestTab, без пропусків."""
+        hero = Hero("PageHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        base = datetime(2024, 1, 1)
+        goals = []
+        for i in range(23):
+            goal = Goal(title=f"P{i}", description="", deadline=base + timedelta(days=i % 7),
+                        difficulty=list(Difficulty)[i % 4], created_at=base + timedelta(hours=i))
+            goal.is_completed = i % 5 == 0
+            for j in range(i % 3):
+                goal.add_subgoal(SubGoal(title="s", is_completed=j < i % 2))
+            goals.append(goal)
+        self.storage.save_goals(goals, hero_id)
+
+        expected = {
+            "deadline_asc": sorted(goals, key=lambda g: (g.is_completed, g.deadline, str(g.id))),
+            "deadline_desc": sorted(goals, key=lambda g: (g.is_completed, g.deadline, str(g.id)), reverse=True),
+            "difficulty": sorted(goals, key=lambda g: (g.is_completed, -g.difficulty.value, [-ord(c) for c in str(g.id)])),
+            "progress": sorted(goals, key=lambda g: (g.is_completed, -g.calculate_progress(), [-ord(c) for c in str(g.id)])),
+            "created": sorted(goals, key=lambda g: (g.is_completed, g.created_at, str(g.id)), reverse=True),
+        }
+        for sort_mode, expected_goals in expected.items():
+            titles, cursor = [], None
+            while True:
+                page, cursor = self.storage.load_goals_page(hero_id, sort_mode, cursor, limit=5)
+                titles += [g.title for g in page]
+                if cursor is None:
+                    break
+            self.assertEqual(titles, [g.title for g in expected_goals], sort_mode)
+
+    def test_search_goals_full_text(self):
+        """Пошук FTS5: збіги в назвах, описах і підцілях, ранжування, синхронізація тригерами."""
+        hero = Hero("SearchHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        other = Hero("OtherHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        self.storage.create_hero(other)
+        hero_id = str(hero.id)
+
+        in_title = Goal(title="Вивчити Python", description="", deadline=datetime.now())
+        in_desc = Goal(title="Курс", description="Асинхронний python та asyncio", deadline=datetime.now())
+        in_sub = Goal(title="Проєкт", description="", deadline=datetime.now())
+        in_sub.add_subgoal(SubGoal(title="Тести на pytest"))
+        self.storage.save_goals([in_title, in_desc, in_sub], hero_id)
+        self.storage.save_goal(Goal(title="Python чужого героя", description="", deadline=datetime.now()),
+                               str(other.id))
+
+        hits = self.storage.search_goals(hero_id, "pyth")
+        self.assertEqual([h.goal_id for h in hits], [in_title.id, in_desc.id])  # назва важить більше
+        self.assertIn(HIGHLIGHT_START + "Python" + HIGHLIGHT_END, hits[0].title)
+
+        hits = self.storage.search_goals(hero_id, "pytest")
+        self.assertEqual([h.goal_id for h in hits], [in_sub.id])
+        self.assertIn(HIGHLIGHT_START, hits[0].subgoals)
+
+        # Зміни підцілей і видалення потрапляють в індекс через тригери
+        in_sub.subgoals[0].title = "Тести на unittest"
+        self.storage.save_goal(in_sub, hero_id)
+        self.assertEqual(self.storage.search_goals(hero_id, "pytest"), [])
+        self.storage.delete_goal(in_title.id)
+        self.assertEqual([h.goal_id for h in self.storage.search_goals(hero_id, "python")], [in_desc.id])
+
+        # Синтаксис FTS у запиті користувача не ламає пошук
+        self.assertEqual(self.storage.search_goals(hero_id, 'AND " *'), [])
+        self.assertEqual(self.storage.load_goal(in_sub.id).subgoals[0].title, "Тести на unittest")
+
+    def test_bulk_operations_are_one_commit(self):
+        """Пакетне збереження та видалення цілей - один COMMIT на всю пачку."""
+        hero = Hero("BulkHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        goals = []
+        for i in range(30):
+            goal = Goal(title=f"Bulk {i}", description="", deadline=datetime.now())
+            goal.add_subgoal(SubGoal(title="Step"))
+            goals.append(goal)
+
+        queries = []
+        conn = self.storage._get_connection()
+        conn.set_trace_callback(queries.append)
+        try:
+            self.storage.save_goals(goals, hero_id)
+            self.assertEqual(len(self.storage.load_goals(hero_id)), 30)
+            self.storage.delete_goals([g.id for g in goals[:20]])
+        finally:
+            conn.set_trace_callback(None)
+
+        self.assertEqual(queries.count("COMMIT"), 2)
+        remaining = self.storage.load_goals(hero_id)
+        self.assertEqual(sorted(g.title for g in remaining), sorted(f"Bulk {i}" for i in range(20, 30)))
+        self.assertTrue(all(len(g.subgoals) == 1 for g in remaining))
+
+    def test_completed_items_are_archived(self):
+        """Виконані квести та звички після терміну зберігання переходять в архів, активні - лишаються."""
+        hero = Hero("ArchiveHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        service = GoalService(self.storage, hero_id, archive_retention_days=3)
+        done = service.create_goal("Done", "", datetime.now() + timedelta(days=1), Difficulty.EASY)
+        done.add_subgoal(SubGoal(title="Step"))
+        active = service.create_goal("Active", "", datetime.now() + timedelta(days=10), Difficulty.EASY)
+        service.complete_goal(done)
+        self.assertIsNotNone(done.completed_at)
+
+        habit = LongTermGoal(title="Run", description="", total_days=1, start_date=datetime.now())
+        service.storage.save_long_term_goal(habit, hero_id)
+        service.finish_habit(habit)
+        self.assertTrue(habit.is_completed)
+
+        # У межах терміну зберігання нічого не переноситься
+        self.assertEqual(service.archive_completed(datetime.now() + timedelta(days=1)), (0, 0))
+        self.assertEqual(service.archive_completed(datetime.now() + timedelta(days=4)), (1, 1))
+
+        self.assertEqual(service.get_all_goals(), [active])
+        self.assertEqual(self.storage.load_goals(hero_id), [active])
+        self.assertEqual(self.storage.search_goals(hero_id, "Done"), [])
+        archived, next_cursor = service.get_archived_goals()
+        self.assertEqual([(g.id, g.title, len(g.subgoals)) for g in archived], [(done.id, "Done", 1)])
+        self.assertIsNone(next_cursor)
+        self.assertEqual([h.id for h in service.get_archived_long_term_goals()], [habit.id])
+
+        # Зняття позначки виконання (напр. з діалогу підцілей) скидає і час виконання
+        active.is_completed = True
+        service.save_goal(active)
+        active.is_completed = False
+        service.save_goal(active)
+        self.assertIsNone(self.storage.load_goals(hero_id)[0].completed_at)
+
+    def test_archived_goals_paginate_by_cursor(self):
+        """Сторінки архіву за курсором з попередньої сторінки: без повторів і пропусків, і при однаковому часі."""
+        hero = Hero("PagedArchive", HeroClass.WARRIOR, Gender.MALE, "img")
+        self.storage.create_hero(hero)
+        hero_id = str(hero.id)
+        base = datetime(2024, 1, 1)
+        goals = [Goal(title=f"Done {i}", description="", deadline=base, is_completed=True,
+                      completed_at=base + timedelta(days=i // 2))  # пари з однаковим completed_at
+                 for i in range(7)]
+        self.storage.save_goals(goals, hero_id)
+        self.assertEqual(self.storage.archive_completed(hero_id, base + timedelta(days=10)), (7, 0))
+
+        pages, cursor = [], None
+        while True:
+            page, cursor = self.storage.load_archived_goals(hero_id, cursor=cursor, limit=3)
+            pages.append([g.id for g in page])
+            if cursor is None:
+                break
+
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+        paged = [goal_id for p in pages for goal_id in p]
+        self.assertEqual(len(set(paged)), len(paged))
+        expected = [g.id for g in sorted(goals, key=lambda g: (g.completed_at, g.id.bytes), reverse=True)]
+        self.assertEqual(paged, expected)
+        self.assertEqual([g.id for g in self.storage.load_archived_goals(hero_id, limit=10)[0]], expected)
+
+
+def _write_item_file(folder, filename):
+    with open(os.path.join(folder, filename), "wb") as f:
+        f.write(b"png")
+
+
+class TestQueryPlans(unittest.TestCase):
+    """Кожен запит StorageService має йти через індекс, а не повним переглядом таблиці."""
+
+    # Запити, яким повний перегляд потрібен за змістом (весь каталог магазину, маніфест папки)
+    ALLOWED_SCANS = ("SELECT * FROM items_library", "SELECT image_path, size, mtime_ns FROM items_manifest")
+    # Службові методи, які не виконують запитів до даних
+    LIFECYCLE_METHODS = {"init_db", "close"}
+
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.items_dir = tempfile.TemporaryDirectory()
+        _write_item_file(self.items_dir.name, "Тестовий_меч_1_0_0_0_0.png")
+        self.storage = StorageService(self.db_path, items_path=self.items_dir.name)
+
+    def tearDown(self):
+        self.storage.close()
+        self.items_dir.cleanup()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def _run_scenario(self):
+        """Викликає кожен публічний метод StorageService хоча б раз."""
+        storage = self.storage
+        hero = Hero("PlanHero", HeroClass.WARRIOR, Gender.MALE, "img")
+        storage.create_hero(hero)
+        hero_id = str(hero.id)
+        storage.get_hero_by_nickname("PlanHero")
+        storage.get_hero_by_id(hero_id)
+        storage.update_hero(hero)
+
+        goal = Goal(title="Plan", description="", deadline=datetime.now())
+        goal.add_subgoal(SubGoal(title="Step"))
+        storage.save_goal(goal, hero_id)
+        other = Goal(title="Plan 2", description="", deadline=datetime.now())
+        storage.save_goals([other], hero_id)
+        storage.load_goals(hero_id)
+        storage.load_goal(goal.id)
+        storage.search_goals(hero_id, "Step")
+        for sort_mode in GOAL_SORT_ORDERS:
+            _, next_cursor = storage.load_goals_page(hero_id, sort_mode, limit=1)
+            storage.load_goals_page(hero_id, sort_mode, cursor=next_cursor, limit=1)
+        other.is_completed, other.completed_at = True, datetime(2024, 1, 1)
+        storage.save_goal(other, hero_id)
+        older = Goal(title="Plan 3", description="", deadline=datetime.now(), is_completed=True,
+                     completed_at=datetime(2023, 12, 1))
+        storage.save_goal(older, hero_id)
+        storage.archive_completed(hero_id, datetime(2024, 2, 1))
+        _, next_cursor = storage.load_archived_goals(hero_id, limit=1)
+        self.assertIsNotNone(next_cursor)
+        storage.load_archived_goals(hero_id, cursor=next_cursor, limit=1)
+        storage.load_archived_long_term_goals(hero_id)
+        storage.append_hero_events(hero_id, [HeroEvent(str(goal.id), "complete", "gold", 10)])
+        storage.load_hero_events(hero_id, goal.id)
+        storage.hero_event_totals(hero_id)
+        storage.delete_goal(goal.id)
+        storage.delete_goals([other.id])
+
+        habit = LongTermGoal(title="Habit", description="", total_days=5, start_date=datetime.now())
+        storage.save_long_term_goal(habit, hero_id)
+        storage.load_long_term_goals(hero_id)
+        storage.delete_long_term_goal(habit.id)
+
+        enemy = Enemy(name="Dummy", rarity=EnemyRarity.EASY, level=1, current_hp=10, max_hp=10, damage=1,
+                      damage_type=DamageType.PHYSICAL, reward_xp=1, reward_gold=1, drop_chance=0)
+        storage.save_enemy(enemy, hero_id)
+        storage.load_enemy(hero_id)
+        storage.delete_enemy(hero_id)
+
+        item_id = uuid.uuid4()
+        storage._get_connection().execute(
+            "INSERT INTO items_library (id, name, item_type, slot, price) VALUES (?, ?, ?, ?, ?)",
+            (item_id.bytes, "Plan Sword", enum_to_db(ItemType.WEAPON), enum_to_db(EquipmentSlot.MAIN_HAND), 10))
+        item = next(i for i in storage.get_all_library_items() if i.id == item_id)
+        storage.get_item_catalogue()
+        storage.add_item_to_inventory(hero_id, item)
+        storage.add_items_to_inventory(hero_id, [item])
+        inv_id = storage.get_inventory(hero_id)[0].id
+        storage.equip_item(hero_id, inv_id, EquipmentSlot.MAIN_HAND.value)
+        storage.unequip_item(inv_id)
+        storage.get_equipment_bonuses(hero_id)
+
+        os.remove(os.path.join(self.items_dir.name, "Тестовий_меч_1_0_0_0_0.png"))
+        _write_item_file(self.items_dir.name, "Тестовий_щит_0_0_0_0_1.png")
+        storage.seed_items_from_folder()
+
+    def test_no_full_table_scans(self):
+        called = set()
+        public_methods = {name for name, _ in inspect.getmembers(StorageService, inspect.isfunction)
+                          if not name.startswith("_")}
+        for name in public_methods:
+            original = getattr(self.storage, name)
+
+            def wrapper(*args, _name=name, _original=original, **kwargs):
+                called.add(_name)
+                return _original(*args, **kwargs)
+
+            setattr(self.storage, name, wrapper)
+
+        statements = []
+        conn = self.storage._get_connection()
+        conn.set_trace_callback(statements.append)
+        try:
+            self._run_scenario()
+        finally:
+            conn.set_trace_callback(None)
+
+        # Новий метод сховища має бути доданий у сценарій вище
+        self.assertEqual(public_methods - self.LIFECYCLE_METHODS - called, set())
+
+        offenders = []
+        for sql in statements:
+            sql = sql.strip()
+            verb = sql.split(None, 1)[0].upper()
+            # INSERT ... SELECT (перенесення в архів, перерахунок бонусів) читає таблиці, як і SELECT
+            inserts_select = verb == "INSERT" and re.search(r"\bSELECT\b", sql, re.IGNORECASE)
+            if verb not in ("SELECT", "UPDATE", "DELETE") and not inserts_select:
+                continue
+            if sql.startswith(self.ALLOWED_SCANS) or "'goals_fts_" in sql:  # службові таблиці FTS5
+                continue
+            plan = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+            # Віртуальна таблиця FTS5 шукає за своїм індексом (MATCH), а не переглядом
+            scans = [row[3] for row in plan if row[3].startswith("SCAN ") and "VIRTUAL TABLE" not in row[3]]
+            if scans:
+                offenders.append((sql, scans))
+
+        self.assertEqual(offenders, [])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file